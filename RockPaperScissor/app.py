@@ -3,14 +3,19 @@ Main application module for RockPaperScissor game.
 Sets up the FastAPI application and routes.
 """
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from RockPaperScissor.routes import game_router
+from RockPaperScissor.routes import game_router, stats_router
 from RockPaperScissor.utils.logging import setup_logging
-from RockPaperScissor.game_cache.memory_cache import GameSessionCache, LLMCache
-from RockPaperScissor.repositories import Storage
-from RockPaperScissor.services import GameService, LLMService
+from RockPaperScissor.utils.metrics import REGISTRY
+from RockPaperScissor.game_cache import GameSessionCache, LLMCache
+from RockPaperScissor.repositories import Storage, MemoryStorage
+from RockPaperScissor.services import GameService, LLMService, PlayBatcher, RequestLimiter, AnalyticsService
 from RockPaperScissor.repositories.combined_storage import CombinedStorage
+from RockPaperScissor.repositories.sql_storage import SQLStorage
+from RockPaperScissor.config.database import STORAGE_CONFIG
+from RockPaperScissor.config.game import REPLAY_CONFIG
 
 # Setup logging
 logger = setup_logging()
@@ -20,6 +25,17 @@ game_service = None
 storage = None
 llm_service = None
 
+def create_storage() -> Storage:
+    """Create the storage backend selected by STORAGE_CONFIG["primary"]."""
+    if STORAGE_CONFIG["primary"] == "memory":
+        # Nothing is persisted; for local development and load tests
+        return MemoryStorage()
+    if STORAGE_CONFIG["primary"] == "s3":
+        # Rounds go to S3, with SQL as the fallback while S3 is unavailable
+        return CombinedStorage()
+    # Every round in SQL, so analytics and state rebuilds see the full history
+    return SQLStorage()
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Run on application startup and shutdown"""
@@ -27,29 +43,34 @@ async def lifespan(app: FastAPI):
     
     logger.info("Application starting up")
     
-    # Initialize combined storage (S3 + SQL)
-    storage = CombinedStorage()
-    await storage.initialize()  # This will initialize SQL storage
+    # Initialize the configured storage (S3 + SQL by default), unless a different
+    # backend was requested through app.state.storage_factory (e.g. by benchmarks)
+    storage_factory = getattr(app.state, "storage_factory", create_storage)
+    storage = storage_factory()
+    await storage.initialize()  # Opens connections and starts background tasks
     
-    # Check S3 availability
-    try:
-        await storage.s3_storage.save_game_round({
-            "game_id": "test",
-            "user_id": "test",
-            "session_id": "test",
-            "user_move": "rock",
-            "ai_move": "paper",
-            "result": "lose",
-            "model_name": "test"
-        })
-        logger.info("S3 storage is available")
-    except Exception as e:
-        logger.warning(f"S3 storage is not available: {str(e)}")
-        storage.s3_available = False
-        logger.info("Using SQL as primary storage")
+    # S3 health is tracked by the storage's circuit breaker and probe
+    if isinstance(storage, CombinedStorage):
+        if storage.s3_available:
+            logger.info("S3 storage is available")
+        else:
+            logger.warning("S3 storage is not available, using SQL until it recovers")
     
     llm_service = LLMService(storage=storage)
-    game_service = GameService(storage=storage)
+    game_service = GameService(storage=storage, llm_service=llm_service)
+    if game_service.user_state_cache.rebuild is not None:
+        logger.info("Missing user states are rebuilt from stored game rounds")
+    elif REPLAY_CONFIG["on_missing_state"]:
+        logger.warning("Missing user states cannot be rebuilt: %s does not keep every game round in SQL",
+                       type(storage).__name__)
+    
+    # Share service instances with the routes
+    app.state.storage = storage
+    app.state.llm_service = llm_service
+    app.state.game_service = game_service
+    app.state.play_batcher = PlayBatcher(game_service)
+    app.state.request_limiter = RequestLimiter()
+    app.state.analytics_service = AnalyticsService(storage)
     
     logger.info("Application initialized successfully")
     
@@ -83,6 +104,7 @@ app.add_middleware(
 
 # Include routers
 app.include_router(game_router, prefix="/game", tags=["game"])
+app.include_router(stats_router, prefix="/stats", tags=["stats"])
 
 # Root endpoint
 @app.get("/")
@@ -94,6 +116,12 @@ async def root():
         "version": "1.0.0"
     }
 
+# Metrics endpoint (Prometheus text format)
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Expose counters, gauges and histograms for scraping"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 # Run application (development only)
 if __name__ == "__main__":
     import uvicorn
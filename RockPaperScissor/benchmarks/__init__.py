@@ -0,0 +1,4 @@
+"""
+Benchmarks package for RockPaperScissor game.
+Contains runnable micro-benchmarks and load tests (python -m RockPaperScissor.benchmarks.<name>).
+"""
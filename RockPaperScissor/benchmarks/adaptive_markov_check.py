@@ -0,0 +1,177 @@
+"""
+Check AdaptiveMarkovAI's scalar kernel against its reference implementation.
+
+Plays the same synthetic sessions through both implementations with the same
+random seed, comparing every move and the final state (counts, history and
+``last_lambdas``) bit for bit, and times a ``make_move`` + ``record_round``
+of each. States are encoded and decoded between rounds on a share of the
+sessions, as when they move through the user state cache.
+
+The vectorized ``make_moves_batch`` path is checked against the kernel too,
+with all sessions advancing together: every move after the first (which is
+random) must match, and ``last_lambdas`` must agree to rounding. Its cost
+per session is timed at each ``--batch-sizes`` size, next to the kernel's,
+to pick ``adaptive_markov_batch_threshold``. Exits 1 on any mismatch.
+
+Usage:
+    python -m RockPaperScissor.benchmarks.adaptive_markov_check --sessions 200 --rounds 500
+    python -m RockPaperScissor.benchmarks.adaptive_markov_check --batch-sizes 8 16 32 64 256
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from ..models.adaptive_markov_ai import AdaptiveMarkovAI
+from ..models.model_state import decode_state
+from ..models.rps import MOVE_INDEX, OUTCOME
+from .tournament import OPPONENTS
+
+
+def play(ai: AdaptiveMarkovAI, sequences: np.ndarray, seed: int, reload_every: int) -> Tuple[List[str], List[bytes], float]:
+    """Play every session; returns the AI moves, the final encoded states and the seconds spent."""
+    np.random.seed(seed)
+    moves = []
+    states = []
+    elapsed = 0.0
+    for session, sequence in enumerate(sequences):
+        state = ai.new_state()
+        reload = reload_every and session % 2 == 0
+        for round_idx, user_move in enumerate(sequence.tolist()):
+            started = time.perf_counter()
+            ai_move, state = ai.make_move(state)
+            ai_code = MOVE_INDEX[ai_move]
+            state.record_round_codes(user_move, ai_code, OUTCOME[user_move][ai_code])
+            elapsed += time.perf_counter() - started
+            moves.append(ai_move)
+            if reload and round_idx % reload_every == 0:
+                state = decode_state(state.encode())
+        states.append(state.encode())
+    return moves, states, elapsed
+
+
+def play_batched(ai: AdaptiveMarkovAI, sequences: np.ndarray, vectorized: bool) -> Tuple[List[str], List[Any]]:
+    """Play all sessions together, one round at a time; returns the AI moves (session-major) and final states."""
+    states = [ai.new_state() for _ in range(len(sequences))]
+    moves: List[List[str]] = [[] for _ in states]
+    for round_moves in sequences.T.tolist():
+        if vectorized:
+            outcomes = ai.make_moves_batch(states)
+        else:
+            outcomes = [ai.make_move(state) for state in states]
+        for i, ((ai_move, state), user_move) in enumerate(zip(outcomes, round_moves)):
+            ai_code = MOVE_INDEX[ai_move]
+            state.record_round_codes(user_move, ai_code, OUTCOME[user_move][ai_code])
+            moves[i].append(ai_move)
+            states[i] = state
+    return [move for session in moves for move in session], states
+
+
+def check_batch(sessions: int, rounds: int, seed: int, smoothing: float, temperature: float) -> List[Dict[str, Any]]:
+    """Compare the vectorized batch path with the kernel against every synthetic opponent."""
+    kernel = AdaptiveMarkovAI(smoothing_factor=smoothing, temperature=temperature, reference=False)
+    vectorized = AdaptiveMarkovAI(smoothing_factor=smoothing, temperature=temperature, reference=False,
+                                  batch_threshold=1)
+    results = []
+    for name, generate in OPPONENTS.items():
+        sequences = generate(np.random.default_rng(seed), sessions, rounds)
+        kernel_moves, kernel_states = play_batched(kernel, sequences, vectorized=False)
+        batch_moves, batch_states = play_batched(vectorized, sequences, vectorized=True)
+        results.append({
+            "opponent": name,
+            # The first move of each session is random
+            "move_mismatches": sum(a != b for i, (a, b) in enumerate(zip(kernel_moves, batch_moves)) if i % rounds),
+            "state_mismatches": sum(
+                not (np.array_equal(a.markov_counts, b.markov_counts)
+                     and np.array_equal(a.frequency_counts, b.frequency_counts)
+                     and np.allclose(a.last_lambdas, b.last_lambdas, rtol=1e-12, atol=1e-12))
+                for a, b in zip(kernel_states, batch_states)
+            )
+        })
+    return results
+
+
+def time_batches(sizes: List[int], repeat: int, seed: int) -> List[Dict[str, Any]]:
+    """Time one round of the kernel loop and of the vectorized path per session, at each batch size."""
+    rng = np.random.default_rng(seed)
+    kernel = AdaptiveMarkovAI(reference=False)
+    vectorized = AdaptiveMarkovAI(reference=False, batch_threshold=1)
+    results = []
+    for size in sizes:
+        row = {"batch_size": size}
+        for label, ai, batched in (("kernel_us", kernel, False), ("vectorized_us", vectorized, True)):
+            states = [ai.new_state() for _ in range(size)]
+            elapsed = 0.0
+            for user_moves in rng.integers(3, size=(repeat, size)).tolist():
+                for state, user_move in zip(states, user_moves):
+                    state.player_last_move = user_move
+                started = time.perf_counter()
+                if batched:
+                    ai.make_moves_batch(states)
+                else:
+                    for state in states:
+                        ai.make_move(state)
+                elapsed += time.perf_counter() - started
+            row[label] = elapsed / (repeat * size) * 1e6
+        results.append(row)
+    return results
+
+
+def run_check(sessions: int, rounds: int, seed: int, smoothing: float, temperature: float,
+              reload_every: int) -> List[Dict[str, Any]]:
+    """Compare both implementations against every synthetic opponent."""
+    kernel = AdaptiveMarkovAI(smoothing_factor=smoothing, temperature=temperature, reference=False)
+    reference = AdaptiveMarkovAI(smoothing_factor=smoothing, temperature=temperature, reference=True)
+    results = []
+    for name, generate in OPPONENTS.items():
+        sequences = generate(np.random.default_rng(seed), sessions, rounds)
+        kernel_moves, kernel_states, kernel_seconds = play(kernel, sequences, seed, reload_every)
+        reference_moves, reference_states, reference_seconds = play(reference, sequences, seed, reload_every)
+        total = sessions * rounds
+        results.append({
+            "opponent": name,
+            "moves": total,
+            "move_mismatches": sum(a != b for a, b in zip(kernel_moves, reference_moves)),
+            "state_mismatches": sum(a != b for a, b in zip(kernel_states, reference_states)),
+            "kernel_us": kernel_seconds / total * 1e6,
+            "reference_us": reference_seconds / total * 1e6
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=100, help="Sessions per synthetic opponent")
+    parser.add_argument("--rounds", type=int, default=500, help="Rounds per session")
+    parser.add_argument("--smoothing", type=float, default=1.0, help="Smoothing factor")
+    parser.add_argument("--temperature", type=float, default=1.2, help="Entropy weighting temperature")
+    parser.add_argument("--reload-every", type=int, default=7,
+                        help="Encode and decode the state every this many rounds on half the sessions (0: never)")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[4, 16, 64, 256],
+                        help="Batch sizes to time the kernel loop and the vectorized path at")
+    parser.add_argument("--batch-repeat", type=int, default=200, help="Rounds timed per batch size")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    results = run_check(args.sessions, args.rounds, args.seed, args.smoothing, args.temperature, args.reload_every)
+    batch_results = check_batch(args.sessions, args.rounds, args.seed, args.smoothing, args.temperature)
+    timings = time_batches(args.batch_sizes, args.batch_repeat, args.seed)
+    print(json.dumps({"kernel": results, "batch": batch_results, "batch_timings": timings}, indent=2))
+    for row in results:
+        print(f"{row['opponent']:>10}: {row['reference_us']:6.2f} -> {row['kernel_us']:6.2f} us/move, "
+              f"{row['move_mismatches']} move and {row['state_mismatches']} state mismatches", file=sys.stderr)
+    for row in batch_results:
+        print(f"{row['opponent']:>10}: vectorized batch, {row['move_mismatches']} move and "
+              f"{row['state_mismatches']} state mismatches", file=sys.stderr)
+    for row in timings:
+        print(f"{row['batch_size']:>10}: kernel {row['kernel_us']:6.2f} us/session, "
+              f"vectorized {row['vectorized_us']:6.2f} us/session", file=sys.stderr)
+    if any(row["move_mismatches"] or row["state_mismatches"] for row in results + batch_results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
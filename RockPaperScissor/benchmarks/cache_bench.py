@@ -0,0 +1,107 @@
+"""
+GameSessionCache scaling benchmark.
+
+Runs add_record/get_latest_record from several worker threads against caches
+with different shard counts and reports operations per second.
+
+Usage:
+    python -m RockPaperScissor.benchmarks.cache_bench --threads 1 2 4 8 --shards 1 16
+"""
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from ..game_cache import GameSessionCache
+from ..repositories import MemoryStorage
+from ..schemas.game import GameData
+
+
+def _make_records(thread_id: int, sessions: int) -> List[GameData]:
+    """Pre-build one record per session so the benchmark measures the cache only."""
+    return [
+        GameData(
+            game_id=f"t{thread_id}-g{i}",
+            user_id=f"t{thread_id}-u{i}",
+            session_id=f"t{thread_id}-s{i}",
+            user_move="rock",
+            ai_move="paper",
+            result="ai_win",
+            session_stats={},
+            model_name="markov"
+        )
+        for i in range(sessions)
+    ]
+
+
+def _worker(cache: GameSessionCache, records: List[GameData], rounds: int, start: threading.Barrier) -> int:
+    """Play `rounds` rounds over the worker's sessions and return the operation count."""
+    start.wait()
+    ops = 0
+    for round_idx in range(rounds):
+        for record in records:
+            cache.get_latest_record(record.session_id)
+            cache.add_record(record.session_id, record)
+            ops += 2
+        if round_idx % 10 == 0:
+            cache.clean_inactive_sessions()
+    return ops
+
+
+def run_case(num_shards: int, threads: int, sessions: int, rounds: int) -> Dict[str, Any]:
+    """Benchmark one (shards, threads) combination."""
+    cache = GameSessionCache(storage=MemoryStorage(max_records=0), num_shards=num_shards)
+    records = [_make_records(t, sessions) for t in range(threads)]
+    barrier = threading.Barrier(threads + 1)
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = [pool.submit(_worker, cache, records[t], rounds, barrier) for t in range(threads)]
+        barrier.wait()
+        started = time.perf_counter()
+        ops = sum(future.result() for future in futures)
+        elapsed = time.perf_counter() - started
+
+    return {
+        "shards": num_shards,
+        "threads": threads,
+        "ops": ops,
+        "seconds": elapsed,
+        "ops_per_sec": ops / elapsed,
+        "sessions": cache.get_session_count(),
+        "buffer_size": cache.get_buffer_size()
+    }
+
+
+async def _main(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    # The cache schedules its background flush on the running loop
+    results = []
+    for num_shards in args.shards:
+        for threads in args.threads:
+            result = run_case(num_shards, threads, args.sessions, args.rounds)
+            results.append(result)
+            print(
+                f"shards={result['shards']:>3} threads={result['threads']:>2} "
+                f"{result['ops_per_sec']:>12,.0f} ops/s",
+                file=sys.stderr
+            )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8], help="Worker thread counts")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 16], help="Shard counts to compare")
+    parser.add_argument("--sessions", type=int, default=1000, help="Sessions per worker thread")
+    parser.add_argument("--rounds", type=int, default=50, help="Rounds played per session")
+    args = parser.parse_args()
+
+    results = asyncio.run(_main(args))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
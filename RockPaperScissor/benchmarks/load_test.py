@@ -0,0 +1,294 @@
+"""
+Load test for the game API endpoints.
+
+Simulates many concurrent players. Each session plays a geometrically
+distributed number of rounds through /game/play, occasionally asks
+/game/analyze, and finishes with /game/end. By default the app runs
+in-process behind httpx's ASGI transport with its lifespan started here,
+storage replaced by MemoryStorage and the WAL in a temporary directory, so
+runs are hermetic and comparable across commits. With --url
+the same traffic is sent to a running server instead, and cache and flush
+metrics are not collected.
+
+Reports requests/sec and p50/p95/p99 latency per endpoint, plus session
+cache size, flush queue depth and flush lag sampled during the run.
+
+Usage:
+    python -m RockPaperScissor.benchmarks.load_test --sessions 2000 --concurrency 1000
+    python -m RockPaperScissor.benchmarks.load_test --url http://localhost:8000
+    python -m RockPaperScissor.benchmarks.load_test --output new.json --baseline old.json
+
+Set LOG_LEVEL=WARNING to leave per-request logging out of the measurement.
+"""
+import argparse
+import asyncio
+import json
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from ..config.database import WAL_CONFIG
+from ..models.model_state import MOVES
+from ..repositories import MemoryStorage
+
+ENDPOINTS = ("play", "analyze", "end")
+
+
+class LoadTest:
+    """Runs simulated sessions against one client and collects per-request latency."""
+
+    def __init__(self, client: httpx.AsyncClient, args: argparse.Namespace, app=None):
+        self.client = client
+        self.args = args
+        self.app = app  # Set for in-process runs, to sample cache metrics
+        self.rng = random.Random(args.seed)
+        self.run_id = uuid.uuid4().hex[:8]
+
+        self.latency: Dict[str, List[float]] = {endpoint: [] for endpoint in ENDPOINTS}
+        self.errors: Dict[str, Dict[str, int]] = {endpoint: defaultdict(int) for endpoint in ENDPOINTS}
+        self.samples = {"max_sessions": 0, "max_queue_depth": 0, "max_flush_lag_seconds": 0.0}
+
+    async def _post(self, endpoint: str, payload: Dict[str, Any]) -> None:
+        started = time.perf_counter()
+        try:
+            response = await self.client.post(f"/game/{endpoint}", json=payload)
+            if response.status_code != 200:
+                self.errors[endpoint][str(response.status_code)] += 1
+        except httpx.HTTPError as e:
+            self.errors[endpoint][type(e).__name__] += 1
+        self.latency[endpoint].append(time.perf_counter() - started)
+
+    def _session_length(self) -> int:
+        """Rounds for one session: geometric with mean --rounds, capped at 10x the mean."""
+        rounds = int(np.random.default_rng(self.rng.getrandbits(32)).geometric(1.0 / self.args.rounds))
+        return min(rounds, 10 * self.args.rounds)
+
+    async def _think(self) -> None:
+        if self.args.think_ms > 0:
+            await asyncio.sleep(self.rng.expovariate(1000.0 / self.args.think_ms))
+
+    async def run_session(self, index: int, slots: asyncio.Semaphore) -> None:
+        """Play one session from first round to /game/end."""
+        user_id = f"load-{self.run_id}-u{index % self.args.users}"
+        session_id = f"load-{self.run_id}-s{index}"
+        # Each player favours one move, like the recorded sessions do
+        weights = [1.0, 1.0, 1.0]
+        weights[self.rng.randrange(3)] += self.args.bias
+        rounds = self._session_length()
+
+        async with slots:
+            for _ in range(rounds):
+                game_id = str(uuid.uuid4())
+                await self._post("play", {
+                    "user_id": user_id,
+                    "session_id": session_id,
+                    "game_id": game_id,
+                    "user_move": self.rng.choices(MOVES, weights)[0]
+                })
+                if self.rng.random() < self.args.analyze_rate:
+                    await self._post("analyze", {"user_id": user_id, "session_id": session_id, "game_id": game_id})
+                await self._think()
+            await self._post("end", {"user_id": user_id, "session_id": session_id, "game_completed": True})
+
+    async def _sample_caches(self, interval_sec: float = 0.1) -> None:
+        """Track the peak session count, flush queue depth and flush lag while the run is going."""
+        game_cache = self.app.state.game_service.game_cache
+        while True:
+            flush = game_cache.get_flush_stats()
+            self.samples["max_sessions"] = max(self.samples["max_sessions"], game_cache.get_session_count())
+            self.samples["max_queue_depth"] = max(self.samples["max_queue_depth"], flush["queue_depth"])
+            self.samples["max_flush_lag_seconds"] = max(
+                self.samples["max_flush_lag_seconds"], flush["flush_lag_seconds"]
+            )
+            await asyncio.sleep(interval_sec)
+
+    def _cache_stats(self) -> Dict[str, Any]:
+        """Snapshot cache, batcher and storage state from the in-process app."""
+        state = self.app.state
+        game_cache = state.game_service.game_cache
+        return {
+            **self.samples,
+            "sessions": game_cache.get_session_count(),
+            "buffer_size": game_cache.get_buffer_size(),
+            "game_flush": game_cache.get_flush_stats(),
+            "llm_flush": state.llm_service.llm_cache.get_flush_stats(),
+            "user_state_cache": state.game_service.user_state_cache.get_stats(),
+            "play_batcher": state.play_batcher.get_stats(),
+            "request_limiter": state.request_limiter.get_stats(),
+            "storage": state.storage.get_stats() if isinstance(state.storage, MemoryStorage) else None
+        }
+
+    async def run(self) -> Dict[str, Any]:
+        """Run all sessions and summarize the results."""
+        slots = asyncio.Semaphore(self.args.concurrency)
+        sampler = asyncio.create_task(self._sample_caches()) if self.app is not None else None
+
+        started = time.perf_counter()
+        await asyncio.gather(*(self.run_session(i, slots) for i in range(self.args.sessions)))
+        elapsed = time.perf_counter() - started
+
+        if sampler is not None:
+            sampler.cancel()
+        total = sum(len(timings) for timings in self.latency.values())
+        return {
+            "seconds": elapsed,
+            "requests": total,
+            "rps": total / elapsed if elapsed else 0.0,
+            "endpoints": {
+                endpoint: _summarize(self.latency[endpoint], self.errors[endpoint], elapsed)
+                for endpoint in ENDPOINTS
+            },
+            "cache": self._cache_stats() if self.app is not None else None
+        }
+
+
+def _summarize(timings: List[float], errors: Dict[str, int], elapsed: float) -> Dict[str, Any]:
+    """Request count, rate, error counts and latency percentiles (milliseconds) for one endpoint."""
+    latency_ms = np.array(timings) * 1000.0
+    percentiles = np.percentile(latency_ms, (50, 95, 99)) if len(latency_ms) else (0.0, 0.0, 0.0)
+    return {
+        "requests": len(timings),
+        "rps": len(timings) / elapsed if elapsed else 0.0,
+        "errors": dict(errors),
+        "latency_ms": {
+            "mean": float(latency_ms.mean()) if len(latency_ms) else 0.0,
+            "p50": float(percentiles[0]),
+            "p95": float(percentiles[1]),
+            "p99": float(percentiles[2]),
+            "max": float(latency_ms.max()) if len(latency_ms) else 0.0
+        }
+    }
+
+
+async def run_in_process(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run the load test against the app in this process with in-memory storage."""
+    from ..app import app
+
+    wal_dir = tempfile.mkdtemp(prefix="rps-load-wal-")
+    previous_wal_dir = WAL_CONFIG["dir"]
+    WAL_CONFIG["dir"] = wal_dir
+    app.state.storage_factory = MemoryStorage
+    try:
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://load-test") as client:
+                results = await LoadTest(client, args, app=app).run()
+            shutdown_started = time.perf_counter()
+        # Leaving the lifespan flushes everything still buffered
+        results["shutdown_seconds"] = time.perf_counter() - shutdown_started
+        return results
+    finally:
+        del app.state.storage_factory
+        WAL_CONFIG["dir"] = previous_wal_dir
+        shutil.rmtree(wal_dir, ignore_errors=True)
+
+
+async def run_remote(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run the load test against a server that is already running."""
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as client:
+        return await LoadTest(client, args).run()
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_to_baseline(results: Dict[str, Any], baseline: Dict[str, Any], max_slowdown: float) -> List[str]:
+    """
+    Find endpoints whose throughput or tail latency got worse than the baseline.
+
+    Returns:
+        Human-readable regression descriptions (empty if none)
+    """
+    regressions = []
+    if results["rps"] < baseline["rps"] * (1.0 - max_slowdown):
+        regressions.append(f"overall: {baseline['rps']:,.0f} -> {results['rps']:,.0f} req/s")
+    for endpoint, entry in results["endpoints"].items():
+        old = baseline["endpoints"].get(endpoint)
+        if not old or not old["requests"]:
+            continue
+        if entry["latency_ms"]["p99"] > old["latency_ms"]["p99"] * (1.0 + max_slowdown):
+            regressions.append(
+                f"{endpoint}: p99 {old['latency_ms']['p99']:.1f}ms -> {entry['latency_ms']['p99']:.1f}ms"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=2000, help="Sessions to simulate")
+    parser.add_argument("--concurrency", type=int, default=1000, help="Sessions in flight at once")
+    parser.add_argument("--rounds", type=float, default=20, help="Mean rounds per session")
+    parser.add_argument("--users", type=int, default=1000, help="Distinct user ids the sessions are spread over")
+    parser.add_argument("--analyze-rate", type=float, default=0.05, help="Chance of an analyze request per round")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Mean pause between a session's rounds")
+    parser.add_argument("--bias", type=float, default=1.0, help="Extra weight on each player's favourite move")
+    parser.add_argument("--url", help="Base URL of a running server (default: run the app in-process)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Request timeout for --url runs")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--output", help="Write results JSON to this file instead of stdout")
+    parser.add_argument("--baseline", help="Results JSON to compare against; exit 1 on regression")
+    parser.add_argument("--max-slowdown", type=float, default=0.25, help="Allowed relative rps drop / p99 growth")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_remote(args) if args.url else run_in_process(args))
+    results = {
+        "revision": _git_revision(),
+        "target": args.url or "in-process",
+        "config": {
+            key: getattr(args, key)
+            for key in ("sessions", "concurrency", "rounds", "users", "analyze_rate", "think_ms", "bias", "seed")
+        },
+        **results
+    }
+
+    print(f"{results['requests']:,} requests in {results['seconds']:.2f}s, {results['rps']:,.0f} req/s", file=sys.stderr)
+    for endpoint, entry in results["endpoints"].items():
+        latency = entry["latency_ms"]
+        print(
+            f"{endpoint:>8} {entry['requests']:>8,} req {entry['rps']:>9,.0f} req/s  "
+            f"p50 {latency['p50']:.1f}ms  p95 {latency['p95']:.1f}ms  p99 {latency['p99']:.1f}ms  "
+            f"errors {sum(entry['errors'].values())}",
+            file=sys.stderr
+        )
+    if results["cache"]:
+        cache = results["cache"]
+        print(
+            f"   cache peak {cache['max_sessions']:,} sessions, queue depth {cache['max_queue_depth']:,}, "
+            f"flush lag {cache['max_flush_lag_seconds']:.2f}s",
+            file=sys.stderr
+        )
+
+    output = json.dumps(results, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(results, json.load(f), args.max_slowdown)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
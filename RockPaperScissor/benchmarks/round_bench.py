@@ -0,0 +1,139 @@
+"""
+Per-round CPU benchmark of the play path.
+
+Plays rounds through ``GameService._complete_round`` (scoring, model state
+and session stats updates, the session cache and the response) for every
+model, without HTTP or request batching, and reports rounds per second and
+microseconds per round. ``--include-move`` also times the model's
+``make_move``. The write-ahead log is off unless ``--wal`` is given, so the
+figures are CPU time rather than disk writes.
+
+Usage:
+    python -m RockPaperScissor.benchmarks.round_bench --sessions 200 --rounds 100
+    python -m RockPaperScissor.benchmarks.round_bench --output new.json --baseline old.json
+"""
+import argparse
+import asyncio
+import gc
+import json
+import random
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from ..models import AI_MODELS, get_ai
+from ..models.rps import MOVES
+from ..repositories import MemoryStorage
+from ..schemas.game import GameRequest
+from ..config.database import WAL_CONFIG
+from ..services.game_service import GameService
+
+
+def run_case(service: GameService, model_name: str, sessions: int, rounds: int,
+             include_move: bool, seed: int) -> Dict[str, Any]:
+    """Play `rounds` rounds in each of `sessions` sessions with one model."""
+    rng = random.Random(seed)
+    random.seed(seed)
+    ai = get_ai(model_name)
+    requests = [
+        [
+            GameRequest(user_id=f"{model_name}-u{s}", session_id=f"{model_name}-s{s}",
+                        game_id=f"{model_name}-s{s}-g{r}", user_move=MOVES[rng.randrange(3)])
+            for r in range(rounds)
+        ]
+        for s in range(sessions)
+    ]
+    states = [ai.new_state() for _ in range(sessions)]
+
+    gc.collect()
+    elapsed = 0.0
+    for r in range(rounds):
+        # Moves are made outside the timed section unless they are being measured
+        if not include_move:
+            moves = [ai.make_move(state) for state in states]
+        started = time.perf_counter()
+        for s in range(sessions):
+            ai_move, state = ai.make_move(states[s]) if include_move else moves[s]
+            service._complete_round(requests[s][r], model_name, ai_move, state)
+            states[s] = state
+        elapsed += time.perf_counter() - started
+        # Finished rounds would normally be flushed to storage; keep the cache small
+        if r % 10 == 9:
+            for s in range(sessions):
+                service.game_cache.move_session_to_buffer(requests[s][r].session_id)
+
+    total = sessions * rounds
+    return {
+        "model": model_name,
+        "rounds": total,
+        "seconds": elapsed,
+        "rounds_per_sec": total / elapsed,
+        "us_per_round": elapsed / total * 1e6
+    }
+
+
+def compare_to_baseline(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]]) -> List[str]:
+    """Describe the per-round time change of each model present in both runs."""
+    previous = {row["model"]: row for row in baseline}
+    lines = []
+    for row in results:
+        old = previous.get(row["model"])
+        if old is None:
+            continue
+        change = row["us_per_round"] / old["us_per_round"] - 1
+        lines.append(f"{row['model']:>16}: {old['us_per_round']:8.2f} -> {row['us_per_round']:8.2f} us/round "
+                     f"({change:+.1%})")
+    return lines
+
+
+async def _main(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    WAL_CONFIG["enabled"] = args.wal
+    # The session cache schedules its background flush on the running loop
+    service = GameService(storage=MemoryStorage(max_records=0))
+    results = []
+    try:
+        for model_name in args.models:
+            best: Optional[Dict[str, Any]] = None
+            for repeat in range(args.repeat):
+                result = run_case(service, model_name, args.sessions, args.rounds, args.include_move,
+                                  args.seed + repeat)
+                if best is None or result["seconds"] < best["seconds"]:
+                    best = result
+            results.append(best)
+            print(f"{model_name:>16} {best['rounds_per_sec']:>12,.0f} rounds/s "
+                  f"{best['us_per_round']:8.2f} us/round", file=sys.stderr)
+    finally:
+        await service.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", nargs="+", default=list(AI_MODELS), help="Models to play")
+    parser.add_argument("--sessions", type=int, default=200, help="Concurrent sessions per model")
+    parser.add_argument("--rounds", type=int, default=100, help="Rounds played per session")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per model (the fastest is kept)")
+    parser.add_argument("--include-move", action="store_true", help="Also time the model's make_move")
+    parser.add_argument("--wal", action="store_true", help="Log records to the write-ahead log")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--output", help="Write results JSON to this file instead of stdout")
+    parser.add_argument("--baseline", help="Results JSON to compare against")
+    args = parser.parse_args()
+
+    results = asyncio.run(_main(args))
+    payload = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload)
+    else:
+        print(payload)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for line in compare_to_baseline(results, baseline):
+            print(line, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
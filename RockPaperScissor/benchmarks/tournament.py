@@ -0,0 +1,321 @@
+"""
+Offline tournament between the AI models and scripted or recorded opponents.
+
+Every (model, opponent) pairing is played in its own worker process. Within a
+pairing all sessions advance together through ``make_moves_batch``, so the
+moves/sec figure reflects the batched inference path used by the service.
+Per-move latency percentiles are measured separately with single
+``make_move`` calls on a sample of sessions.
+
+Usage:
+    python -m RockPaperScissor.benchmarks.tournament --sessions 1000 --rounds 200
+    python -m RockPaperScissor.benchmarks.tournament --recorded data/game_data.db
+    python -m RockPaperScissor.benchmarks.tournament --output new.json --baseline old.json
+    python -m RockPaperScissor.benchmarks.tournament --max-p99-us 50
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ..models import AI_MODELS, get_ai
+from ..models.rps import MOVE_INDEX, OUTCOME, OUTCOME_TABLE, RESULTS
+
+
+def _biased(rng: np.random.Generator, sessions: int, rounds: int) -> np.ndarray:
+    return rng.choice(3, size=(sessions, rounds), p=(0.5, 0.3, 0.2))
+
+
+def _cycle(rng: np.random.Generator, sessions: int, rounds: int) -> np.ndarray:
+    offsets = rng.integers(0, 3, size=(sessions, 1))
+    return (offsets + np.arange(rounds)) % 3
+
+
+def _sticky(rng: np.random.Generator, sessions: int, rounds: int) -> np.ndarray:
+    """First-order Markov player that repeats its last move 60% of the time."""
+    moves = np.empty((sessions, rounds), dtype=np.int64)
+    moves[:, 0] = rng.integers(0, 3, size=sessions)
+    shifts = rng.choice(3, size=(sessions, rounds), p=(0.6, 0.2, 0.2))
+    for r in range(1, rounds):
+        moves[:, r] = (moves[:, r - 1] + shifts[:, r]) % 3
+    return moves
+
+
+def _pattern(rng: np.random.Generator, sessions: int, rounds: int) -> np.ndarray:
+    """Repeats a random 4-move pattern per session."""
+    patterns = rng.integers(0, 3, size=(sessions, 4))
+    return patterns[:, np.arange(rounds) % 4]
+
+
+# Synthetic opponents: name -> generator of a (sessions, rounds) move index array
+OPPONENTS: Dict[str, Callable[[np.random.Generator, int, int], np.ndarray]] = {
+    "uniform": lambda rng, sessions, rounds: rng.integers(0, 3, size=(sessions, rounds)),
+    "constant": lambda rng, sessions, rounds: np.zeros((sessions, rounds), dtype=np.int64),
+    "biased": _biased,
+    "cycle": _cycle,
+    "sticky": _sticky,
+    "pattern": _pattern,
+}
+
+
+def load_recorded_sequences(db_path: str, min_rounds: int = 10, limit: Optional[int] = None) -> List[np.ndarray]:
+    """
+    Load per-session player move sequences from the game_rounds table.
+
+    Args:
+        db_path: SQLite database written by SQLStorage
+        min_rounds: Skip sessions with fewer rounds
+        limit: Maximum number of sessions to load
+
+    Returns:
+        One array of move indices per session, in play order
+    """
+    sessions: Dict[str, List[int]] = defaultdict(list)
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        for session_id, user_move in conn.execute("SELECT session_id, user_move FROM game_rounds ORDER BY id"):
+            if user_move in MOVE_INDEX:
+                sessions[session_id].append(MOVE_INDEX[user_move])
+    finally:
+        conn.close()
+
+    sequences = [np.array(moves, dtype=np.int64) for moves in sessions.values() if len(moves) >= min_rounds]
+    return sequences[:limit] if limit else sequences
+
+
+def _seed(seed: int) -> None:
+    """Seed both random sources used by the models."""
+    random.seed(seed)
+    np.random.seed(seed % 2**32)
+
+
+def _play_batched(model_name: str, sequences: Sequence[np.ndarray]) -> Dict[str, Any]:
+    """Play all sessions together, one make_moves_batch call per round."""
+    ai = get_ai(model_name)
+    states = [ai.new_state() for _ in sequences]
+    lengths = np.array([len(seq) for seq in sequences])
+    results = np.zeros(len(RESULTS), dtype=np.int64)
+    moves = 0
+
+    started = time.perf_counter()
+    for r in range(int(lengths.max(initial=0))):
+        active = np.flatnonzero(lengths > r)
+        outcomes = ai.make_moves_batch([states[i] for i in active])
+        user_moves = np.fromiter((sequences[i][r] for i in active), dtype=np.int64, count=len(active))
+        ai_moves = np.fromiter((MOVE_INDEX[move] for move, _ in outcomes), dtype=np.int64, count=len(active))
+        round_results = OUTCOME_TABLE[user_moves, ai_moves]
+        results += np.bincount(round_results, minlength=len(RESULTS))
+        for i, (_, state), user_move, ai_move, result in zip(active, outcomes, user_moves, ai_moves, round_results):
+            state.record_round_codes(user_move, ai_move, result)
+            states[i] = state
+        moves += len(active)
+    elapsed = time.perf_counter() - started
+
+    return {"moves": moves, "seconds": elapsed, "results": results}
+
+
+def _sample_latency(model_name: str, sequences: Sequence[np.ndarray]) -> np.ndarray:
+    """Time single make_move + record_round calls (nanoseconds per move)."""
+    ai = get_ai(model_name)
+    timings = []
+    for sequence in sequences:
+        state = ai.new_state()
+        for user_move in sequence.tolist():
+            started = time.perf_counter_ns()
+            ai_move, state = ai.make_move(state)
+            ai_code = MOVE_INDEX[ai_move]
+            state.record_round_codes(user_move, ai_code, OUTCOME[user_move][ai_code])
+            timings.append(time.perf_counter_ns() - started)
+    return np.array(timings, dtype=np.int64)
+
+
+def run_match(
+    model_name: str,
+    opponent: str,
+    sequences: Sequence[np.ndarray],
+    seed: int,
+    latency_sessions: int
+) -> Dict[str, Any]:
+    """
+    Play one model against one opponent's sessions.
+
+    Returns:
+        Win/draw/loss rates from the AI's side, moves/sec and per-move latency percentiles
+    """
+    _seed(seed)
+    played = _play_batched(model_name, sequences)
+    _seed(seed)
+    latency_ns = _sample_latency(model_name, sequences[:latency_sessions])
+
+    counts = played["results"]
+    total = max(int(counts.sum()), 1)
+    percentiles = np.percentile(latency_ns, (50, 95, 99)) / 1000.0 if len(latency_ns) else (0.0, 0.0, 0.0)
+    return {
+        "model": model_name,
+        "opponent": opponent,
+        "sessions": len(sequences),
+        "moves": played["moves"],
+        "ai_win_rate": counts[RESULTS.index("ai_win")] / total,
+        "player_win_rate": counts[RESULTS.index("player_win")] / total,
+        "draw_rate": counts[RESULTS.index("draw")] / total,
+        "moves_per_sec": played["moves"] / played["seconds"] if played["seconds"] else 0.0,
+        "latency_us": {"p50": percentiles[0], "p95": percentiles[1], "p99": percentiles[2]}
+    }
+
+
+def run_tournament(
+    models: Sequence[str],
+    opponents: Dict[str, Sequence[np.ndarray]],
+    seed: int = 0,
+    latency_sessions: int = 20,
+    workers: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Play every model against every opponent in a process pool.
+
+    Args:
+        models: Names from AI_MODELS
+        opponents: Opponent name -> move sequences (one per session)
+        seed: Base random seed; each pairing gets a deterministic derived seed
+        latency_sessions: Sessions per pairing timed with single make_move calls
+        workers: Process count (defaults to the CPU count)
+
+    Returns:
+        One result dict per (model, opponent) pairing
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(run_match, model_name, opponent, sequences, seed + i, latency_sessions)
+            for i, (model_name, (opponent, sequences)) in enumerate(
+                (m, o) for m in models for o in opponents.items()
+            )
+        ]
+        return [future.result() for future in futures]
+
+
+def compare_to_baseline(
+    results: List[Dict[str, Any]],
+    baseline: List[Dict[str, Any]],
+    max_win_rate_drop: float,
+    max_slowdown: float
+) -> List[str]:
+    """
+    Find pairings that got weaker or slower than the baseline.
+
+    Returns:
+        Human-readable regression descriptions (empty if none)
+    """
+    previous = {(entry["model"], entry["opponent"]): entry for entry in baseline}
+    regressions = []
+    for entry in results:
+        old = previous.get((entry["model"], entry["opponent"]))
+        if old is None:
+            continue
+        pairing = f"{entry['model']} vs {entry['opponent']}"
+        if entry["ai_win_rate"] < old["ai_win_rate"] - max_win_rate_drop:
+            regressions.append(
+                f"{pairing}: win rate {old['ai_win_rate']:.3f} -> {entry['ai_win_rate']:.3f}"
+            )
+        if entry["moves_per_sec"] < old["moves_per_sec"] * (1.0 - max_slowdown):
+            regressions.append(
+                f"{pairing}: {old['moves_per_sec']:,.0f} -> {entry['moves_per_sec']:,.0f} moves/s"
+            )
+    return regressions
+
+
+def over_latency_budget(results: List[Dict[str, Any]], max_p99_us: float) -> List[str]:
+    """
+    Find pairings whose p99 per-move latency exceeds the budget.
+
+    Returns:
+        Human-readable descriptions (empty if none)
+    """
+    return [
+        f"{entry['model']} vs {entry['opponent']}: p99 {entry['latency_us']['p99']:.1f}us > {max_p99_us:.1f}us"
+        for entry in results
+        if entry["latency_us"]["p99"] > max_p99_us
+    ]
+
+
+def rank_models(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Order models by their mean win rate minus loss rate across opponents, best first."""
+    margins: Dict[str, List[float]] = defaultdict(list)
+    for entry in results:
+        margins[entry["model"]].append(entry["ai_win_rate"] - entry["player_win_rate"])
+    ranking = [{"model": model, "mean_margin": float(np.mean(values))} for model, values in margins.items()]
+    return sorted(ranking, key=lambda row: row["mean_margin"], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", nargs="+", default=list(AI_MODELS), help="Models to evaluate")
+    parser.add_argument("--opponents", nargs="+", default=list(OPPONENTS), help="Synthetic opponents")
+    parser.add_argument("--sessions", type=int, default=500, help="Sessions per synthetic opponent")
+    parser.add_argument("--rounds", type=int, default=200, help="Rounds per synthetic session")
+    parser.add_argument("--recorded", help="SQLite database to replay recorded sessions from")
+    parser.add_argument("--recorded-limit", type=int, default=None, help="Maximum recorded sessions")
+    parser.add_argument("--latency-sessions", type=int, default=20, help="Sessions timed move by move")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--output", help="Write results JSON to this file instead of stdout")
+    parser.add_argument("--baseline", help="Results JSON to compare against; exit 1 on regression")
+    parser.add_argument("--max-win-rate-drop", type=float, default=0.02, help="Allowed absolute win rate drop")
+    parser.add_argument("--max-slowdown", type=float, default=0.25, help="Allowed relative moves/sec drop")
+    parser.add_argument("--max-p99-us", type=float, default=None,
+                        help="Per-move p99 latency budget in microseconds; exit 1 if any pairing exceeds it")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    opponents: Dict[str, Sequence[np.ndarray]] = {
+        name: list(OPPONENTS[name](rng, args.sessions, args.rounds)) for name in args.opponents
+    }
+    if args.recorded:
+        recorded = load_recorded_sequences(args.recorded, limit=args.recorded_limit)
+        if recorded:
+            opponents["recorded"] = recorded
+        else:
+            print(f"No recorded sessions found in {args.recorded}", file=sys.stderr)
+
+    results = run_tournament(args.models, opponents, args.seed, args.latency_sessions, args.workers)
+    for entry in results:
+        print(
+            f"{entry['model']:>16} vs {entry['opponent']:<9} "
+            f"win {entry['ai_win_rate']:.3f}  loss {entry['player_win_rate']:.3f}  "
+            f"{entry['moves_per_sec']:>10,.0f} moves/s  "
+            f"p50 {entry['latency_us']['p50']:.1f}us  p99 {entry['latency_us']['p99']:.1f}us",
+            file=sys.stderr
+        )
+
+    for rank, row in enumerate(rank_models(results), 1):
+        print(f"{rank:>2}. {row['model']:<16} mean win-loss margin {row['mean_margin']:+.3f}", file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    failures = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(results, json.load(f), args.max_win_rate_drop, args.max_slowdown)
+        failures.extend(f"REGRESSION {regression}" for regression in regressions)
+    if args.max_p99_us is not None:
+        failures.extend(f"OVER BUDGET {pairing}" for pairing in over_latency_budget(results, args.max_p99_us))
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,29 @@ SQLITE_CONFIG = {
     "db_path": str(BASE_DATA_DIR / "game_data.db"),
     "timeout": 30.0,  # Wait up to 30 seconds for locks
     "check_same_thread": False,  # Allow multi-threaded access
+    "journal_mode": "WAL",  # Readers don't block the writer
+    "synchronous": "NORMAL",  # Safe with WAL, fsync only at checkpoints
+    "cache_size_kb": 64 * 1024,  # Page cache size per connection
+    "write_batch_size": 5000,  # Max queued rows written per transaction
+    "write_max_attempts": 3,  # Transactions tried for queued writes nobody waits on
+    "read_pool_size": int(os.getenv("SQLITE_READ_POOL_SIZE", "4")),  # Read-only connections for queries
+    "statement_cache_size": 128,  # Prepared statements kept per read connection
+}
+
+# Write-ahead log for records buffered in memory before a flush
+WAL_CONFIG = {
+    "enabled": os.getenv("WAL_ENABLED", "true").lower() == "true",
+    "dir": str(BASE_DATA_DIR / "wal"),
+    "segment_max_bytes": 64 * 1024 * 1024,  # Rotate segments above 64 MB
+    "fsync_interval_sec": 0.05,  # Batched fsync interval (max data at risk on power loss)
+}
+
+# Columnar (Parquet) export of stored rounds and LLM interactions
+EXPORT_CONFIG = {
+    "dir": str(BASE_DATA_DIR / "export"),
+    "chunk_rows": int(os.getenv("EXPORT_CHUNK_ROWS", "100000")),  # Rows read and written per chunk
+    "compression": "zstd",
+    "s3_settle_sec": 900,  # Only export S3 hours that ended this long ago (allows for late flushes)
 }
 
 # S3 configuration
@@ -25,12 +48,29 @@ S3_CONFIG = {
     "aws_access_key_id": os.getenv("AWS_ACCESS_KEY_ID"),
     "aws_secret_access_key": os.getenv("AWS_SECRET_ACCESS_KEY"),
     "endpoint_url": os.getenv("S3_ENDPOINT_URL"),  # For custom endpoints
+    "local_dir": os.getenv("S3_LOCAL_DIR"),  # Use a filesystem-backed fake instead of AWS when set
+    "batch_writes": os.getenv("S3_BATCH_WRITES", "true").lower() == "true",  # Pack each flush into one object
+    "compress_level": 6,  # gzip level for batched game round objects
+    "max_remembered_rounds": 100_000,  # Rounds remembered as uploaded after a partly failed batch
+    "max_workers": int(os.getenv("S3_MAX_WORKERS", "16")),  # Threads in the dedicated S3 executor
+    "max_pool_connections": int(os.getenv("S3_MAX_POOL_CONNECTIONS", "32")),  # botocore HTTP connection pool size
+    "max_inflight_uploads": int(os.getenv("S3_MAX_INFLIGHT_UPLOADS", "16")),  # Concurrent put_object calls
+    "connect_timeout_sec": 5,
+    "read_timeout_sec": 30,
 }
 
 # Storage configuration
 STORAGE_CONFIG = {
-    "primary": os.getenv("STORAGE_TYPE", "sql"),  # Primary storage type: "s3" or "sql"
+    "primary": os.getenv("STORAGE_TYPE", "sql"),  # Primary round store: "sql", "s3" (SQL as fallback) or "memory"
     "fallback": "sql",  # Fallback storage type
     "batch_size": 100,  # Number of records to batch
     "batch_timeout_sec": 300,  # Maximum time to wait before flushing batch
+    "high_water_mark": 10000,  # Buffered records above which producers wait for a flush
+    "flush_check_interval_sec": 60,  # Maximum time between flush scheduler checks
+    "circuit_failure_threshold": 3,  # Consecutive S3 failures that open the circuit
+    "circuit_recovery_timeout_sec": 30,  # Time the circuit stays open before a trial write
+    "health_probe_interval_sec": 15,  # Interval between S3 health probes
+    "replay_max_size": 100000,  # Outage rounds kept in memory for replay to S3
+    "replay_batch_size": 1000,  # Rounds per replayed S3 object
+    "memory_max_records": int(os.getenv("MEMORY_STORAGE_MAX_RECORDS", "100000")),  # Records kept per kind by MemoryStorage
 } 
\ No newline at end of file
@@ -0,0 +1,65 @@
+"""Game service configuration settings."""
+
+import os
+
+# AI model implementation switches
+MODEL_CONFIG = {
+    # Run AdaptiveMarkovAI's reference NumPy implementation instead of its scalar kernel (for verification)
+    "adaptive_markov_reference": os.getenv("ADAPTIVE_MARKOV_REFERENCE", "false").lower() == "true",
+    # Batches of at least this many sessions use AdaptiveMarkovAI's vectorized path instead of the
+    # scalar kernel (0: always the kernel). The kernel was faster up to a few hundred sessions, so
+    # measure with benchmarks/adaptive_markov_check.py before opting in
+    "adaptive_markov_batch_threshold": int(os.getenv("ADAPTIVE_MARKOV_BATCH_THRESHOLD", "0")),
+}
+
+# Request coalescing for /game/play
+# A request arriving while no batch is running is played at once; requests
+# arriving while one is running are gathered for up to window_ms (or until
+# max_batch_size requests are waiting) and run through GameService as one batch.
+PLAY_BATCH_CONFIG = {
+    "enabled": os.getenv("PLAY_BATCH_ENABLED", "true").lower() == "true",
+    "window_ms": float(os.getenv("PLAY_BATCH_WINDOW_MS", "2")),  # Max time a request waits for a batch
+    "max_batch_size": int(os.getenv("PLAY_BATCH_MAX_SIZE", "256")),  # Dispatch immediately at this size
+}
+
+# Read-through cache of decoded user model states (user_states table)
+# Entries are written back in coalesced batches, at most once per user per interval.
+USER_STATE_CACHE_CONFIG = {
+    "max_size": int(os.getenv("USER_STATE_CACHE_SIZE", "10000")),  # Max cached users (LRU eviction)
+    "ttl_sec": int(os.getenv("USER_STATE_CACHE_TTL_SEC", "3600")),  # Re-read from storage after this
+    "flush_interval_sec": int(os.getenv("USER_STATE_FLUSH_INTERVAL_SEC", "30")),  # Write-behind interval
+    "max_concurrent_loads": int(os.getenv("USER_STATE_MAX_LOADS", "64")),  # Storage reads in flight at once
+    "encode_offload_threshold": 256,  # Encode flushes of at least this many states in a worker thread
+}
+
+# Rebuilding user model states from stored game rounds
+# A user with rounds but no saved state (or one older than their rounds, for
+# offline rebuilds) gets their state replayed from game_rounds.
+REPLAY_CONFIG = {
+    # Replay on cache misses (only when SQL is the primary round store, STORAGE_TYPE=sql)
+    "on_missing_state": os.getenv("REPLAY_ON_MISSING_STATE", "true").lower() == "true",
+    "chunk_rows": 10000,  # Rounds fetched per cursor read
+    "default_model": "adaptive_markov",  # Model for users whose rounds name an unknown model
+    "workers": int(os.getenv("REPLAY_WORKERS", str(os.cpu_count() or 1))),  # Processes for bulk rebuilds
+    "write_batch_size": 1000,  # Rebuilt states written per transaction in bulk rebuilds
+}
+
+# Admission control for the game endpoints
+# Requests beyond max_concurrent wait up to queue_timeout_sec for a slot, then get a 503.
+REQUEST_LIMIT_CONFIG = {
+    "max_concurrent": int(os.getenv("MAX_CONCURRENT_REQUESTS", "2048")),  # Requests being processed at once
+    "queue_timeout_sec": float(os.getenv("REQUEST_QUEUE_TIMEOUT_SEC", "5")),  # Max wait for a slot
+}
+
+# Analytics queries over stored game rounds
+ANALYTICS_CONFIG = {
+    "default_hours": 24,  # Range of an hourly volume query without start/end
+    "default_days": 30,  # Range of a daily volume query without start/end
+    "max_buckets": 2000,  # Larger volume ranges are rejected
+}
+
+# In-memory game session cache
+SESSION_CACHE_CONFIG = {
+    "num_shards": int(os.getenv("SESSION_CACHE_SHARDS", "16")),  # Lock-striped shards keyed by session_id
+    "max_age_sec": int(os.getenv("SESSION_CACHE_MAX_AGE_SEC", "300")),  # Evict sessions idle this long
+}
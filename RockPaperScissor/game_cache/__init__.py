@@ -1,6 +1,9 @@
-from .memory_cache import GameSessionCache, LLMCache
+from .memory_cache import GameSessionCache
+from .llm_cache import LLMCache
+from .user_state_cache import UserStateCache
 
 __all__ = [
     'GameSessionCache',
-    'LLMCache'
+    'LLMCache',
+    'UserStateCache'
 ]
\ No newline at end of file
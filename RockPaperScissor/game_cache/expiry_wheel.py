@@ -0,0 +1,75 @@
+"""
+Timing wheel for expiring idle keys without scanning every key.
+"""
+import heapq
+import math
+from typing import Any, Dict, Hashable, List, Set
+
+class ExpiryWheel:
+    """
+    Buckets keys by the time slot of their last activity.
+
+    ``touch`` moves a key to the bucket for the current slot in O(1), and
+    ``pop_expired`` only visits buckets older than the cutoff, so expiry costs
+    O(expired keys) instead of O(all keys). Not thread safe; callers hold
+    their own lock.
+    """
+
+    def __init__(self, resolution_sec: float = 1.0):
+        self.resolution_sec = resolution_sec
+        self.buckets: Dict[int, Set[Hashable]] = {}
+        self.slot_of: Dict[Hashable, int] = {}
+        self._slot_heap: List[int] = []
+
+    def _slot(self, timestamp: float) -> int:
+        return math.floor(timestamp / self.resolution_sec)
+
+    def touch(self, key: Hashable, timestamp: float) -> None:
+        """Record activity for a key at the given time."""
+        slot = self._slot(timestamp)
+        old_slot = self.slot_of.get(key)
+        if old_slot == slot:
+            return
+        if old_slot is not None:
+            self._discard(key, old_slot)
+
+        bucket = self.buckets.get(slot)
+        if bucket is None:
+            bucket = self.buckets[slot] = set()
+            heapq.heappush(self._slot_heap, slot)
+        bucket.add(key)
+        self.slot_of[key] = slot
+
+    def remove(self, key: Hashable) -> None:
+        """Stop tracking a key."""
+        slot = self.slot_of.pop(key, None)
+        if slot is not None:
+            self._discard(key, slot)
+
+    def _discard(self, key: Hashable, slot: int) -> None:
+        bucket = self.buckets[slot]
+        bucket.discard(key)
+        if not bucket:
+            # The slot stays in the heap and is skipped when popped
+            del self.buckets[slot]
+
+    def pop_expired(self, cutoff: float) -> List[Any]:
+        """
+        Remove and return keys whose last activity is older than the cutoff.
+
+        Keys are expired with slot granularity: a key is returned once the whole
+        slot of its last activity lies before the cutoff.
+        """
+        cutoff_slot = self._slot(cutoff)
+        expired = []
+        while self._slot_heap and self._slot_heap[0] < cutoff_slot:
+            slot = heapq.heappop(self._slot_heap)
+            bucket = self.buckets.pop(slot, None)
+            if bucket:
+                for key in bucket:
+                    del self.slot_of[key]
+                expired.extend(bucket)
+        return expired
+
+    def __len__(self) -> int:
+        return len(self.slot_of)
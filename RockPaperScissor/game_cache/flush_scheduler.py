@@ -0,0 +1,258 @@
+"""
+Asyncio-native flush scheduling shared by the in-memory caches.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+from ..utils.logging import setup_logging
+from ..utils.metrics import Counter, Gauge, Histogram
+
+logger = setup_logging()
+
+class FlushScheduler:
+    """
+    Runs a cache's flush coroutine from a single background task.
+
+    A flush is triggered when the buffered item count reaches ``batch_size``,
+    when the oldest buffered item is older than ``batch_timeout_sec``, or on
+    explicit request. Producers call ``notify`` (cheap and non-blocking) after
+    buffering items; async callers can ``await wait_for_capacity()`` to apply
+    backpressure once the buffer exceeds ``high_water_mark``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        flush: Callable[[], Awaitable[bool]],
+        depth: Callable[[], int],
+        batch_size: int,
+        batch_timeout_sec: float,
+        high_water_mark: int,
+        check_interval_sec: float = 60.0,
+        on_tick: Optional[Callable[[], None]] = None,
+        backpressure_timeout_sec: float = 5.0
+    ):
+        """
+        Initialize the scheduler.
+
+        Args:
+            name: Name used in logs and metric names
+            flush: Coroutine function that flushes the buffer and returns success
+            depth: Returns the number of buffered items
+            batch_size: Flush once this many items are buffered
+            batch_timeout_sec: Flush once the oldest buffered item is this old
+            high_water_mark: Buffer size above which producers are throttled
+            check_interval_sec: Maximum time between wake-ups
+            on_tick: Optional callback run on every wake-up (e.g. eviction)
+            backpressure_timeout_sec: Longest a producer waits for capacity
+        """
+        self.name = name
+        self._flush = flush
+        self._depth = depth
+        self.batch_size = batch_size
+        self.batch_timeout_sec = batch_timeout_sec
+        self.high_water_mark = high_water_mark
+        self.check_interval_sec = check_interval_sec
+        self.on_tick = on_tick
+        self.backpressure_timeout_sec = backpressure_timeout_sec
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._capacity: Optional[asyncio.Event] = None
+        self._explicit_waiters: list = []
+        self._pending_since: Optional[float] = None  # When the oldest unflushed item was buffered
+        self._wake_pending = False  # A wake-up was requested and not yet handled
+        self._stopping = False
+
+        # Metrics
+        self.flush_duration = Histogram(f"{name}_flush_duration_seconds", "Time spent in one flush")
+        self.flushes = Counter(f"{name}_flushes_total", "Completed flushes")
+        self.flush_failures = Counter(f"{name}_flush_failures_total", "Flushes that reported failure")
+        self.throttled = Counter(f"{name}_backpressure_waits_total", "Producers delayed by backpressure")
+        self.queue_depth = Gauge(f"{name}_queue_depth", "Records waiting for a flush", fn=depth)
+        self.flush_lag = Gauge(f"{name}_flush_lag_seconds", "Age of the oldest unflushed record", fn=self.get_flush_lag)
+        self.last_flush_time = time.time()
+
+    def start(self) -> bool:
+        """
+        Start the background task on the running event loop.
+
+        Returns:
+            bool: True if the scheduler is running, False if there is no running loop yet
+        """
+        if self._task is not None and not self._task.done():
+            return True
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        self._wakeup = asyncio.Event()
+        self._capacity = asyncio.Event()
+        self._capacity.set()
+        self._stopping = False
+        self._task = self._loop.create_task(self._run())
+        return True
+
+    def notify(self) -> None:
+        """Tell the scheduler items were buffered. Never blocks."""
+        first_pending = self._pending_since is None
+        if first_pending:
+            self._pending_since = time.time()
+        if self._task is None and not self.start():
+            return  # No event loop yet; the first call from inside the loop starts it
+
+        depth = self._depth()
+        if depth >= self.high_water_mark:
+            self._capacity.clear()
+        # Also wake on the first pending item so the age deadline is armed
+        if (first_pending or depth >= self.batch_size) and not self._wake_pending:
+            self._set_wakeup()
+
+    def _set_wakeup(self) -> None:
+        """Wake the background task, from the loop thread or any other thread."""
+        self._wake_pending = True
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._wakeup.set()
+        else:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def request_flush(self, wait: bool = True) -> bool:
+        """
+        Ask for an immediate flush.
+
+        Args:
+            wait: Wait for the flush to finish and return its result
+
+        Returns:
+            bool: Result of the flush (True if not waiting)
+        """
+        if not self.start():
+            raise RuntimeError("FlushScheduler requires a running event loop")
+        future = self._loop.create_future()
+        self._explicit_waiters.append(future)
+        self._wakeup.set()
+        if not wait:
+            return True
+        return await future
+
+    async def wait_for_capacity(self) -> None:
+        """Wait until the buffer is below the high-water mark (bounded by backpressure_timeout_sec)."""
+        if self._capacity is None or self._capacity.is_set():
+            return
+        self.throttled.inc()
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(self._capacity.wait(), timeout=self.backpressure_timeout_sec)
+        except asyncio.TimeoutError:
+            logger.warning("%s: buffer still above high-water mark, continuing without waiting", self.name)
+
+    def _next_timeout(self) -> float:
+        """Seconds until the next age-based flush or periodic check."""
+        timeout = self.check_interval_sec
+        if self._pending_since is not None:
+            age_deadline = self._pending_since + self.batch_timeout_sec - time.time()
+            timeout = min(timeout, max(age_deadline, 0.0))
+        return timeout
+
+    async def _run(self) -> None:
+        """Background loop: wait for a trigger, then flush."""
+        while not self._stopping:
+            try:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self._next_timeout())
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                self._wake_pending = False
+                if self._stopping:
+                    break
+
+                if self.on_tick is not None:
+                    self.on_tick()
+
+                waiters, self._explicit_waiters = self._explicit_waiters, []
+                depth = self._depth()
+                aged = (self._pending_since is not None and
+                        time.time() - self._pending_since >= self.batch_timeout_sec)
+                if waiters or depth >= self.batch_size or (depth and aged) or depth >= self.high_water_mark:
+                    result = await self._run_flush()
+                else:
+                    result = False
+                    if not depth:
+                        self._pending_since = None
+
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_result(result)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error("Error in %s flush scheduler: %s", self.name, e)
+                await asyncio.sleep(1)
+
+    async def _run_flush(self) -> bool:
+        """Run one flush and update metrics and backpressure state."""
+        started = time.perf_counter()
+        try:
+            success = await self._flush()
+        except Exception as e:
+            logger.error("%s flush failed: %s", self.name, e)
+            success = False
+        self.flush_duration.observe(time.perf_counter() - started)
+        self.flushes.inc()
+        if success:
+            self.last_flush_time = time.time()
+        else:
+            self.flush_failures.inc()
+
+        depth = self._depth()
+        if depth == 0:
+            self._pending_since = None
+        elif success:
+            # Items buffered during the flush are at most this old
+            self._pending_since = time.time()
+        if depth < self.high_water_mark:
+            self._capacity.set()
+        return success
+
+    def get_flush_lag(self) -> float:
+        """Seconds the oldest unflushed item has been waiting (0 if nothing is pending)."""
+        if self._pending_since is None:
+            return 0.0
+        return time.time() - self._pending_since
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get queue depth, flush lag and flush counters."""
+        return {
+            "queue_depth": self._depth(),
+            "flush_lag_seconds": self.get_flush_lag(),
+            "flushes": self.flushes.value,
+            "flush_failures": self.flush_failures.value,
+            "backpressure_waits": self.throttled.value,
+            "flush_duration_seconds": self.flush_duration.snapshot()
+        }
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """
+        Stop the background task, letting an in-progress flush finish first.
+        Does not flush; callers do their own final flush.
+        """
+        self._stopping = True
+        if self._task is not None:
+            self._wakeup.set()
+            try:
+                await asyncio.wait_for(self._task, timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.warning("%s flush did not finish within %ss, cancelled", self.name, timeout)
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for waiter in self._explicit_waiters:
+            if not waiter.done():
+                waiter.cancel()
+        self._explicit_waiters = []
@@ -1,14 +1,17 @@
 """
 LLM Cache module for storing LLM prompts and responses.
 """
-from typing import List
+from typing import Any, Dict, List, Optional
+import itertools
 import time
 import threading
-import asyncio
-import signal
-from ..utils.logging import setup_logging
+import uuid
+from ..utils.logging import setup_logging, SAMPLED
 from ..schemas.game import LLMInteraction
 from ..repositories import Storage
+from ..config.database import STORAGE_CONFIG, WAL_CONFIG
+from .flush_scheduler import FlushScheduler
+from .wal import WriteAheadLog
 
 logger = setup_logging()
 
@@ -16,14 +19,17 @@ class LLMCache:
     def __init__(
         self,
         storage: Storage,
-        batch_size: int = 100,            # Flush buffer after 100 records
-        batch_timeout_sec: int = 300      # Flush buffer after 5 minutes max
+        batch_size: int = STORAGE_CONFIG["batch_size"],            # Flush buffer after 100 records
+        batch_timeout_sec: int = STORAGE_CONFIG["batch_timeout_sec"],  # Flush buffer after 5 minutes max
+        high_water_mark: int = STORAGE_CONFIG["high_water_mark"],  # Throttle producers above this buffer size
+        wal_name: Optional[str] = None  # Log interactions to this write-ahead log (None: memory only)
     ):
         # Storage instance
         self.storage = storage
         
         # Buffer for storing LLM interactions
         self.buffer: List[LLMInteraction] = []
+        self.buffer_keys: List[str] = []  # WAL key of each buffered interaction
         self.buffer_size = 0
         self.batch_size = batch_size
         self.batch_timeout_sec = batch_timeout_sec
@@ -32,93 +38,76 @@ class LLMCache:
         # Thread safety
         self.lock = threading.RLock()
         self._flush_lock = threading.Lock()  # Lock for flush operations
-        self._is_flushing = False  # Flag to track if a flush is in progress
-        self._flush_event = threading.Event()  # Event to signal flush completion
-        self._shutdown_event = threading.Event()  # Event to signal shutdown
         
-        # Start background flush task
-        self._start_background_flush()
+        # Background flushing on the event loop; started lazily if there is
+        # no running loop yet
+        self.scheduler = FlushScheduler(
+            name="llm_cache",
+            flush=self.execute_batch_flush,
+            depth=lambda: self.buffer_size,
+            batch_size=batch_size,
+            batch_timeout_sec=batch_timeout_sec,
+            high_water_mark=high_water_mark,
+            check_interval_sec=STORAGE_CONFIG["flush_check_interval_sec"]
+        )
+        self.scheduler.start()
         
-        # Register shutdown handler
-        self._register_shutdown_handler()
-    
-    def _register_shutdown_handler(self):
-        """Register signal handlers for graceful shutdown"""
-        def signal_handler(signum, frame):
-            logger.info(f"Received signal {signum}, initiating graceful shutdown...")
-            self._shutdown_event.set()
-            # Wait for flush to complete
-            self._flush_event.wait(timeout=10)  # Wait up to 10 seconds
-            logger.info("Shutdown complete")
-        
-        # Register handlers for common termination signals
-        signal.signal(signal.SIGTERM, signal_handler)
-        signal.signal(signal.SIGINT, signal_handler)
+        # Interactions are logged before add_interaction returns and replayed
+        # after a crash
+        self._key_prefix = uuid.uuid4().hex[:12]
+        self._key_counter = itertools.count()
+        self.wal: Optional[WriteAheadLog] = None
+        if wal_name and WAL_CONFIG["enabled"]:
+            self.wal = WriteAheadLog(
+                WAL_CONFIG["dir"],
+                wal_name,
+                segment_max_bytes=WAL_CONFIG["segment_max_bytes"],
+                fsync_interval_sec=WAL_CONFIG["fsync_interval_sec"]
+            )
+            self._replay_wal()
     
-    def _start_background_flush(self):
-        """Start background task for periodic buffer flushing"""
-        async def periodic_flush():
-            while not self._shutdown_event.is_set():
-                try:
-                    await asyncio.sleep(60)  # Check every minute
-                    if self._check_batch_flush():
-                        await self.execute_batch_flush()
-                except asyncio.CancelledError:
-                    logger.info("Background flush task cancelled")
-                    break
-                except Exception as e:
-                    logger.error(f"Error in background flush task: {str(e)}")
-            
-            # Final flush before shutdown
-            if self.buffer:
-                logger.info("Performing final flush before shutdown...")
+    def _replay_wal(self) -> None:
+        """Load interactions left in the write-ahead log into the buffer"""
+        with self.lock:
+            for key, payload in self.wal.replay():
                 try:
-                    await self.execute_batch_flush()
+                    interaction = LLMInteraction.model_validate_json(payload)
                 except Exception as e:
-                    logger.error(f"Error during final flush: {str(e)}")
+                    logger.error("Skipping unreadable WAL record %s: %s", key, e)
+                    self.wal.release([key])
+                    continue
+                self.buffer.append(interaction)
+                self.buffer_keys.append(key)
+                self.buffer_size += 1
+            replayed = self.buffer_size
         
-        # Create and start the background task
-        loop = asyncio.get_event_loop()
-        self._flush_task = loop.create_task(periodic_flush())
+        if replayed:
+            logger.info("Replayed %s unflushed LLM interactions from the WAL", replayed)
+            self.scheduler.notify()
     
-    def add_interaction(
-        self, 
-        prompt: str, 
-        response: str,
-        model_name: str,
-        session_id: str,
-        game_id: str,
-        user_id: str = None,
-        metadata: dict = None
-    ) -> None:
+    def add_interaction(self, interaction: LLMInteraction) -> None:
         """
         Add a LLM interaction to the buffer
         
         Args:
-            prompt: The prompt sent to LLM
-            response: The response received from LLM
-            model_name: Name of the LLM model used
-            session_id: Associated game session ID
-            game_id: Associated game ID
-            user_id: Associated user ID
-            metadata: Additional metadata about the interaction
+            interaction: LLMInteraction record built by the LLM service
         """
+        key = f"{self._key_prefix}-{next(self._key_counter)}"
+        payload = interaction.model_dump_json().encode("utf-8") if self.wal is not None else None
         with self.lock:
-            # Create interaction record
-            interaction = LLMInteraction(
-                prompt=prompt,
-                response=response,
-                model_name=model_name,
-                session_id=session_id,
-                game_id=game_id,
-                user_id=user_id,
-                metadata=metadata or {}
-            )
+            if payload is not None:
+                self.wal.append(key, payload)
             
             # Add to buffer
             self.buffer.append(interaction)
+            self.buffer_keys.append(key)
             self.buffer_size += 1
-            logger.debug(f"Added LLM interaction to buffer, current size: {self.buffer_size}")
+            logger.debug("Added LLM interaction to buffer, current size: %s", self.buffer_size, extra=SAMPLED)
+        self.scheduler.notify()
+    
+    async def wait_for_capacity(self) -> None:
+        """Wait while the buffer is above the high-water mark"""
+        await self.scheduler.wait_for_capacity()
     
     def _check_batch_flush(self) -> bool:
         """Check if buffer should be flushed"""
@@ -145,64 +134,53 @@ class LLMCache:
                 
                 # Create a copy of the buffer to flush
                 buffer_copy = self.buffer.copy()
+                keys_copy = self.buffer_keys.copy()
                 buffer_size = self.buffer_size
                 
                 # Clear the original buffer immediately
                 self.buffer.clear()
+                self.buffer_keys.clear()
                 self.buffer_size = 0
                 self.last_flush_time = time.time()
             
             # Convert LLMInteraction objects to dictionaries
-            batch_data = [record.model_dump() for record in buffer_copy]
-            logger.info(f"Executing LLM batch flush with {len(batch_data)} records")
+            batch_data = [record.model_dump(mode="json") for record in buffer_copy]
+            logger.info("Executing LLM batch flush with %s records", len(batch_data))
             
             try:
                 # Execute batch write using storage instance
-                tasks = []
-                for data in batch_data:
-                    tasks.append(self.storage.save_llm_interaction(data))
-                
-                # Run all save operations concurrently
-                results = await asyncio.gather(*tasks)
-                
-                # Check if all saves were successful
-                success = all(results)
+                success = await self.storage.save_llm_interactions_batch(batch_data)
                 if success:
                     logger.info("LLM batch flush completed successfully")
+                    if self.wal is not None:
+                        # Flushed interactions no longer need their log entries
+                        self.wal.release(keys_copy)
                 else:
                     logger.error("Some LLM saves failed during batch flush")
                     # If any save failed, restore the data to buffer
                     with self.lock:
-                        self.buffer.extend(buffer_copy)
-                        self.buffer_size = buffer_size
+                        self.buffer[:0] = buffer_copy
+                        self.buffer_keys[:0] = keys_copy
+                        self.buffer_size += buffer_size
             except Exception as e:
                 success = False
-                logger.error(f"LLM storage flush failed: {str(e)}")
+                logger.error("LLM storage flush failed: %s", e)
                 # If failed, restore the data to buffer
                 with self.lock:
-                    self.buffer.extend(buffer_copy)
-                    self.buffer_size = buffer_size
+                    self.buffer[:0] = buffer_copy
+                    self.buffer_keys[:0] = keys_copy
+                    self.buffer_size += buffer_size
             
             return success
         finally:
             self._flush_lock.release()
-            self._flush_event.set()  # Signal that flush is complete
 
     async def shutdown(self):
         """Gracefully shutdown the cache, ensuring all data is saved"""
         logger.info("Initiating LLM cache shutdown...")
-        self._shutdown_event.set()
         
-        # Cancel the background flush task
-        if hasattr(self, '_flush_task'):
-            self._flush_task.cancel()
-            try:
-                await self._flush_task
-            except asyncio.CancelledError:
-                pass
-        
-        # Wait for any ongoing flush to complete
-        self._flush_event.wait(timeout=10)  # Wait up to 10 seconds
+        # Stop the flush scheduler, letting an in-progress flush finish
+        await self.scheduler.stop()
         
         # Final flush of any remaining data
         if self.buffer:
@@ -210,15 +188,20 @@ class LLMCache:
             try:
                 await self.execute_batch_flush()
             except Exception as e:
-                logger.error(f"Error during final flush: {str(e)}")
+                logger.error("Error during final flush: %s", e)
         
+        if self.wal is not None:
+            self.wal.close()
         logger.info("LLM cache shutdown complete")
     
     async def reset(self):
         """Reset all cache data asynchronously"""
         with self.lock:
             self.buffer.clear()
+            self.buffer_keys.clear()
             self.buffer_size = 0
+            if self.wal is not None:
+                self.wal.truncate()
             self.last_flush_time = time.time() 
             
 #--------------------------------temporary functions--------------------------------
@@ -230,11 +213,15 @@ class LLMCache:
                 return False
             
             logger.info("Force flushing all LLM records")
-            return await self.execute_batch_flush()
+        return await self.scheduler.request_flush()
     
     def get_buffer_size(self) -> int:
         """Get the number of records in the buffer"""
         with self.lock:
             return self.buffer_size
     
+    def get_flush_stats(self) -> Dict[str, Any]:
+        """Get flush queue depth, flush lag and flush counters"""
+        return self.scheduler.get_metrics()
+    
     
\ No newline at end of file
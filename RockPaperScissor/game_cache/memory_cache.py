@@ -1,142 +1,195 @@
-from collections import defaultdict, deque
 import time
-from typing import Any, Optional, Dict
-from ..schemas.game import GameData, GameRecord
+from typing import Any, Optional, Dict, List
+from ..schemas.game import GameData
 import threading
 import asyncio
-import signal
 from ..utils import setup_logging
+from ..utils.metrics import Gauge
 from ..repositories import Storage
+from ..config.game import SESSION_CACHE_CONFIG
+from ..config.database import STORAGE_CONFIG, WAL_CONFIG
+from .expiry_wheel import ExpiryWheel
+from .flush_scheduler import FlushScheduler
+from .wal import WriteAheadLog
 
 
 logger = setup_logging()
 
+class _CacheShard:
+    """One lock-striped partition of the session cache."""
+    __slots__ = ("lock", "sessions", "expiry", "buffer")
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        # Most recent record of each session in this shard
+        self.sessions: Dict[Any, GameData] = {}
+        # Last update time of each session, bucketed for O(expired) eviction
+        self.expiry = ExpiryWheel()
+        # Records waiting to be flushed, keyed by game_id
+        self.buffer: Dict[str, GameData] = {}
+
+    def move_to_buffer(self, session_id: Any) -> Optional[GameData]:
+        """Move a session's pending record to the flush buffer (lock must be held)."""
+        record = self.sessions.pop(session_id, None)
+        if record is not None:
+            self.buffer[record.game_id] = record
+        return record
+
 class GameSessionCache:
     def __init__(
         self, 
         storage: Storage,
-        max_age_sec: int = 300,           # Flush session records after 5 minutes max
-        batch_size: int = 100,            # Flush buffer after 100 total records
-        batch_timeout_sec: int = 300       # Flush buffer after 5 minute max
+        max_age_sec: int = SESSION_CACHE_CONFIG["max_age_sec"],  # Flush session records after 5 minutes max
+        batch_size: int = STORAGE_CONFIG["batch_size"],            # Flush buffer after 100 total records
+        batch_timeout_sec: int = STORAGE_CONFIG["batch_timeout_sec"],  # Flush buffer after 5 minute max
+        num_shards: int = SESSION_CACHE_CONFIG["num_shards"],  # Independent lock/buffer partitions
+        high_water_mark: int = STORAGE_CONFIG["high_water_mark"],  # Throttle producers above this buffer size
+        wal_name: Optional[str] = None  # Log records to this write-ahead log (None: memory only)
     ):
         # Storage instance
         self.storage = storage
         
-        # Session-level storage - just keep the most recent records
-        self.session_queues = defaultdict(deque)
-        self.session_last_update = defaultdict(time.time)  # Track last update time for each session
+        # Session-level storage, sharded by session_id so concurrent sessions
+        # rarely contend on the same lock
+        self.num_shards = max(1, num_shards)
+        self.shards: List[_CacheShard] = [_CacheShard() for _ in range(self.num_shards)]
         
         # Configuration parameters
         self.max_age_sec = max_age_sec
         
-        # Buffer for storing game records
-        self.buffer: Dict[str, GameRecord] = {}
-        self.buffer_size = 0
+        # Flush configuration (each shard keeps its own buffer)
         self.batch_size = batch_size
         self.batch_timeout_sec = batch_timeout_sec
         self.last_flush_time = time.time()
         
         # Thread safety
-        self.lock = threading.RLock()
         self._flush_lock = threading.Lock()  # Lock for flush operations
-        self._is_flushing = False  # Flag to track if a flush is in progress
-        self._flush_event = threading.Event()  # Event to signal flush completion
-        self._shutdown_event = threading.Event()  # Event to signal shutdown
         
-        # Start background flush task
-        self._start_background_flush()
+        # Background flushing on the event loop; started lazily if there is
+        # no running loop yet
+        self.scheduler = FlushScheduler(
+            name="game_session_cache",
+            flush=self.execute_batch_flush,
+            depth=self._buffered_count,
+            batch_size=batch_size,
+            batch_timeout_sec=batch_timeout_sec,
+            high_water_mark=high_water_mark,
+            check_interval_sec=STORAGE_CONFIG["flush_check_interval_sec"],
+            on_tick=self.clean_inactive_sessions
+        )
+        self.scheduler.start()
         
-        # Register shutdown handler
-        self._register_shutdown_handler()
-    
-    def _register_shutdown_handler(self):
-        """Register signal handlers for graceful shutdown"""
-        def signal_handler(signum, frame):
-            logger.info(f"Received signal {signum}, initiating graceful shutdown...")
-            self._shutdown_event.set()
-            # Wait for flush to complete
-            self._flush_event.wait(timeout=10)  # Wait up to 10 seconds
-            logger.info("Shutdown complete")
+        # Metrics (flush depth, lag and duration are tracked by the scheduler)
+        self.session_gauge = Gauge("game_session_cache_sessions", "Active sessions in the session cache",
+                                   fn=self.get_session_count)
         
-        # Register handlers for common termination signals
-        signal.signal(signal.SIGTERM, signal_handler)
-        signal.signal(signal.SIGINT, signal_handler)
+        # Every record is logged before add_record returns, so records not yet
+        # flushed survive a crash and are replayed here
+        self.wal: Optional[WriteAheadLog] = None
+        if wal_name and WAL_CONFIG["enabled"]:
+            self.wal = WriteAheadLog(
+                WAL_CONFIG["dir"],
+                wal_name,
+                segment_max_bytes=WAL_CONFIG["segment_max_bytes"],
+                fsync_interval_sec=WAL_CONFIG["fsync_interval_sec"]
+            )
+            self._replay_wal()
     
-    def _start_background_flush(self):
-        """Start background task for periodic buffer flushing"""
-        async def periodic_flush():
-            while not self._shutdown_event.is_set():
-                try:
-                    await asyncio.sleep(60)  # Check every minute
-                    if self._check_batch_flush():
-                        await self.execute_batch_flush()
-                except asyncio.CancelledError:
-                    logger.info("Background flush task cancelled")
-                    break
-                except Exception as e:
-                    logger.error(f"Error in background flush task: {str(e)}")
-            
-            # Final flush before shutdown
-            if self.buffer or any(self.session_queues.values()):
-                logger.info("Performing final flush before shutdown...")
-                try:
-                    # Move all session records to buffer
-                    with self.lock:
-                        for session_id, queue in list(self.session_queues.items()):
-                            if queue:
-                                for record in list(queue):
-                                    self.buffer[record.game_id] = record
-                                    self.buffer_size += 1
-                                queue.clear()
-                    
-                    # Execute final flush
-                    if self.buffer:
-                        await self.execute_batch_flush()
-                except Exception as e:
-                    logger.error(f"Error during final flush: {str(e)}")
+    def _shard(self, session_id: Any) -> _CacheShard:
+        """Get the shard responsible for a session."""
+        return self.shards[hash(session_id) % self.num_shards]
+    
+    def _replay_wal(self) -> None:
+        """Load records left in the write-ahead log into the flush buffers"""
+        replayed = 0
+        for game_id, payload in self.wal.replay():
+            try:
+                record = GameData.model_validate_json(payload)
+            except Exception as e:
+                logger.error("Skipping unreadable WAL record %s: %s", game_id, e)
+                self.wal.release([game_id])
+                continue
+            shard = self._shard(record.session_id)
+            with shard.lock:
+                shard.buffer[game_id] = record
+            replayed += 1
         
-        # Create and start the background task
-        loop = asyncio.get_event_loop()
-        self._flush_task = loop.create_task(periodic_flush())
+        if replayed:
+            logger.info("Replayed %s unflushed game records from the WAL", replayed)
+            self.scheduler.notify()
     
     def add_record(self, session_id: Any, record: GameData) -> None:
         """
         Add a game record to the specified session's cache
         """
-        with self.lock:
+        payload = record.model_dump_json().encode("utf-8") if self.wal is not None else None
+        shard = self._shard(session_id)
+        with shard.lock:
+            if payload is not None:
+                self.wal.append(record.game_id, payload)
+            
             # Update session's last update time
-            self.session_last_update[session_id] = time.time()
+            shard.expiry.touch(session_id, time.time())
             
             # If there's already a record for this session, move it to flush buffer
-            if session_id in self.session_queues and self.session_queues[session_id]:
-                old_record = self.session_queues[session_id][0]
-                self.buffer[old_record.game_id] = old_record  # Only store GameData
-                self.buffer_size += 1
-                logger.debug(f"Moving old record to flush buffer for session {session_id}")
-                self.session_queues[session_id].clear()  # Clear existing record
+            buffered = shard.move_to_buffer(session_id) is not None
             
-            # Add new record to session queue
-            self.session_queues[session_id].append(record)
-            logger.debug(f"Added new record to session {session_id}")
+            # Keep the new record as the session's latest
+            shard.sessions[session_id] = record
+        
+        if buffered:
+            self.scheduler.notify()
+    
+    def _buffered_count(self) -> int:
+        """Approximate buffer size without taking the shard locks (hot path)"""
+        return sum(len(shard.buffer) for shard in self.shards)
+    
+    async def wait_for_capacity(self) -> None:
+        """Wait while the flush buffer is above the high-water mark"""
+        await self.scheduler.wait_for_capacity()
     
     def _check_batch_flush(self) -> bool:
         """Check if batch buffer should be flushed"""
         time_passed = time.time() - self.last_flush_time
-        return (self.buffer_size >= self.batch_size or 
-               (self.buffer and time_passed >= self.batch_timeout_sec))
+        buffer_size = self.get_buffer_size()
+        return (buffer_size >= self.batch_size or 
+               (buffer_size > 0 and time_passed >= self.batch_timeout_sec))
     
     def get_latest_record(self, session_id: Any) -> Optional[GameData]:
         """Get the most recent record for a session"""
-        with self.lock:
-            if session_id in self.session_queues and self.session_queues[session_id]:
-                return self.session_queues[session_id][-1]
-            return None
+        shard = self._shard(session_id)
+        with shard.lock:
+            return shard.sessions.get(session_id)
+    
+    def _move_all_sessions_to_buffer(self) -> None:
+        """Move every session's pending record to its shard's flush buffer"""
+        for shard in self.shards:
+            with shard.lock:
+                for session_id in list(shard.sessions):
+                    shard.move_to_buffer(session_id)
+                    shard.expiry.remove(session_id)
     
+    def _take_buffers(self) -> Dict[str, GameData]:
+        """Detach and return the flush buffers of all shards"""
+        taken: Dict[str, GameData] = {}
+        for shard in self.shards:
+            with shard.lock:
+                if shard.buffer:
+                    taken.update(shard.buffer)
+                    shard.buffer = {}
+        return taken
+    
+    def _restore_buffers(self, records: Dict[str, GameData]) -> None:
+        """Put records back into their shards' buffers after a failed flush"""
+        for game_id, record in records.items():
+            shard = self._shard(record.session_id)
+            with shard.lock:
+                shard.buffer.setdefault(game_id, record)
     
     async def execute_batch_flush(self) -> bool:
         """
-        Execute batch flush operation using the storage instance.
-        This method is synchronous but internally uses async storage operations.
+        Write the flush buffers of all shards to storage.
+        Runs on the event loop, normally from the flush scheduler.
         """
         # First check if a flush is already in progress
         if not self._flush_lock.acquire(blocking=False):
@@ -144,65 +197,38 @@ class GameSessionCache:
             return False
 
         try:
-            with self.lock:
-                if not self.buffer:
-                    return False
-                
-                # Create a copy of the buffer to flush
-                buffer_copy = self.buffer.copy()
-                buffer_size = self.buffer_size
-                
-                # Clear the original buffer immediately
-                self.buffer.clear()
-                self.buffer_size = 0
-                self.last_flush_time = time.time()
+            # Detach the buffers of all shards
+            buffer_copy = self._take_buffers()
+            if not buffer_copy:
+                return False
+            self.last_flush_time = time.time()
             
-            # Convert GameData objects to dictionaries
-            batch_data = [record.model_dump() for record in buffer_copy.values()]
-            logger.info(f"Executing batch flush with {len(batch_data)} records")
+            # Convert GameData objects to JSON-compatible dictionaries
+            batch_data = [record.model_dump(mode="json") for record in buffer_copy.values()]
+            logger.info("Executing batch flush with %s records", len(batch_data))
             
             try:
-                # Create a new event loop for async operations
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                
-                # Execute batch write using storage instance
-                async def save_all():
-                    tasks = []
-                    for data in batch_data:
-                        tasks.append(self.storage.save_game_record(data))
-                    return await asyncio.gather(*tasks)
-                
-                # Run all save operations concurrently
-                results = loop.run_until_complete(save_all())
-                loop.close()
-                
-                # Check if all saves were successful
-                success = all(results)
+                # Write the whole flush as one batch
+                success = await self.storage.save_game_rounds_batch(batch_data)
                 if success:
                     logger.info("Batch flush completed successfully")
+                    if self.wal is not None:
+                        # Storage only reports success once the rounds are
+                        # committed, so their log entries are no longer needed
+                        self.wal.release(buffer_copy.keys())
                 else:
                     logger.error("Some saves failed during batch flush")
                     # If any save failed, restore the data to buffer
-                    with self.lock:
-                        self.buffer.update(buffer_copy)
-                        self.buffer_size = buffer_size
+                    self._restore_buffers(buffer_copy)
             except Exception as e:
                 success = False
-                logger.error(f"Storage flush failed: {str(e)}")
+                logger.error("Storage flush failed: %s", e)
                 # If failed, restore the data to buffer
-                with self.lock:
-                    self.buffer.update(buffer_copy)
-                    self.buffer_size = buffer_size
-            
-            # Clean up inactive sessions after successful flush
-            if success:
-                self.clean_inactive_sessions()
+                self._restore_buffers(buffer_copy)
             
             return success
         finally:
             self._flush_lock.release()
-            self._flush_event.set()  # Signal that flush is complete
     
     def move_session_to_buffer(self, session_id: Any) -> bool:
         """
@@ -215,132 +241,109 @@ class GameSessionCache:
         Returns:
             bool: True if session data was moved, False if no data to move
         """
-        with self.lock:
-            if session_id not in self.session_queues or not self.session_queues[session_id]:
-                logger.debug(f"No records to move to buffer for session {session_id}")
+        shard = self._shard(session_id)
+        with shard.lock:
+            if shard.move_to_buffer(session_id) is None:
+                logger.debug("No records to move to buffer for session %s", session_id)
                 return False
             
-            # Get the record for this session
-            record = self.session_queues[session_id][0]
-            logger.info(f"Moving session {session_id} data to flush buffer")
-            
-            # Move it to flush buffer
-            self.buffer[record.game_id] = record  # Only store GameData
-            self.buffer_size += 1
-            
-            # Clear the session queue
-            self.session_queues[session_id].clear()
-            
+            logger.info("Moving session %s data to flush buffer", session_id)
+            shard.expiry.remove(session_id)
             return True
     
     def clean_inactive_sessions(self):
-        """Remove session data for inactive sessions based on last update time"""
-        with self.lock:
-            current_time = time.time()
-            inactive_sessions = []
-            
-            # First collect all inactive sessions
-            for session_id, last_update in list(self.session_last_update.items()):
-                if current_time - last_update > self.max_age_sec:
-                    inactive_sessions.append(session_id)
-            
-            if inactive_sessions:
-                logger.info(f"Cleaning {len(inactive_sessions)} inactive sessions")
-                # Then remove them in a single operation
-                for session_id in inactive_sessions:
-                    self.session_queues.pop(session_id, None)
-                    self.session_last_update.pop(session_id, None)
-                logger.debug(f"Cleaned sessions: {inactive_sessions}")
+        """
+        Evict sessions that have not been updated for max_age_sec.
+
+        Only expired sessions are visited. Their pending record is moved to the
+        flush buffer so it is persisted with the next flush.
+        """
+        cutoff = time.time() - self.max_age_sec
+        cleaned = 0
+        for shard in self.shards:
+            with shard.lock:
+                for session_id in shard.expiry.pop_expired(cutoff):
+                    shard.move_to_buffer(session_id)
+                    cleaned += 1
+        
+        if cleaned:
+            logger.info("Cleaned %s inactive sessions", cleaned)
 
 #--------------------------------temporary functions--------------------------------
 
-    def check_and_flush(self) -> bool:
+    async def check_and_flush(self) -> bool:
         """
         Check if batch flush is needed and execute if necessary
         Suitable for calling from a scheduled task
         """
-        with self.lock:
-            if self._check_batch_flush():
-                return self.execute_batch_flush()
-            return False
+        if self._check_batch_flush():
+            return await self.scheduler.request_flush()
+        return False
     
-    def force_flush_all(self) -> bool:
+    async def force_flush_all(self) -> bool:
         """Force flush all data (all sessions and buffer)"""
-        with self.lock:
-            logger.info("Force flushing all sessions")
-            # Move all session records to flush buffer
-            for session_id, queue in list(self.session_queues.items()):
-                if queue:
-                    for record in list(queue):
-                        self.buffer[record.game_id] = record
-                        self.buffer_size += 1
-                    
-                    queue.clear()
-            
-            # Execute batch flush if buffer has data
-            if self.buffer:
-                return self.execute_batch_flush()
-            logger.debug("No records to flush")
+        logger.info("Force flushing all sessions")
+        # Move all session records to flush buffer
+        self._move_all_sessions_to_buffer()
+        
+        # Execute batch flush if buffer has data
+        if self.get_buffer_size():
+            return await self.scheduler.request_flush()
+        logger.debug("No records to flush")
         return False
     
     def get_session_count(self) -> int:
         """Get the number of active sessions in cache"""
-        with self.lock:
-            return len(self.session_queues)
+        count = 0
+        for shard in self.shards:
+            with shard.lock:
+                count += len(shard.sessions)
+        return count
     
     def get_buffer_size(self) -> int:
         """Get the number of records in the flush buffer"""
-        with self.lock:
-            return self.buffer_size
+        size = 0
+        for shard in self.shards:
+            with shard.lock:
+                size += len(shard.buffer)
+        return size
+    
+    def get_flush_stats(self) -> Dict[str, Any]:
+        """Get flush queue depth, flush lag and flush counters"""
+        return self.scheduler.get_metrics()
     
     async def reset(self):
         """Reset all cache data"""
-        with self.lock:
-            self.session_queues.clear()
-            self.session_last_update.clear()
-            self.buffer.clear()
-            self.buffer_size = 0
-            self.last_flush_time = time.time()
+        for shard in self.shards:
+            with shard.lock:
+                shard.sessions.clear()
+                shard.expiry = ExpiryWheel()
+                shard.buffer = {}
+        if self.wal is not None:
+            self.wal.truncate()
+        self.last_flush_time = time.time()
 
     async def shutdown(self):
         """Gracefully shutdown the cache, ensuring all data is saved"""
         logger.info("Initiating cache shutdown...")
-        self._shutdown_event.set()
         
-        # Cancel the background flush task
-        if hasattr(self, '_flush_task'):
-            self._flush_task.cancel()
-            try:
-                await self._flush_task
-            except asyncio.CancelledError:
-                pass
-        
-        # Wait for any ongoing flush to complete
-        self._flush_event.wait(timeout=10)  # Wait up to 10 seconds
+        # Stop the flush scheduler, letting an in-progress flush finish
+        await self.scheduler.stop()
         
         # Final flush of all data
         logger.info("Performing final flush before shutdown...")
         try:
-            with self.lock:
-                # First, move all session records to buffer
-                for session_id, queue in list(self.session_queues.items()):
-                    if queue:
-                        for record in list(queue):
-                            self.buffer[record.game_id] = record
-                            self.buffer_size += 1
-                        queue.clear()
-                
-                # Also clean up any inactive sessions
-                self.clean_inactive_sessions()
+            # First, move all session records to buffer
+            self._move_all_sessions_to_buffer()
             
             # Execute final flush if buffer has data
-            if self.buffer:
-                await self.execute_batch_flush()
-            
-            logger.info("Final flush completed successfully")
+            if self.get_buffer_size() and not await self.execute_batch_flush():
+                logger.error("Final flush failed, unflushed records stay in the WAL")
+            else:
+                logger.info("Final flush completed successfully")
         except Exception as e:
-            logger.error(f"Error during final flush: {str(e)}")
+            logger.error("Error during final flush: %s", e)
         
+        if self.wal is not None:
+            self.wal.close()
         logger.info("Cache shutdown complete")
-
-    
\ No newline at end of file
@@ -0,0 +1,273 @@
+"""
+User state cache module for keeping decoded user model states in memory.
+"""
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import time
+import threading
+import asyncio
+from ..utils.logging import setup_logging
+from ..utils.metrics import Counter, Gauge, Histogram
+from ..models import get_ai, ModelState
+from ..repositories import Storage
+from ..config.game import USER_STATE_CACHE_CONFIG
+
+logger = setup_logging()
+
+class UserStateCache:
+    """
+    Bounded LRU of decoded user model states with write-behind persistence.
+
+    Reads fall through to ``storage.load_user_state`` on a miss or expired
+    entry; concurrent misses for the same user share one storage read, and at
+    most ``max_concurrent_loads`` reads run at once. Users without a saved
+    state can be rebuilt through ``rebuild`` (e.g. by replaying their stored
+    rounds); rebuilt states are marked dirty so they get saved. Every ``put`` marks the
+    user dirty; dirty users are written back to storage
+    in one batch per flush interval, so the database sees at most one write
+    per user per interval. Large flushes are encoded in a worker thread:
+    cached states are never modified after their round, so they can be
+    encoded while the loop keeps playing.
+    """
+
+    def __init__(
+        self,
+        storage: Storage,
+        max_size: int = USER_STATE_CACHE_CONFIG["max_size"],
+        ttl_sec: int = USER_STATE_CACHE_CONFIG["ttl_sec"],
+        flush_interval_sec: int = USER_STATE_CACHE_CONFIG["flush_interval_sec"],
+        max_concurrent_loads: int = USER_STATE_CACHE_CONFIG["max_concurrent_loads"],
+        encode_offload_threshold: int = USER_STATE_CACHE_CONFIG["encode_offload_threshold"],
+        rebuild: Optional[Callable[[str], Awaitable[Optional[Tuple[str, ModelState]]]]] = None
+    ):
+        # Storage instance
+        self.storage = storage
+
+        # user_id -> (model_name, model_state, loaded_at), least recently used first
+        self.entries: "OrderedDict[str, Tuple[str, ModelState, float]]" = OrderedDict()
+        self.max_size = max_size
+        self.ttl_sec = ttl_sec
+
+        # user_id -> (model_name, model_state) waiting to be written back
+        self.dirty: Dict[str, Tuple[str, ModelState]] = {}
+        # Dirty sets taken by flushes whose write has not committed yet
+        self._flushing: List[Dict[str, Tuple[str, ModelState]]] = []
+        self.flush_interval_sec = flush_interval_sec
+        self.encode_offload_threshold = encode_offload_threshold
+
+        # user_id -> in-progress storage read, shared by concurrent misses
+        self._loading: Dict[str, asyncio.Future] = {}
+        self.load_slots = asyncio.Semaphore(max_concurrent_loads)
+        # Fallback for users storage has no state for: user_id -> (model_name, model_state) or None
+        self.rebuild = rebuild
+
+        # Metrics
+        self.hits = Counter("user_state_cache_hits_total", "User state lookups served from memory")
+        self.misses = Counter("user_state_cache_misses_total", "User state lookups that read storage")
+        self.writes = Counter("user_state_cache_writes_total", "User states written back to storage")
+        self.load_latency = Histogram("user_state_load_seconds", "Time to load one user state from storage")
+        self.size = Gauge("user_state_cache_entries", "User states held in memory", fn=lambda: len(self.entries))
+        self.dirty_size = Gauge("user_state_cache_dirty", "User states waiting to be written back",
+                                fn=lambda: len(self.dirty))
+
+        # Thread safety
+        self.lock = threading.RLock()
+        self._shutdown_event = threading.Event()  # Event to signal shutdown
+
+        # Start background write-behind task
+        self._start_background_flush()
+
+    def _start_background_flush(self):
+        """Start background task for periodic write-behind"""
+        async def periodic_flush():
+            while not self._shutdown_event.is_set():
+                try:
+                    await asyncio.sleep(self.flush_interval_sec)
+                    await self.flush()
+                except asyncio.CancelledError:
+                    logger.info("User state flush task cancelled")
+                    break
+                except Exception as e:
+                    logger.error("Error in user state flush task: %s", e)
+
+        # Create and start the background task
+        loop = asyncio.get_event_loop()
+        self._flush_task = loop.create_task(periodic_flush())
+
+    async def get(self, user_id: str) -> Optional[Tuple[str, ModelState]]:
+        """
+        Get a user's model name and decoded state, reading storage on a miss.
+
+        Args:
+            user_id: User ID
+
+        Returns:
+            Tuple of (model_name, model_state) with a private copy of the state,
+            or None if the user has no saved state
+        """
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is not None:
+                model_name, model_state, loaded_at = entry
+                if time.monotonic() - loaded_at < self.ttl_sec or self._unflushed(user_id) is not None:
+                    self.entries.move_to_end(user_id)
+                    self.hits.inc()
+                    # The cached state may still be in use by another session
+                    return model_name, model_state.copy()
+                # Expired and already persisted, reload from storage
+                del self.entries[user_id]
+            else:
+                # Evicted before its write-back: storage doesn't have it yet
+                unflushed = self._unflushed(user_id)
+                if unflushed is not None:
+                    model_name, model_state = unflushed
+                    self._insert(user_id, model_name, model_state)
+                    self.hits.inc()
+                    return model_name, model_state.copy()
+
+        self.misses.inc()
+        loading = self._loading.get(user_id)
+        if loading is None:
+            loading = self._loading[user_id] = asyncio.ensure_future(self._load(user_id))
+            loading.add_done_callback(lambda _: self._loading.pop(user_id, None))
+        # Shield the shared read from the cancellation of any one caller
+        user_state = await asyncio.shield(loading)
+        if user_state is None:
+            return None
+        model_name, model_state = user_state
+        return model_name, model_state.copy()
+
+    async def _load(self, user_id: str) -> Optional[Tuple[str, ModelState]]:
+        """Read and decode one user's state from storage and cache it."""
+        rebuilt = None
+        async with self.load_slots:
+            started = time.perf_counter()
+            user_state = await self.storage.load_user_state(user_id)
+            if not user_state and self.rebuild is not None:
+                rebuilt = await self.rebuild(user_id)
+            self.load_latency.observe(time.perf_counter() - started)
+
+        if user_state:
+            model_name = user_state["model_name"]
+            model_state = get_ai(model_name).load_state(user_state["model_state"])
+        elif rebuilt:
+            model_name, model_state = rebuilt
+        else:
+            model_name = model_state = None
+
+        with self.lock:
+            # Another round may have updated the user while storage was read,
+            # and a state not yet written back is newer than storage's
+            unflushed = self._unflushed(user_id)
+            if user_id in self.entries:
+                model_name, model_state, _ = self.entries[user_id]
+            elif unflushed is not None:
+                model_name, model_state = unflushed
+                self._insert(user_id, model_name, model_state)
+            elif model_state is not None:
+                self._insert(user_id, model_name, model_state)
+                if rebuilt:
+                    self.dirty[user_id] = (model_name, model_state)
+            else:
+                return None
+            return model_name, model_state
+
+    def put(self, user_id: str, model_name: str, model_state: ModelState) -> None:
+        """
+        Update a user's cached state after a round and mark it for write-back.
+
+        Args:
+            user_id: User ID
+            model_name: Name of the AI model the state belongs to
+            model_state: The user's current model state
+        """
+        with self.lock:
+            self._insert(user_id, model_name, model_state)
+            self.dirty[user_id] = (model_name, model_state)
+
+    def _insert(self, user_id: str, model_name: str, model_state: ModelState) -> None:
+        """Insert or refresh an entry and evict least recently used entries."""
+        self.entries[user_id] = (model_name, model_state, time.monotonic())
+        self.entries.move_to_end(user_id)
+        while len(self.entries) > self.max_size:
+            # Evicted dirty states stay in self.dirty until the next flush;
+            # get() serves them from there
+            self.entries.popitem(last=False)
+
+    def _unflushed(self, user_id: str) -> Optional[Tuple[str, ModelState]]:
+        """A user's state not yet committed to storage, if any (lock must be held)."""
+        entry = self.dirty.get(user_id)
+        if entry is None:
+            # Newest flush first
+            for flushing in reversed(self._flushing):
+                entry = flushing.get(user_id)
+                if entry is not None:
+                    break
+        return entry
+
+    @staticmethod
+    def _encode_states(dirty: Dict[str, Tuple[str, ModelState]]) -> List[Tuple[str, str, bytes]]:
+        """Encode dirty states as (user_id, model_name, encoded state) rows."""
+        return [(user_id, model_name, model_state.encode())
+                for user_id, (model_name, model_state) in dirty.items()]
+
+    async def flush(self) -> int:
+        """
+        Write all dirty user states back to storage in one batch.
+
+        Returns:
+            int: Number of user states written (0 if the batch failed; its
+            states stay dirty for the next flush)
+        """
+        with self.lock:
+            if not self.dirty:
+                return 0
+            dirty, self.dirty = self.dirty, {}
+            # Still served to readers until the write commits
+            self._flushing.append(dirty)
+
+        try:
+            if len(dirty) >= self.encode_offload_threshold:
+                rows = await asyncio.to_thread(self._encode_states, dirty)
+            else:
+                rows = self._encode_states(dirty)
+            saved = await self.storage.save_user_states_batch(rows)
+        except Exception as e:
+            logger.error("Failed to save user states: %s", e)
+            saved = False
+        with self.lock:
+            self._flushing.remove(dirty)
+            if not saved:
+                # Keep newer updates made since the snapshot
+                for user_id, entry in dirty.items():
+                    self.dirty.setdefault(user_id, entry)
+        if not saved:
+            logger.error("Failed to write back %s user states, keeping them for the next flush", len(dirty))
+            return 0
+
+        self.writes.inc(len(dirty))
+        logger.debug("Wrote back %s user states", len(dirty))
+        return len(dirty)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache size, dirty count and hit/miss counters."""
+        with self.lock:
+            return {
+                "size": len(self.entries),
+                "dirty": len(self.dirty),
+                "hits": self.hits.value,
+                "misses": self.misses.value,
+                "writes": self.writes.value
+            }
+
+    async def shutdown(self):
+        """Stop the write-behind task and flush remaining dirty states"""
+        self._shutdown_event.set()
+        if hasattr(self, '_flush_task'):
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+        logger.info("User state cache shutdown complete")
@@ -0,0 +1,257 @@
+"""
+Write-ahead log for records buffered in memory by the caches.
+"""
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+from ..utils.logging import setup_logging
+from ..utils.metrics import Counter, Histogram
+
+logger = setup_logging()
+
+# Frame header: payload length, crc32 of key + payload, key length
+_FRAME_HEADER = struct.Struct("<IIH")
+
+class WriteAheadLog:
+    """
+    Append-only log of keyed records, split into numbered segment files.
+
+    ``append`` writes one framed record straight to the kernel with
+    ``os.write`` (no user-space buffer, so a process crash loses nothing);
+    a background thread fsyncs dirty segments every ``fsync_interval_sec``
+    so appends never wait on the disk. ``release`` marks records as
+    persisted elsewhere; a segment is deleted once all of its records are
+    released, which is how the log is truncated after a successful flush.
+    ``replay`` memory-maps the segments left by a previous process and yields
+    their records, stopping at a torn or corrupt tail.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        name: str,
+        segment_max_bytes: int = 64 * 1024 * 1024,
+        fsync_interval_sec: float = 0.05
+    ):
+        """
+        Open the log, starting a new segment after any existing ones.
+
+        Args:
+            directory: Directory holding the segment files
+            name: Log name, used as the segment file prefix
+            segment_max_bytes: Rotate to a new segment above this size
+            fsync_interval_sec: Interval between background fsyncs
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.name = name
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync_interval_sec = fsync_interval_sec
+
+        self._lock = threading.Lock()
+        self._segment_re = re.compile(rf"^{re.escape(name)}-(\d+)\.wal$")
+        self._segments: Dict[int, Path] = {
+            int(match.group(1)): path
+            for path in self.directory.iterdir()
+            if (match := self._segment_re.match(path.name))
+        }
+        self._recovered = sorted(self._segments)  # Segments written by a previous process
+        self._live: Dict[int, int] = {seq: 0 for seq in self._segments}  # Unreleased records per segment
+        self._key_segment: Dict[str, int] = {}  # Segment holding each unreleased key
+        self._retired_fds: List[int] = []  # Rotated-out descriptors waiting for a final fsync
+        self._dirty = False
+
+        # Metrics
+        self.appends = Counter(f"{name}_wal_appends_total", "Records appended to the WAL")
+        self.bytes_written = Counter(f"{name}_wal_bytes_total", "Bytes appended to the WAL")
+        self.fsync_latency = Histogram(f"{name}_wal_fsync_seconds", "Time spent in one WAL fsync")
+
+        self._fd = -1
+        self._seq = 0
+        self._size = 0
+        self._open_segment((self._recovered[-1] + 1) if self._recovered else 1)
+
+        # Batched fsync in the background
+        self._stop = threading.Event()
+        self._syncer = threading.Thread(target=self._sync_loop, name=f"{name}-wal-sync", daemon=True)
+        self._syncer.start()
+
+    def _segment_path(self, seq: int) -> Path:
+        return self.directory / f"{self.name}-{seq:08d}.wal"
+
+    def _open_segment(self, seq: int) -> None:
+        """Switch appends to a new segment (lock must be held)."""
+        if self._fd >= 0:
+            self._retired_fds.append(self._fd)
+        path = self._segment_path(seq)
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self._seq = seq
+        self._size = 0
+        self._segments[seq] = path
+        self._live[seq] = 0
+
+    def append(self, key: str, payload: bytes) -> None:
+        """
+        Append a record. Appending an existing key supersedes the older copy.
+
+        Args:
+            key: Identifier used to release the record later
+            payload: Serialized record
+        """
+        key_bytes = key.encode("utf-8")
+        frame = _FRAME_HEADER.pack(len(payload), zlib.crc32(payload, zlib.crc32(key_bytes)), len(key_bytes))
+        with self._lock:
+            os.write(self._fd, frame + key_bytes + payload)
+            self._size += len(frame) + len(key_bytes) + len(payload)
+            self._dirty = True
+            self._track(key, self._seq)
+            if self._size >= self.segment_max_bytes:
+                self._open_segment(self._seq + 1)
+        self.appends.inc()
+        self.bytes_written.inc(len(payload))
+
+    def _track(self, key: str, seq: int) -> None:
+        """Count a key as live in a segment (lock must be held)."""
+        previous = self._key_segment.get(key)
+        self._key_segment[key] = seq
+        self._live[seq] += 1
+        # Count the new copy first so superseding within a segment never empties it
+        if previous is not None:
+            self._decrement(previous)
+
+    def _decrement(self, seq: int) -> None:
+        """Drop one live record from a segment, deleting it once empty (lock must be held)."""
+        self._live[seq] -= 1
+        if self._live[seq] > 0:
+            return
+        if seq == self._seq:
+            if not self._size:
+                return
+            # Everything in the active segment is persisted: start a fresh one
+            self._open_segment(seq + 1)
+        self._delete_segment(seq)
+
+    def _delete_segment(self, seq: int) -> None:
+        path = self._segments.pop(seq, None)
+        self._live.pop(seq, None)
+        if path is not None:
+            path.unlink(missing_ok=True)
+
+    def release(self, keys: Iterable[str]) -> None:
+        """
+        Mark records as persisted; segments whose records are all released are deleted.
+
+        Args:
+            keys: Keys passed to append (or yielded by replay)
+        """
+        with self._lock:
+            for key in keys:
+                seq = self._key_segment.pop(key, None)
+                if seq is not None:
+                    self._decrement(seq)
+
+    def replay(self) -> Iterator[Tuple[str, bytes]]:
+        """
+        Yield (key, payload) for every record left by a previous process, oldest first.
+
+        Replayed records stay live until released. Segments with no valid
+        records are deleted.
+        """
+        recovered, self._recovered = self._recovered, []
+        for seq in recovered:
+            path = self._segments[seq]
+            with open(path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                        for key, payload in self._read_frames(data, path):
+                            with self._lock:
+                                self._track(key, seq)
+                            yield key, payload
+            with self._lock:
+                if not self._live.get(seq):
+                    self._delete_segment(seq)
+
+    @staticmethod
+    def _read_frames(data: mmap.mmap, path: Path) -> Iterator[Tuple[str, bytes]]:
+        """Parse frames from a mapped segment, stopping at the first torn or corrupt frame."""
+        offset = 0
+        end = len(data)
+        while offset + _FRAME_HEADER.size <= end:
+            payload_len, crc, key_len = _FRAME_HEADER.unpack_from(data, offset)
+            key_start = offset + _FRAME_HEADER.size
+            payload_start = key_start + key_len
+            frame_end = payload_start + payload_len
+            if frame_end > end:
+                logger.warning("Torn record at offset %s in %s, ignoring the tail", offset, path.name)
+                return
+            key_bytes = data[key_start:payload_start]
+            payload = data[payload_start:frame_end]
+            if zlib.crc32(payload, zlib.crc32(key_bytes)) != crc:
+                logger.warning("Checksum mismatch at offset %s in %s, ignoring the tail", offset, path.name)
+                return
+            yield key_bytes.decode("utf-8"), payload
+            offset = frame_end
+        if offset != end:
+            logger.warning("Torn header at offset %s in %s, ignoring the tail", offset, path.name)
+
+    def truncate(self) -> None:
+        """Release everything and delete all segments."""
+        with self._lock:
+            self._key_segment.clear()
+            self._open_segment(self._seq + 1)
+            for seq in [seq for seq in self._segments if seq != self._seq]:
+                self._delete_segment(seq)
+
+    def sync(self) -> None:
+        """Fsync the active segment and any rotated-out segments."""
+        with self._lock:
+            fd = self._fd
+            dirty, self._dirty = self._dirty, False
+            retired, self._retired_fds = self._retired_fds, []
+        started = time.perf_counter()
+        for old_fd in retired:
+            try:
+                os.fsync(old_fd)
+            finally:
+                os.close(old_fd)
+        if dirty:
+            os.fsync(fd)
+        if dirty or retired:
+            self.fsync_latency.observe(time.perf_counter() - started)
+
+    def _sync_loop(self) -> None:
+        while not self._stop.wait(self.fsync_interval_sec):
+            try:
+                self.sync()
+            except Exception as e:
+                logger.error("WAL fsync failed for %s: %s", self.name, e)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get segment count, unreleased record count and append counters."""
+        with self._lock:
+            return {
+                "segments": len(self._segments),
+                "active_segment_bytes": self._size,
+                "live_records": len(self._key_segment),
+                "appends": self.appends.value,
+                "bytes_written": self.bytes_written.value,
+                "fsync_seconds": self.fsync_latency.snapshot()
+            }
+
+    def close(self) -> None:
+        """Stop the background fsync, sync and close the log. Unreleased segments are kept for replay."""
+        self._stop.set()
+        self._syncer.join()
+        self.sync()
+        with self._lock:
+            os.close(self._fd)
+            self._fd = -1
+            if not self._size and not self._live.get(self._seq):
+                self._delete_segment(self._seq)
@@ -2,6 +2,8 @@ from RockPaperScissor.models.random_ai import RandomAI
 from RockPaperScissor.models.pattern_ai import PatternAI
 from RockPaperScissor.models.markov_ai import MarkovAI
 from RockPaperScissor.models.adaptive_markov_ai import AdaptiveMarkovAI
+from RockPaperScissor.models.variable_markov_ai import VariableMarkovAI
+from RockPaperScissor.models.model_state import ModelState, decode_state
 
 """
 AI models package, containing different types of AI strategies.
@@ -11,7 +13,8 @@ AI_MODELS = {
     "random": RandomAI(),
     "pattern": PatternAI(),
     "markov": MarkovAI(),
-    "adaptive_markov": AdaptiveMarkovAI(smoothing_factor=1.0, temperature=1.2)
+    "adaptive_markov": AdaptiveMarkovAI(smoothing_factor=1.0, temperature=1.2),
+    "variable_markov": VariableMarkovAI(order=4, prior=24.0)
 
 }
 
@@ -21,7 +24,7 @@ def get_ai(model_name):
     
     Args:
         ai_type (str): The type of AI to retrieve
-            Options: "random", "pattern", "markov", "adaptive_markov"
+            Options: "random", "pattern", "markov", "adaptive_markov", "variable_markov"
             
     Returns:
         BaseAI: An instance of the selected AI
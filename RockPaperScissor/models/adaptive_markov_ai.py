@@ -1,26 +1,163 @@
-from typing import Dict, Any, Optional, Tuple
+from typing import Any, List, Optional, Sequence, Tuple
 import math
 import numpy as np
 
 from .base_ai import BaseAI
+from .model_state import AdaptiveMarkovState, NO_MOVE, COUNT_DTYPE, count_transitions
+from .rps import COUNTER_MOVE
+from ..config.game import MODEL_CONFIG
+
+# Row of the kernel cache holding the frequency counts (rows 0-2 are the Markov rows)
+FREQ_ROW = 3
+
+
+class _KernelCache:
+    """
+    Plain-Python mirror of an AdaptiveMarkovState's counts for the scalar kernel.
+
+    ``counts`` holds the three Markov rows and the frequency counts as lists
+    of ints. ``rows`` caches each of them as smoothed probabilities plus
+    their entropy, (p0, p1, p2, entropy), or None once the row has changed.
+    """
+    __slots__ = ("counts", "rows", "smoothing")
+
+    def __init__(self, state: AdaptiveMarkovState):
+        self.counts = state.markov_counts.tolist()
+        self.counts.append(state.frequency_counts.tolist())
+        self.rows = [None, None, None, None]
+        self.smoothing = state.smoothing
+
+    def row(self, index: int) -> Tuple[float, float, float, float]:
+        """Smoothed probabilities and entropy of a row, recomputed only if it changed."""
+        cached = self.rows[index]
+        if cached is not None:
+            return cached
+
+        # Same operations, in the same order, as the reference implementation
+        c0, c1, c2 = self.counts[index]
+        smoothing = self.smoothing
+        r0 = c0 + smoothing
+        r1 = c1 + smoothing
+        r2 = c2 + smoothing
+        total = r0 + r1 + r2
+        p0 = r0 / total
+        p1 = r1 / total
+        p2 = r2 / total
+        entropy = 0.0
+        if p0 > 0:
+            entropy -= p0 * math.log2(p0)
+        if p1 > 0:
+            entropy -= p1 * math.log2(p1)
+        if p2 > 0:
+            entropy -= p2 * math.log2(p2)
+
+        cached = self.rows[index] = (p0, p1, p2, entropy)
+        return cached
+
 
 class AdaptiveMarkovAI(BaseAI):
     """
     Adaptive RPS AI that uses entropy-based weighting between Markov and Frequency models.
+
+    ``make_move`` runs a scalar kernel that keeps the counts in plain Python
+    alongside the state and caches each row's probabilities and entropy, so a
+    round updates two counts and recomputes at most two 3-element rows. It
+    makes the same predictions as the reference NumPy implementation, which
+    is used instead when ``reference`` is set. ``make_moves_batch`` can run
+    batches of ``batch_threshold`` sessions or more through a vectorized
+    path instead (off by default).
     """
-    def __init__(self, smoothing_factor=1.0, temperature=1.0):
+    state_class = AdaptiveMarkovState
+
+    def __init__(self, smoothing_factor=1.0, temperature=1.0, reference=MODEL_CONFIG["adaptive_markov_reference"],
+                 batch_threshold=MODEL_CONFIG["adaptive_markov_batch_threshold"]):
         super().__init__()
         self.smoothing = smoothing_factor
         self.temperature = temperature
+        self.reference = reference
+        self.batch_threshold = batch_threshold
+
+    def new_state(self) -> AdaptiveMarkovState:
+        return AdaptiveMarkovState(smoothing=self.smoothing, temperature=self.temperature)
 
-    def make_move(self, model_state: Optional[Dict[str, Any]] = None) -> Tuple[str, Dict[str, Any]]:
+    def make_move(self, model_state: Optional[AdaptiveMarkovState] = None) -> Tuple[str, AdaptiveMarkovState]:
         """
         Generate AI's next move based on model state.
+
+        Args:
+            model_state: AdaptiveMarkovState (see ``reference_move`` for its fields)
+
+        Returns:
+            Tuple containing:
+            - str: AI's chosen move (rock, paper, scissors)
+            - AdaptiveMarkovState: Updated model state (ready for next round after player moves)
+        """
+        state = self.load_state(model_state)
+        if self.reference:
+            return self.reference_move(state)
+
+        cache = state.kernel_cache
+        if cache is None:
+            cache = state.kernel_cache = _KernelCache(state)
+        player_last_move = state.player_last_move
+        player_second_last_move = state.player_second_last_move
+
+        # Update the models with historical data if available (writing through to the state's arrays)
+        if player_last_move != NO_MOVE:
+            freq_counts = cache.counts[FREQ_ROW]
+            freq_counts[player_last_move] += 1
+            state.frequency_counts[player_last_move] = freq_counts[player_last_move]
+            cache.rows[FREQ_ROW] = None
+
+            if player_second_last_move != NO_MOVE:
+                markov_row = cache.counts[player_second_last_move]
+                markov_row[player_last_move] += 1
+                state.markov_counts[player_second_last_move, player_last_move] = markov_row[player_last_move]
+                cache.rows[player_second_last_move] = None
+
+        if player_last_move == NO_MOVE:
+            # No history yet, use random prediction
+            predicted_idx = np.random.randint(3)
+        else:
+            markov_p0, markov_p1, markov_p2, markov_entropy = cache.row(player_last_move)
+            freq_p0, freq_p1, freq_p2, freq_entropy = cache.row(FREQ_ROW)
+
+            # Entropy-based adaptive weights
+            temperature = state.temperature
+            denom = math.exp(-temperature * markov_entropy) + math.exp(-temperature * freq_entropy)
+            lambda_markov = math.exp(-temperature * markov_entropy) / denom
+            lambda_freq = math.exp(-temperature * freq_entropy) / denom
+
+            # Most likely move under the mixture (first one on ties, like argmax)
+            best = lambda_markov * markov_p0 + lambda_freq * freq_p0
+            predicted_idx = 0
+            combined = lambda_markov * markov_p1 + lambda_freq * freq_p1
+            if combined > best:
+                best = combined
+                predicted_idx = 1
+            combined = lambda_markov * markov_p2 + lambda_freq * freq_p2
+            if combined > best:
+                predicted_idx = 2
+
+            last_lambdas = state.last_lambdas
+            last_lambdas[0] = lambda_markov
+            last_lambdas[1] = lambda_freq
+            last_lambdas[2] = markov_entropy
+            last_lambdas[3] = freq_entropy
+
+        # Shift the history for the next round (service layer sets player_last_move)
+        state.player_second_last_move = player_last_move
+        state.player_last_move = NO_MOVE
+        return COUNTER_MOVE[predicted_idx], state
+
+    def reference_move(self, model_state: Optional[AdaptiveMarkovState] = None) -> Tuple[str, AdaptiveMarkovState]:
+        """
+        Reference NumPy implementation of ``make_move``, kept for verification.
         
         Args:
-            model_state: Dictionary containing:
-                - markov_counts: Transition count matrix
-                - frequency_counts: Overall frequency counts
+            model_state: AdaptiveMarkovState containing:
+                - markov_counts: Observed transition count matrix
+                - frequency_counts: Observed overall frequency counts
                 - player_last_move: The player's last move from previous round
                 - smoothing: Smoothing factor for probability calculations
                 - temperature: Temperature parameter for entropy weighting
@@ -29,35 +166,18 @@ class AdaptiveMarkovAI(BaseAI):
         Returns:
             Tuple containing:
             - str: AI's chosen move (rock, paper, scissors)
-            - Dict: Updated model state (ready for next round after player moves)
+            - AdaptiveMarkovState: Updated model state (ready for next round after player moves)
         """
-        # Initialize model state if None
-        if model_state is None:
-            model_state = {
-                "player_last_move": None,
-                "ai_last_move": None,
-                "last_result": None,
-                "markov_counts": np.ones((3, 3)) * self.smoothing,
-                "frequency_counts": np.ones(3) * self.smoothing,
-                "player_second_last_move": None,
-                "smoothing": self.smoothing,
-                "temperature": self.temperature,
-                "last_lambdas": {"markov": 0.5, "freq": 0.5}
-            }
+        state = self.load_state(model_state)
+        state.kernel_cache = None  # The counts change outside the kernel
         
         # Extract values from model state
-        markov_counts = model_state.get("markov_counts", np.ones((3, 3)) * self.smoothing)
-        frequency_counts = model_state.get("frequency_counts", np.ones(3) * self.smoothing)
-        player_last_move = model_state.get("player_last_move")
-        player_second_last_move = model_state.get("player_second_last_move")
-        smoothing = model_state.get("smoothing", self.smoothing)
-        temperature = model_state.get("temperature", self.temperature)
-        last_lambdas = model_state.get("last_lambdas", {"markov": 0.5, "freq": 0.5})
-        
-        # Define move mappings
-        move_to_idx = {"rock": 0, "paper": 1, "scissors": 2}
-        idx_to_move = {0: "rock", 1: "paper", 2: "scissors"}
-        counters = {"rock": "paper", "paper": "scissors", "scissors": "rock"}
+        markov_counts = state.markov_counts
+        frequency_counts = state.frequency_counts
+        player_last_move = state.player_last_move
+        player_second_last_move = state.player_second_last_move
+        smoothing = state.smoothing
+        temperature = state.temperature
         
         # Helper functions
         def calculate_entropy(probs):
@@ -68,20 +188,15 @@ class AdaptiveMarkovAI(BaseAI):
                     entropy -= p * math.log2(p)
             return entropy
         
-        def get_markov_probabilities(move):
+        def get_markov_probabilities(move_idx):
             """Get transition probabilities from the Markov model"""
-            if move not in move_to_idx:
-                # Default to uniform if unknown move
-                return [1/3, 1/3, 1/3]
-            
-            move_idx = move_to_idx[move]
-            row_sum = np.sum(markov_counts[move_idx])
-            return markov_counts[move_idx] / row_sum
+            row = markov_counts[move_idx] + smoothing
+            return row / np.sum(row)
         
         def get_frequency_probabilities():
             """Get overall move probabilities from the frequency model"""
-            total = np.sum(frequency_counts)
-            return frequency_counts / total
+            counts = frequency_counts + smoothing
+            return counts / np.sum(counts)
         
         def calculate_lambdas(markov_probs, freq_probs):
             """Calculate adaptive weights using entropy-based formula"""
@@ -95,56 +210,140 @@ class AdaptiveMarkovAI(BaseAI):
             lambda_freq = math.exp(-temperature * freq_entropy) / denom
             
             # Return weights and entropy values for monitoring
-            return lambda_markov, lambda_freq, {
-                "markov": lambda_markov,
-                "freq": lambda_freq,
-                "markov_entropy": markov_entropy,
-                "freq_entropy": freq_entropy
-            }
+            return lambda_markov, lambda_freq, markov_entropy, freq_entropy
         
         # Update the models with historical data if available
-        if player_last_move and player_last_move in move_to_idx:
+        if player_last_move != NO_MOVE:
             # Update frequency counts
-            last_idx = move_to_idx[player_last_move]
-            frequency_counts[last_idx] += 1
+            frequency_counts[player_last_move] += 1
             
             # Update Markov model if we have two consecutive moves
-            if player_second_last_move and player_second_last_move in move_to_idx:
-                second_last_idx = move_to_idx[player_second_last_move]
-                markov_counts[second_last_idx][last_idx] += 1
+            if player_second_last_move != NO_MOVE:
+                markov_counts[player_second_last_move, player_last_move] += 1
         
         # For prediction, use player_last_move for Markov model
-        if player_last_move is None:
+        if player_last_move == NO_MOVE:
             # No history yet, use random prediction
-            predicted_move = np.random.choice(self.possible_moves)
+            predicted_idx = np.random.randint(3)
         else:
             # Get probabilities from each model
             markov_probs = get_markov_probabilities(player_last_move)
             freq_probs = get_frequency_probabilities()
             
             # Calculate adaptive lambda weights
-            lambda_markov, lambda_freq, new_lambdas = calculate_lambdas(markov_probs, freq_probs)
+            lambda_markov, lambda_freq, markov_entropy, freq_entropy = calculate_lambdas(markov_probs, freq_probs)
             
             # Combine predictions with lambda weights
-            combined_probs = lambda_markov * np.array(markov_probs) + lambda_freq * np.array(freq_probs)
+            combined_probs = lambda_markov * markov_probs + lambda_freq * freq_probs
             
             # Predict most likely move
-            predicted_idx = np.argmax(combined_probs)
-            predicted_move = idx_to_move[predicted_idx]
+            predicted_idx = int(np.argmax(combined_probs))
             
             # Update lambdas in state
-            last_lambdas = new_lambdas
+            state.last_lambdas[:] = (lambda_markov, lambda_freq, markov_entropy, freq_entropy)
         
-        # Prepare updated state
-        updated_state = {
-            "markov_counts": markov_counts,
-            "frequency_counts": frequency_counts,
-            "player_last_move": None,  # Keep until service layer updates it
-            "player_second_last_move": player_last_move,  # Keep until service layer updates it
-            "smoothing": smoothing,
-            "temperature": temperature,
-            "last_lambdas": last_lambdas
-        }
+        # Shift the history for the next round (service layer sets player_last_move)
+        state.player_second_last_move = player_last_move
+        state.player_last_move = NO_MOVE
         
         # Return counter move and updated state
-        return counters[predicted_move], updated_state
\ No newline at end of file
+        return COUNTER_MOVE[predicted_idx], state
+
+
+    def make_moves_batch(self, model_states: Sequence[Any]) -> List[Tuple[str, AdaptiveMarkovState]]:
+        """
+        Generate moves for many sessions at once.
+
+        Each session runs through the scalar kernel unless ``batch_threshold``
+        is set and the batch has at least that many sessions (or ``reference``
+        is set). The sessions' counts are then stacked into (N, 3, 3) and
+        (N, 3) arrays and the entropy-weighted mixture is computed for all of
+        them with vectorized NumPy. Stacking and writing back the per-session
+        arrays cost more than the kernel's cached rows save up to a few
+        hundred sessions, so the vectorized path only pays off for very large
+        batches. Both paths make the same predictions; the vectorized one
+        updates the counts outside the kernel, so it drops each state's
+        kernel cache.
+        """
+        if not self.reference and not 0 < self.batch_threshold <= len(model_states):
+            return [self.make_move(model_state) for model_state in model_states]
+
+        states = [self.load_state(model_state) for model_state in model_states]
+        if not states:
+            return []
+
+        # Update the models with the moves played since the last prediction
+        # and shift each session's history
+        observed = []
+        observed_idx = []
+        last = []
+        for i, state in enumerate(states):
+            state.kernel_cache = None  # The counts change outside the kernel
+            player_last_move = state.player_last_move
+            if player_last_move != NO_MOVE:
+                state.frequency_counts[player_last_move] += 1
+                if state.player_second_last_move != NO_MOVE:
+                    state.markov_counts[state.player_second_last_move, player_last_move] += 1
+                observed.append(state)
+                observed_idx.append(i)
+                last.append(player_last_move)
+            state.player_second_last_move = player_last_move
+            state.player_last_move = NO_MOVE
+
+        # Sessions without history get a random prediction
+        predicted = np.random.randint(3, size=len(states))
+        if observed:
+            predicted[observed_idx] = self._predict_batch(observed, np.array(last, dtype=np.intp))
+
+        return [(COUNTER_MOVE[move_idx], state) for move_idx, state in zip(predicted.tolist(), states)]
+
+    def _learn_rounds(self, state: AdaptiveMarkovState, user_moves: np.ndarray, ai_moves: np.ndarray,
+                      results: np.ndarray) -> None:
+        """
+        Add the rounds' moves and transitions with bincounts.
+
+        ``last_lambdas`` is left alone: the next real ``make_move`` recomputes it.
+        """
+        if len(user_moves) == 0:
+            return
+        state.kernel_cache = None
+        state.frequency_counts += np.bincount(user_moves, minlength=3).astype(COUNT_DTYPE)
+        state.markov_counts += count_transitions(state.player_second_last_move, user_moves)
+        state.player_second_last_move = int(user_moves[-1])
+        state.player_last_move = NO_MOVE
+
+    @staticmethod
+    def _predict_batch(states: List[AdaptiveMarkovState], last: np.ndarray) -> np.ndarray:
+        """Predict the player's next move for sessions with a known last move."""
+        n = len(states)
+        markov_counts = np.stack([state.markov_counts for state in states])
+        frequency_counts = np.stack([state.frequency_counts for state in states])
+        smoothing = np.fromiter((state.smoothing for state in states), dtype=float, count=n)[:, None]
+        temperature = np.fromiter((state.temperature for state in states), dtype=float, count=n)
+
+        def entropy(probs):
+            """Row-wise Shannon entropy, treating 0 * log(0) as 0"""
+            logs = np.log2(probs, out=np.zeros_like(probs), where=probs > 0)
+            return -(probs * logs).sum(axis=1)
+
+        # Probabilities of each model
+        markov_rows = markov_counts[np.arange(n), last] + smoothing
+        markov_probs = markov_rows / markov_rows.sum(axis=1, keepdims=True)
+        freq_rows = frequency_counts + smoothing
+        freq_probs = freq_rows / freq_rows.sum(axis=1, keepdims=True)
+
+        # Entropy-based adaptive weights
+        markov_entropy = entropy(markov_probs)
+        freq_entropy = entropy(freq_probs)
+        markov_weight = np.exp(-temperature * markov_entropy)
+        freq_weight = np.exp(-temperature * freq_entropy)
+        denom = markov_weight + freq_weight
+        lambda_markov = markov_weight / denom
+        lambda_freq = freq_weight / denom
+
+        lambdas = np.stack([lambda_markov, lambda_freq, markov_entropy, freq_entropy], axis=1)
+        for state, row in zip(states, lambdas):
+            state.last_lambdas[:] = row
+
+        combined_probs = lambda_markov[:, None] * markov_probs + lambda_freq[:, None] * freq_probs
+        return combined_probs.argmax(axis=1)
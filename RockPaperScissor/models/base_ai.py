@@ -1,23 +1,135 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, Tuple, List
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .model_state import ModelState, decode_state
+from .rps import MOVES
 
 class BaseAI(ABC):
     """
     Base class for all AI strategies.
     """
+    # Compact state class used by this strategy
+    state_class = ModelState
+
     def __init__(self):
-        self.possible_moves = ["rock", "paper", "scissors"]
-        
+        self.possible_moves = list(MOVES)
+
+    def new_state(self) -> ModelState:
+        """Create an empty model state for this strategy."""
+        return self.state_class()
+
+    def state_from_dict(self, data: Dict[str, Any]) -> ModelState:
+        """Build a compact state from a legacy dictionary state."""
+        return self.state_class.from_dict(data)
+
+    def load_state(self, model_state: Union[ModelState, bytes, Dict[str, Any], None]) -> ModelState:
+        """
+        Coerce a stored model state into this strategy's compact state.
+
+        Accepts a state object, an encoded binary state, a legacy dictionary
+        state or None. States belonging to another strategy are discarded.
+        """
+        if isinstance(model_state, self.state_class):
+            return model_state
+        if not model_state:
+            return self.new_state()
+        if isinstance(model_state, (bytes, bytearray, memoryview)):
+            state = decode_state(model_state)
+            return state if isinstance(state, self.state_class) else self.new_state()
+        if isinstance(model_state, dict):
+            return self.state_from_dict(model_state)
+        return self.new_state()
+
     @abstractmethod
-    def make_move(self, model_state: Optional[Dict[str, Any]] = None) -> Tuple[str, Dict[str, Any]]:
+    def make_move(self, model_state: Optional[ModelState] = None) -> Tuple[str, ModelState]:
         """
-        Generate AI's next move based on game history.
+        Generate AI's next move based on the model state.
         
         Args:
-            history: Game history records, each containing (user_move, ai_type, ai_move)
+            model_state: The strategy's state (see ``load_state`` for accepted forms)
                     If None, the AI should make a move without historical context
         
         Returns:
-            str: One of the valid moves ("rock", "paper", "scissors")
+            Tuple containing:
+            - str: One of the valid moves ("rock", "paper", "scissors")
+            - ModelState: Updated model state
+        """
+        pass
+
+
+    def make_moves_batch(self, model_states: Sequence[Any]) -> List[Tuple[str, ModelState]]:
+        """
+        Generate moves for many independent sessions in one call.
+
+        Strategies that can vectorize their prediction across sessions override
+        this; the default simply calls ``make_move`` for each state.
+
+        Args:
+            model_states: One state per session (any form accepted by ``load_state``).
+                    Each state must belong to a different session.
+
+        Returns:
+            List of (move, updated state) tuples in the same order as the input
+        """
+        return [self.make_move(model_state) for model_state in model_states]
+
+    def replay(
+        self,
+        model_state: Any,
+        user_moves: np.ndarray,
+        ai_moves: np.ndarray,
+        results: np.ndarray
+    ) -> ModelState:
+        """
+        Rebuild a state by replaying recorded rounds in order.
+
+        Equivalent to calling ``make_move`` and then ``record_round`` for each
+        round, as the service does, except that the recorded AI moves are kept.
+        The first and last ``make_move`` calls are made for real so anything a
+        strategy derives from its prediction (e.g. mixture weights) matches a
+        live session; the rounds in between go through ``_learn_rounds``.
+        Replaying consecutive chunks of a history gives the same state as
+        replaying it at once.
+
+        Args:
+            model_state: State to continue from (any form accepted by ``load_state``)
+            user_moves: Player move codes, oldest first
+            ai_moves: AI move codes
+            results: Result codes
+
+        Returns:
+            The state after the last round, ready for the next ``make_move``
+        """
+        state = self.load_state(model_state)
+        n = len(user_moves)
+        if n == 0:
+            return state
+
+        _, state = self.make_move(state)
+        if n > 1:
+            self._learn_rounds(state, user_moves[:-2], ai_moves[:-2], results[:-2])
+            state.record_round_codes(user_moves[-2], ai_moves[-2], results[-2])
+            _, state = self.make_move(state)
+        state.record_round_codes(user_moves[-1], ai_moves[-1], results[-1])
+        return state
+
+    def _learn_rounds(
+        self,
+        state: ModelState,
+        user_moves: np.ndarray,
+        ai_moves: np.ndarray,
+        results: np.ndarray
+    ) -> None:
+        """
+        Apply what ``make_move`` learns from each round, in place.
+
+        For every round this records the round and runs the model update of
+        the next ``make_move``, without needing its prediction. The default
+        simply calls ``make_move``; count-based strategies override it with a
+        vectorized update.
         """
-        pass
\ No newline at end of file
+        for user_move, ai_move, result in zip(user_moves.tolist(), ai_moves.tolist(), results.tolist()):
+            state.record_round_codes(user_move, ai_move, result)
+            self.make_move(state)
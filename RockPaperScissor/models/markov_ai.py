@@ -1,79 +1,92 @@
 import random
-from collections import defaultdict
-from typing import Dict, Any, Optional, Tuple
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
 
 from .base_ai import BaseAI
+from .model_state import MarkovState, NO_MOVE, count_transitions
+from .rps import COUNTER_MOVE
 
 class MarkovAI(BaseAI):
     """
     An AI that uses Markov chains to predict player moves.
     """
+    state_class = MarkovState
     
-    def make_move(self, model_state: Optional[Dict[str, Any]] = None) -> Tuple[str, Dict[str, Any]]:
+    def make_move(self, model_state: Optional[MarkovState] = None) -> Tuple[str, MarkovState]:
         """
         Generate a move based on Markov chain prediction of player's next move.
         
         Args:
-            model_state: Dictionary containing:
-                - transition_matrix: Markov transition probabilities
+            model_state: MarkovState containing:
+                - transitions: 3x3 counts of observed move transitions
                 - player_last_move: The player's most recent move
+                - player_second_last_move: The move before that
                 
         Returns:
             Tuple containing:
             - str: Selected move
-            - Dict: Updated model state
+            - MarkovState: Updated model state
         """
-        # Initialize state if not provided
-        if model_state is None:
-            model_state = {
-                "transition_matrix": {
-                    "rock": {"rock": 0, "paper": 0, "scissors": 0},
-                    "paper": {"rock": 0, "paper": 0, "scissors": 0},
-                    "scissors": {"rock": 0, "paper": 0, "scissors": 0}
-                },
-                "player_last_move": None,
-                "player_second_last_move": None
-            }
-        
-        transition_matrix = model_state.get("transition_matrix", {
-            "rock": {"rock": 0, "paper": 0, "scissors": 0},
-            "paper": {"rock": 0, "paper": 0, "scissors": 0},
-            "scissors": {"rock": 0, "paper": 0, "scissors": 0}
-        })
-        player_last_move = model_state.get("player_last_move", None)
-        player_second_last_move = model_state.get("player_second_last_move", None)
+        state = self.load_state(model_state)
+        player_last_move = state.player_last_move
+        player_second_last_move = state.player_second_last_move
         
         # Update transition matrix if we have two consecutive moves
-        if player_second_last_move is not None and player_last_move is not None:
-            transition_matrix[player_second_last_move][player_last_move] += 1
+        if player_second_last_move != NO_MOVE and player_last_move != NO_MOVE:
+            state.transitions[player_second_last_move, player_last_move] += 1
         
         # Predict next move based on Markov chain
-        predicted_move = None
-        if player_last_move is not None:
-            # Get transition probabilities from current state
-            transitions = transition_matrix[player_last_move]
-            total = sum(transitions.values())
-            
-            if total > 0:
-                # Predict based on highest probability
-                predicted_move = max(transitions, key=transitions.get)
-            else:
-                # No transitions recorded yet, choose randomly
-                predicted_move = random.choice(self.possible_moves)
+        if player_last_move != NO_MOVE and state.transitions[player_last_move].any():
+            # Predict based on highest probability
+            predicted_idx = int(state.transitions[player_last_move].argmax())
         else:
-            predicted_move = random.choice(self.possible_moves)
+            # No transitions recorded yet, choose randomly
+            predicted_idx = random.randrange(3)
         
         # Choose counter move
-        if predicted_move == "rock":
-            ai_move = "paper"
-        elif predicted_move == "paper":
-            ai_move = "scissors"
-        else:  # scissors
-            ai_move = "rock"
+        ai_move = COUNTER_MOVE[predicted_idx]
         
-        # Return move and updated state
-        return ai_move, {
-            "transition_matrix": transition_matrix,
-            "player_last_move": None,
-            "player_second_last_move": player_last_move
-        }
\ No newline at end of file
+        # Shift the history for the next round
+        state.player_second_last_move = player_last_move
+        state.player_last_move = NO_MOVE
+        return ai_move, state
+
+
+    def make_moves_batch(self, model_states: Sequence[Any]) -> List[Tuple[str, MarkovState]]:
+        """
+        Generate moves for many sessions at once using stacked (N, 3, 3) transition counts.
+
+        Produces the same predictions as calling ``make_move`` on each state.
+        """
+        states = [self.load_state(model_state) for model_state in model_states]
+        n = len(states)
+        if n == 0:
+            return []
+
+        # Record each session's latest transition and shift its history
+        last = np.empty(n, dtype=np.intp)
+        for i, state in enumerate(states):
+            player_last_move = state.player_last_move
+            if player_last_move != NO_MOVE and state.player_second_last_move != NO_MOVE:
+                state.transitions[state.player_second_last_move, player_last_move] += 1
+            state.player_second_last_move = player_last_move
+            state.player_last_move = NO_MOVE
+            last[i] = player_last_move
+
+        # Predict from each session's current row, falling back to random
+        transitions = np.stack([state.transitions for state in states])
+        has_last = last != NO_MOVE
+        rows = transitions[np.arange(n), np.where(has_last, last, 0)]
+        predictable = has_last & rows.any(axis=1)
+        predicted = np.where(predictable, rows.argmax(axis=1), np.random.randint(3, size=n))
+        return [(COUNTER_MOVE[move_idx], state) for move_idx, state in zip(predicted.tolist(), states)]
+
+    def _learn_rounds(self, state: MarkovState, user_moves: np.ndarray, ai_moves: np.ndarray,
+                      results: np.ndarray) -> None:
+        """Add the rounds' move transitions with one bincount."""
+        if len(user_moves) == 0:
+            return
+        state.transitions += count_transitions(state.player_second_last_move, user_moves)
+        state.player_second_last_move = int(user_moves[-1])
+        state.player_last_move = NO_MOVE
@@ -0,0 +1,435 @@
+"""
+Compact model state representations shared by all AI strategies.
+
+Each strategy keeps its state in a small ``__slots__`` object backed by
+fixed-shape NumPy integer arrays. States encode to a versioned binary blob
+(a short struct header followed by the raw array buffers), so persisting or
+restoring a state is a memory copy instead of a nested JSON walk.
+"""
+import struct
+import sys
+from array import array
+from typing import Dict, Any, Optional, Union
+
+import numpy as np
+
+from .rps import MOVES, MOVE_INDEX, RESULTS, RESULT_INDEX, NO_MOVE
+
+STATE_FORMAT_VERSION = 1
+
+# version, kind, player_last_move, ai_last_move, last_result
+_HEADER = struct.Struct("<BBbbb")
+
+COUNT_DTYPE = np.dtype("<u4")
+FLOAT_DTYPE = np.dtype("<f8")
+
+
+def _to_code(value: Optional[str], index: Dict[str, int]) -> int:
+    """Convert a move/result name to its integer code."""
+    if value is None:
+        return NO_MOVE
+    return index[value]
+
+
+def _to_name(code: int, names: tuple) -> Optional[str]:
+    """Convert an integer code back to its move/result name."""
+    return names[code] if code >= 0 else None
+
+
+class ModelState:
+    """
+    Base class for compact model states.
+
+    Stores the fields the service layer records after every round. Subclasses
+    add their own arrays and set a unique ``kind`` tag used by ``decode_state``.
+    """
+    __slots__ = ("player_last_move", "ai_last_move", "last_result")
+
+    kind = 0
+    _registry: Dict[int, type] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.kind in ModelState._registry:
+            raise ValueError(f"Duplicate model state kind: {cls.kind}")
+        ModelState._registry[cls.kind] = cls
+
+    def __init__(self):
+        self.player_last_move = NO_MOVE
+        self.ai_last_move = NO_MOVE
+        self.last_result = NO_MOVE
+
+    def record_round(self, user_move: str, ai_move: str, result: str) -> None:
+        """Record the outcome of a round so the model can learn from it next turn."""
+        self.player_last_move = MOVE_INDEX[user_move]
+        self.ai_last_move = MOVE_INDEX[ai_move]
+        self.last_result = RESULT_INDEX[result]
+
+    def record_round_codes(self, user_move: int, ai_move: int, result: int) -> None:
+        """Same as ``record_round`` with integer move and result codes."""
+        self.player_last_move = int(user_move)
+        self.ai_last_move = int(ai_move)
+        self.last_result = int(result)
+
+    def _encode_payload(self) -> bytes:
+        """Encode subclass specific fields."""
+        return b""
+
+    def _decode_payload(self, payload: memoryview) -> None:
+        """Decode subclass specific fields."""
+        pass
+
+    def encode(self) -> bytes:
+        """Encode the state into its versioned binary representation."""
+        header = _HEADER.pack(
+            STATE_FORMAT_VERSION,
+            self.kind,
+            self.player_last_move,
+            self.ai_last_move,
+            self.last_result
+        )
+        return header + self._encode_payload()
+
+    def copy(self) -> "ModelState":
+        """Return an independent copy of the state."""
+        return decode_state(self.encode())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return a readable dictionary view of the state (for logs and summaries)."""
+        return {
+            "player_last_move": _to_name(self.player_last_move, MOVES),
+            "ai_last_move": _to_name(self.ai_last_move, MOVES),
+            "last_result": _to_name(self.last_result, RESULTS)
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ModelState":
+        """Build a state from a legacy dictionary state."""
+        state = cls()
+        state._load_base_dict(data)
+        return state
+
+    def _load_base_dict(self, data: Dict[str, Any]) -> None:
+        """Load the common fields from a legacy dictionary state."""
+        self.player_last_move = _to_code(data.get("player_last_move"), MOVE_INDEX)
+        self.ai_last_move = _to_code(data.get("ai_last_move"), MOVE_INDEX)
+        self.last_result = _to_code(data.get("last_result"), RESULT_INDEX)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()})"
+
+
+def decode_state(data: Union[bytes, bytearray, memoryview]) -> ModelState:
+    """
+    Decode a binary model state produced by ``ModelState.encode``.
+
+    Raises:
+        ValueError: If the blob has an unknown version or kind
+    """
+    view = memoryview(data)
+    version, kind, player_last_move, ai_last_move, last_result = _HEADER.unpack_from(view)
+    if version != STATE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported model state version: {version}")
+    state_class = ModelState._registry.get(kind)
+    if state_class is None:
+        raise ValueError(f"Unknown model state kind: {kind}")
+
+    state = state_class.__new__(state_class)
+    state.player_last_move = player_last_move
+    state.ai_last_move = ai_last_move
+    state.last_result = last_result
+    state._decode_payload(view[_HEADER.size:])
+    return state
+
+
+def count_transitions(previous: int, moves: np.ndarray) -> np.ndarray:
+    """
+    Count consecutive move pairs in ``[previous] + moves`` as a 3x3 matrix.
+
+    ``previous`` is the move before the sequence, or NO_MOVE if there is none.
+    """
+    sequence = np.asarray(moves, dtype=np.intp)
+    if previous != NO_MOVE:
+        sequence = np.concatenate(([previous], sequence))
+    if len(sequence) < 2:
+        return np.zeros((3, 3), dtype=COUNT_DTYPE)
+    pairs = sequence[:-1] * 3 + sequence[1:]
+    return np.bincount(pairs, minlength=9).astype(COUNT_DTYPE).reshape(3, 3)
+
+
+def _read_array(payload: memoryview, offset: int, dtype: np.dtype, shape: tuple) -> tuple:
+    """Read a writable array of the given shape from the payload."""
+    count = int(np.prod(shape))
+    array = np.frombuffer(payload, dtype=dtype, count=count, offset=offset).reshape(shape).copy()
+    return array, offset + count * dtype.itemsize
+
+
+class RandomState(ModelState):
+    """State for RandomAI, which only needs the common fields."""
+    __slots__ = ()
+    kind = 1
+
+
+class MarkovState(ModelState):
+    """State for MarkovAI: a 3x3 matrix of observed move transitions."""
+    __slots__ = ("transitions", "player_second_last_move")
+    kind = 2
+
+    _FIELDS = struct.Struct("<b")
+
+    def __init__(self):
+        super().__init__()
+        self.transitions = np.zeros((3, 3), dtype=COUNT_DTYPE)
+        self.player_second_last_move = NO_MOVE
+
+    def _encode_payload(self) -> bytes:
+        return self._FIELDS.pack(self.player_second_last_move) + self.transitions.tobytes()
+
+    def _decode_payload(self, payload: memoryview) -> None:
+        (self.player_second_last_move,) = self._FIELDS.unpack_from(payload)
+        self.transitions, _ = _read_array(payload, self._FIELDS.size, COUNT_DTYPE, (3, 3))
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = super().to_dict()
+        data.update({
+            "transition_matrix": {
+                MOVES[i]: {MOVES[j]: int(self.transitions[i, j]) for j in range(3)}
+                for i in range(3)
+            },
+            "player_second_last_move": _to_name(self.player_second_last_move, MOVES)
+        })
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MarkovState":
+        state = cls()
+        state._load_base_dict(data)
+        for prev, row in data.get("transition_matrix", {}).items():
+            for move, count in row.items():
+                state.transitions[MOVE_INDEX[prev], MOVE_INDEX[move]] = count
+        state.player_second_last_move = _to_code(data.get("player_second_last_move"), MOVE_INDEX)
+        return state
+
+
+class PatternState(ModelState):
+    """
+    State for PatternAI.
+
+    ``pattern_counts`` has one row per base-3 encoded sequence of the last
+    ``sequence_length`` moves, counting which move followed it.
+    ``recent_moves`` holds the codes of the most recent moves (capped).
+    """
+    __slots__ = ("sequence_length", "context", "pattern_counts", "move_counts", "recent_moves")
+    kind = 3
+
+    _FIELDS = struct.Struct("<BIH")
+
+    def __init__(self, sequence_length: int = 3):
+        super().__init__()
+        self.sequence_length = sequence_length
+        self.context = 0
+        self.pattern_counts = np.zeros((3 ** sequence_length, 3), dtype=COUNT_DTYPE)
+        self.move_counts = np.zeros(3, dtype=COUNT_DTYPE)
+        self.recent_moves = bytearray()
+
+    def _encode_payload(self) -> bytes:
+        return b"".join((
+            self._FIELDS.pack(self.sequence_length, self.context, len(self.recent_moves)),
+            self.pattern_counts.tobytes(),
+            self.move_counts.tobytes(),
+            bytes(self.recent_moves)
+        ))
+
+    def _decode_payload(self, payload: memoryview) -> None:
+        self.sequence_length, self.context, history_len = self._FIELDS.unpack_from(payload)
+        offset = self._FIELDS.size
+        self.pattern_counts, offset = _read_array(
+            payload, offset, COUNT_DTYPE, (3 ** self.sequence_length, 3)
+        )
+        self.move_counts, offset = _read_array(payload, offset, COUNT_DTYPE, (3,))
+        self.recent_moves = bytearray(payload[offset:offset + history_len])
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = super().to_dict()
+        data.update({
+            "player_moves": [MOVES[code] for code in self.recent_moves],
+            "move_counts": self.move_counts.tolist(),
+            "sequence_length": self.sequence_length
+        })
+        return data
+
+
+class AdaptiveMarkovState(ModelState):
+    """
+    State for AdaptiveMarkovAI.
+
+    Counts are stored as observed integer counts; the smoothing prior is added
+    when probabilities are computed.
+    ``last_lambdas`` holds (markov, freq, markov_entropy, freq_entropy).
+    ``kernel_cache`` holds values AdaptiveMarkovAI derives from the counts;
+    it is not encoded, and anything that changes the counts outside the
+    kernel resets it to None.
+    """
+    __slots__ = (
+        "markov_counts", "frequency_counts", "player_second_last_move",
+        "smoothing", "temperature", "last_lambdas", "kernel_cache"
+    )
+    kind = 4
+
+    _FIELDS = struct.Struct("<bdd")
+
+    def __init__(self, smoothing: float = 1.0, temperature: float = 1.0):
+        super().__init__()
+        self.markov_counts = np.zeros((3, 3), dtype=COUNT_DTYPE)
+        self.frequency_counts = np.zeros(3, dtype=COUNT_DTYPE)
+        self.player_second_last_move = NO_MOVE
+        self.smoothing = smoothing
+        self.temperature = temperature
+        self.last_lambdas = np.array([0.5, 0.5, 0.0, 0.0], dtype=FLOAT_DTYPE)
+        self.kernel_cache = None
+
+    def _encode_payload(self) -> bytes:
+        return b"".join((
+            self._FIELDS.pack(self.player_second_last_move, self.smoothing, self.temperature),
+            self.markov_counts.tobytes(),
+            self.frequency_counts.tobytes(),
+            self.last_lambdas.tobytes()
+        ))
+
+    def _decode_payload(self, payload: memoryview) -> None:
+        self.player_second_last_move, self.smoothing, self.temperature = self._FIELDS.unpack_from(payload)
+        offset = self._FIELDS.size
+        self.markov_counts, offset = _read_array(payload, offset, COUNT_DTYPE, (3, 3))
+        self.frequency_counts, offset = _read_array(payload, offset, COUNT_DTYPE, (3,))
+        self.last_lambdas, offset = _read_array(payload, offset, FLOAT_DTYPE, (4,))
+        self.kernel_cache = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = super().to_dict()
+        markov, freq, markov_entropy, freq_entropy = self.last_lambdas.tolist()
+        data.update({
+            "markov_counts": self.markov_counts.tolist(),
+            "frequency_counts": self.frequency_counts.tolist(),
+            "player_second_last_move": _to_name(self.player_second_last_move, MOVES),
+            "smoothing": self.smoothing,
+            "temperature": self.temperature,
+            "last_lambdas": {
+                "markov": markov,
+                "freq": freq,
+                "markov_entropy": markov_entropy,
+                "freq_entropy": freq_entropy
+            }
+        })
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AdaptiveMarkovState":
+        smoothing = data.get("smoothing", 1.0)
+        state = cls(smoothing=smoothing, temperature=data.get("temperature", 1.0))
+        state._load_base_dict(data)
+        # Legacy states stored counts with the smoothing prior already added
+        if "markov_counts" in data:
+            counts = np.asarray(data["markov_counts"], dtype=float) - smoothing
+            state.markov_counts[:] = np.rint(counts).clip(min=0)
+        if "frequency_counts" in data:
+            counts = np.asarray(data["frequency_counts"], dtype=float) - smoothing
+            state.frequency_counts[:] = np.rint(counts).clip(min=0)
+        state.player_second_last_move = _to_code(data.get("player_second_last_move"), MOVE_INDEX)
+        lambdas = data.get("last_lambdas", {})
+        state.last_lambdas[:] = [
+            lambdas.get("markov", 0.5),
+            lambdas.get("freq", 0.5),
+            lambdas.get("markov_entropy", 0.0),
+            lambdas.get("freq_entropy", 0.0)
+        ]
+        return state
+
+
+
+def _array_bytes(values: array) -> bytes:
+    """Little-endian bytes of a stdlib array."""
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _read_flat_array(payload: memoryview, offset: int, typecode: str, count: int) -> tuple:
+    """Read a little-endian stdlib array of count items from the payload."""
+    values = array(typecode)
+    end = offset + count * values.itemsize
+    values.frombytes(payload[offset:end])
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values, end
+
+
+class VariableMarkovState(ModelState):
+    """
+    State for VariableMarkovAI.
+
+    A context trie stored in flat arrays, one fixed-size row per node: node 0
+    is the empty context, and ``children[node * alphabet_size + symbol]`` is
+    the node that extends a context one symbol further into the past (0 if
+    there is none). ``counts[node * 3 + move]`` counts the player moves that
+    followed the node's context. ``history`` holds the codes of the last
+    ``order`` symbols, oldest first.
+
+    The trie is walked one scalar at a time, so it uses stdlib arrays, which
+    are much faster than NumPy arrays to index one element at a time. It
+    grows by a row per new context, up to ``max_nodes``, which is at most
+    ``MAX_NODES`` so that node indices fit the 16-bit ``children`` entries.
+    """
+    __slots__ = ("order", "alphabet_size", "max_nodes", "children", "counts", "history")
+    kind = 5
+
+    _FIELDS = struct.Struct("<BBHHB")
+    MAX_NODES = 0xFFFF
+
+    def __init__(self, order: int = 4, alphabet_size: int = 3, max_nodes: int = 1024):
+        if not 1 <= max_nodes <= self.MAX_NODES:
+            raise ValueError(f"max_nodes must be between 1 and {self.MAX_NODES}, got {max_nodes}")
+        super().__init__()
+        self.order = order
+        self.alphabet_size = alphabet_size
+        self.max_nodes = max_nodes
+        self.children = array("H", bytes(2 * alphabet_size))
+        self.counts = array("I", bytes(4 * 3))
+        self.history = bytearray()
+
+    @property
+    def node_count(self) -> int:
+        return len(self.counts) // 3
+
+    def add_node(self) -> int:
+        """Append an empty node and return its index (0 if the trie is full)."""
+        node = len(self.counts) // 3
+        if node >= self.max_nodes:
+            return 0
+        self.children.frombytes(bytes(2 * self.alphabet_size))
+        self.counts.frombytes(bytes(4 * 3))
+        return node
+
+    def _encode_payload(self) -> bytes:
+        return b"".join((
+            self._FIELDS.pack(self.order, self.alphabet_size, self.max_nodes, self.node_count, len(self.history)),
+            _array_bytes(self.children),
+            _array_bytes(self.counts),
+            bytes(self.history)
+        ))
+
+    def _decode_payload(self, payload: memoryview) -> None:
+        self.order, self.alphabet_size, self.max_nodes, nodes, history_len = self._FIELDS.unpack_from(payload)
+        offset = self._FIELDS.size
+        self.children, offset = _read_flat_array(payload, offset, "H", nodes * self.alphabet_size)
+        self.counts, offset = _read_flat_array(payload, offset, "I", nodes * 3)
+        self.history = bytearray(payload[offset:offset + history_len])
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = super().to_dict()
+        data.update({
+            "order": self.order,
+            "contexts": self.node_count,
+            "move_counts": self.counts[:3].tolist()
+        })
+        return data
@@ -1,87 +1,130 @@
 import random
-from collections import defaultdict
-from typing import Dict, Any, Optional, Tuple, List
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
 
 from .base_ai import BaseAI
+from .model_state import PatternState, MOVE_INDEX, NO_MOVE, COUNT_DTYPE
+from .rps import MOVES, COUNTER_MOVE
 
 class PatternAI(BaseAI):
     """
     An AI that recognizes patterns in player moves.
+
+    Patterns are tracked incrementally: each round only the newest player move
+    is ingested into a fixed-size table of follow-up counts (3^k sequences x 3
+    moves), so the per-round cost does not grow with the session length.
     """
+    state_class = PatternState
+
+    def __init__(self, sequence_length: int = 3, max_history: int = 32):
+        super().__init__()
+        self.sequence_length = sequence_length
+        # The recent history must be able to hold a full sequence
+        self.max_history = max(max_history, sequence_length)
+
+    def new_state(self) -> PatternState:
+        return PatternState(self.sequence_length)
+
+    def _ingest(self, state: PatternState, move_idx: int) -> None:
+        """Add a single player move to the pattern tables in place."""
+        recent_moves = state.recent_moves
+
+        # Only count the transition once a full sequence precedes this move
+        if len(recent_moves) >= state.sequence_length:
+            state.pattern_counts[state.context, move_idx] += 1
+        state.move_counts[move_idx] += 1
+
+        # Roll the newest move into the base-3 encoded context
+        state.context = (state.context * 3 + move_idx) % (3 ** state.sequence_length)
+
+        recent_moves.append(move_idx)
+        if len(recent_moves) > self.max_history:
+            del recent_moves[:len(recent_moves) - self.max_history]
+
+    def _learn_rounds(self, state: PatternState, user_moves: np.ndarray, ai_moves: np.ndarray,
+                      results: np.ndarray) -> None:
+        """Ingest many player moves at once, matching repeated ``_ingest`` calls."""
+        if len(user_moves) == 0:
+            return
+        k = state.sequence_length
+        # The last k known moves followed by the new ones
+        previous = state.recent_moves[-k:]
+        sequence = np.concatenate((np.frombuffer(bytes(previous), dtype=np.uint8), user_moves)).astype(np.intp)
 
-    def make_move(self, model_state: Optional[Dict[str, Any]] = None) -> Tuple[str, Dict[str, Any]]:
+        # Base-3 code of every window of k moves; window t precedes move t + k
+        if len(sequence) > k:
+            windows = np.lib.stride_tricks.sliding_window_view(sequence[:-1], k)
+            contexts = windows @ (3 ** np.arange(k - 1, -1, -1))
+            # Only moves after the known history are new (the window before them is always full)
+            first_new = len(previous) - k
+            contexts = contexts[max(first_new, 0):]
+            followers = sequence[k + max(first_new, 0):]
+            state.pattern_counts += np.bincount(
+                contexts * 3 + followers, minlength=state.pattern_counts.size
+            ).astype(COUNT_DTYPE).reshape(state.pattern_counts.shape)
+        state.move_counts += np.bincount(user_moves, minlength=3).astype(COUNT_DTYPE)
+
+        context = 0
+        for move in sequence[-k:].tolist():
+            context = context * 3 + move
+        state.context = context % (3 ** k)
+        state.recent_moves.extend(user_moves[-self.max_history:].astype(np.uint8).tobytes())
+        del state.recent_moves[:max(len(state.recent_moves) - self.max_history, 0)]
+        state.player_last_move = NO_MOVE
+
+    def state_from_dict(self, data: Dict[str, Any]) -> PatternState:
+        """Migrate a dictionary state, replaying legacy move lists once."""
+        state = PatternState(data.get("sequence_length", self.sequence_length))
+        state._load_base_dict(data)
+        if "pattern_counts" in data:
+            state.pattern_counts.flat[:] = data["pattern_counts"]
+            state.move_counts[:] = data["move_counts"]
+            state.context = data["context"]
+            state.recent_moves.extend(MOVE_INDEX[move] for move in data.get("player_moves", []))
+        else:
+            for move in data.get("player_moves", []):
+                self._ingest(state, MOVE_INDEX[move])
+        return state
+
+    def make_move(self, model_state: Optional[PatternState] = None) -> Tuple[str, PatternState]:
         """
         Generate a move based on pattern recognition of player's previous moves.
 
         Args:
-            model_state: Dictionary containing:
-                - player_moves: List of previous player moves
-                - pattern_dict: Dictionary mapping move sequences to next moves
-                - sequence_length: Length of sequences to track
+            model_state: PatternState containing:
+                - player_last_move: The player's most recent move (not yet ingested)
+                - recent_moves: The most recent player moves (at most max_history)
+                - pattern_counts: 3^k x 3 table counting the move that followed
+                  each base-3 encoded sequence of k moves
+                - move_counts: Overall counts of rock, paper and scissors
+                - context: Base-3 code of the last k player moves
+                - sequence_length: Length of sequences to track (k)
 
         Returns:
             Tuple containing:
             - str: Selected move
-            - Dict: Updated model state
+            - PatternState: Updated model state
         """
-        # Initialize state if not provided
-        if model_state is None:
-            model_state = {
-                "player_last_move": None,
-                "player_moves": [],
-                "pattern_dict": defaultdict(list),
-                "sequence_length": 3  # Default pattern length to recognize
-            }
-        
-        player_last_move = model_state.get("player_last_move", None)
-        player_moves = model_state.get("player_moves", [])
-        pattern_dict = model_state.get("pattern_dict", defaultdict(list))
-        sequence_length = model_state.get("sequence_length", 3)
-
-        if player_last_move:
-            player_moves.append(player_last_move)
-            
+        state = self.load_state(model_state)
+
+        if state.player_last_move != NO_MOVE:
+            self._ingest(state, state.player_last_move)
+        state.player_last_move = NO_MOVE
+
         # If we don't have enough history, choose randomly
-        if len(player_moves) < sequence_length:
-            return random.choice(self.possible_moves), model_state
-
-        # Update pattern dictionary with new patterns (if there's a new player move)
-        for i in range(len(player_moves) - sequence_length):
-            seq = tuple(player_moves[i:i+sequence_length])
-            if i + sequence_length < len(player_moves):
-                next_move = player_moves[i+sequence_length]
-                pattern_dict[seq].append(next_move)
-
-        # Get the most recent sequence of moves
-        recent_sequence = tuple(player_moves[-sequence_length:])
-
-        # Predict next player move based on pattern matching
-        predicted_move = None
-        if recent_sequence in pattern_dict and pattern_dict[recent_sequence]:
-            # Count frequency of moves following this sequence
-            move_counts = {move: 0 for move in self.possible_moves}
-            for move in pattern_dict[recent_sequence]:
-                move_counts[move] += 1
-
-            # Predict the most common move
-            predicted_move = max(move_counts, key=move_counts.get)
-        else:
+        if len(state.recent_moves) < state.sequence_length:
+            return MOVES[random.randrange(3)], state
+
+        # Predict next player move from the moves that followed the recent sequence
+        counts = state.pattern_counts[state.context]
+        if not counts.any():
             # If no pattern found, predict based on overall frequency
-            move_counts = {move: player_moves.count(move) for move in self.possible_moves}
-            predicted_move = max(move_counts, key=move_counts.get)
+            counts = state.move_counts
+        predicted_idx = int(counts.argmax())
 
         # Choose counter move
-        if predicted_move == "rock":
-            ai_move = "paper"
-        elif predicted_move == "paper":
-            ai_move = "scissors"
-        else:  # scissors
-            ai_move = "rock"
+        ai_move = COUNTER_MOVE[predicted_idx]
 
         # Return move and updated state
-        return ai_move, {
-            "player_last_move": None,
-            "player_moves": player_moves,
-            "pattern_dict": dict(pattern_dict),  # Convert defaultdict to dict for serialization
-            "sequence_length": sequence_length
-        }
\ No newline at end of file
+        return ai_move, state
@@ -1,29 +1,37 @@
 # RockPaperScissor/models/random_ai.py
 import random
 from RockPaperScissor.models.base_ai import BaseAI
+from RockPaperScissor.models.model_state import RandomState, NO_MOVE
+from RockPaperScissor.models.rps import MOVES, COUNTER_MOVE
 
 class RandomAI(BaseAI):
     """
     AI that makes random moves
     """
+    state_class = RandomState
+
     def make_move(self, model_state=None):
         """
         Makes a random move
         
         Args:
-            previous_moves (list, optional): Not used in this strategy
+            model_state (RandomState, optional): Only the player's last move is used
             
         Returns:
-            str: A random choice from ["rock", "paper", "scissors"]
+            Tuple containing:
+            - str: A random choice from ["rock", "paper", "scissors"], or the
+              counter to the player's last move once one is known
+            - RandomState: Updated model state
         """
-        if not model_state:
-            return random.choice(self.possible_moves), {"player_last_move" : None}
+        state = self.load_state(model_state)
+        if state.player_last_move == NO_MOVE:
+            ai_move = MOVES[random.randrange(3)]
         else:
             # Choose counter move
-            if model_state["player_last_move"] == "rock":
-                ai_move = "paper"
-            elif model_state["player_last_move"] == "paper":
-                ai_move = "scissors"
-            else:  # scissors
-                ai_move = "rock"
-            return ai_move, {"player_last_move" : None}
\ No newline at end of file
+            ai_move = COUNTER_MOVE[state.player_last_move]
+        state.player_last_move = NO_MOVE
+        return ai_move, state
+
+    def _learn_rounds(self, state, user_moves, ai_moves, results):
+        """Nothing is learned from past rounds."""
+        state.player_last_move = NO_MOVE
@@ -0,0 +1,113 @@
+"""
+Rock-paper-scissors kernel: integer move codes and precomputed lookup tables.
+
+Moves and results are small integer codes. Everything the play path needs
+per round (the outcome of a pair of moves, the move that beats a predicted
+move) is a table lookup, so scoring a round does no string comparison and
+builds no temporary containers.
+"""
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+MOVES = ("rock", "paper", "scissors")
+MOVE_INDEX = {move: idx for idx, move in enumerate(MOVES)}
+ROCK, PAPER, SCISSORS = range(3)
+
+RESULTS = ("draw", "player_win", "ai_win")
+RESULT_INDEX = {result: idx for idx, result in enumerate(RESULTS)}
+DRAW, PLAYER_WIN, AI_WIN = range(3)
+
+# Code used for "no move" / "no result" in the integer fields
+NO_MOVE = -1
+
+# OUTCOME[user_move][ai_move] -> result code (each move beats the one before it)
+OUTCOME = tuple(tuple((user - ai) % 3 for ai in range(3)) for user in range(3))
+# Same table as an array, for scoring many rounds at once
+OUTCOME_TABLE = np.array(OUTCOME, dtype=np.int8)
+
+# COUNTER[move] -> code of the move that beats it
+COUNTER = tuple((move + 1) % 3 for move in range(3))
+# COUNTER_MOVE[move] -> name of the move that beats it
+COUNTER_MOVE = tuple(MOVES[counter] for counter in COUNTER)
+
+class SessionStats:
+    """
+    Running totals of one game session.
+
+    Counters are updated in place from move and result codes. Each round's
+    record holds its own copy, and ``to_dict`` gives the form returned to
+    clients and stored with the round.
+    """
+    __slots__ = ("total_rounds", "player_wins", "ai_wins", "draws",
+                 "rock_count", "paper_count", "scissors_count")
+
+    def __init__(self):
+        self.total_rounds = 0
+        self.player_wins = 0
+        self.ai_wins = 0
+        self.draws = 0
+        self.rock_count = 0
+        self.paper_count = 0
+        self.scissors_count = 0
+
+    def record(self, user_move: int, result: int) -> None:
+        """Count one round from the player's move code and the result code."""
+        self.total_rounds += 1
+        if result == PLAYER_WIN:
+            self.player_wins += 1
+        elif result == AI_WIN:
+            self.ai_wins += 1
+        else:
+            self.draws += 1
+
+        if user_move == ROCK:
+            self.rock_count += 1
+        elif user_move == PAPER:
+            self.paper_count += 1
+        else:
+            self.scissors_count += 1
+
+    def copy(self) -> "SessionStats":
+        """Copy the counters into a new object."""
+        stats = SessionStats.__new__(SessionStats)
+        stats.total_rounds = self.total_rounds
+        stats.player_wins = self.player_wins
+        stats.ai_wins = self.ai_wins
+        stats.draws = self.draws
+        stats.rock_count = self.rock_count
+        stats.paper_count = self.paper_count
+        stats.scissors_count = self.scissors_count
+        return stats
+
+    def to_dict(self) -> Dict[str, int]:
+        """Convert to the session stats dictionary."""
+        return {
+            "total_rounds": self.total_rounds,
+            "player_wins": self.player_wins,
+            "ai_wins": self.ai_wins,
+            "draws": self.draws,
+            "rock_count": self.rock_count,
+            "paper_count": self.paper_count,
+            "scissors_count": self.scissors_count
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SessionStats":
+        """Build from a session stats dictionary (missing counters are zero)."""
+        stats = cls()
+        for name in cls.__slots__:
+            setattr(stats, name, int(data.get(name, 0)))
+        return stats
+
+    @classmethod
+    def load(cls, value: Optional[Any]) -> "SessionStats":
+        """Coerce stored session stats (an object, a dictionary or None) into a new object."""
+        if isinstance(value, cls):
+            return value.copy()
+        if value:
+            return cls.from_dict(value)
+        return cls()
+
+    def __repr__(self) -> str:
+        return f"SessionStats({self.to_dict()})"
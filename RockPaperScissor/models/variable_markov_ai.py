@@ -0,0 +1,140 @@
+import random
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .base_ai import BaseAI
+from .model_state import VariableMarkovState, NO_MOVE
+from .rps import MOVES, COUNTER_MOVE
+
+class VariableMarkovAI(BaseAI):
+    """
+    Variable-order Markov (PPM-style) AI over the last few rounds.
+
+    Every context of up to ``order`` recent rounds gets a node in a context
+    trie that counts the player's next move. Predictions blend the counts of
+    all contexts matching the current history, from the empty context to the
+    longest: each context's counts are smoothed towards the prediction of the
+    context one round shorter, weighted as ``prior`` pseudo-counts. A long
+    context dominates once it has been seen often, shorter ones fill in until
+    then. Updating and predicting each walk at most ``order`` trie nodes, and
+    the trie stops growing at ``max_nodes`` contexts.
+    """
+    state_class = VariableMarkovState
+
+    def __init__(self, order: int = 4, prior: float = 24.0, include_ai_moves: bool = False, max_nodes: int = 1024):
+        """
+        Args:
+            order: Longest context, in rounds
+            prior: Weight of the shorter context's prediction in each context, in pseudo-counts
+            include_ai_moves: Contexts are (player move, AI move) pairs, which
+                    also determine the results, instead of player moves only
+            max_nodes: Maximum number of contexts kept per state, at most
+                    ``VariableMarkovState.MAX_NODES``
+        """
+        if not 1 <= max_nodes <= VariableMarkovState.MAX_NODES:
+            raise ValueError(f"max_nodes must be between 1 and {VariableMarkovState.MAX_NODES}, got {max_nodes}")
+        super().__init__()
+        self.order = order
+        self.alphabet_size = 9 if include_ai_moves else 3
+        self.max_nodes = max_nodes
+        self.prior = prior
+
+    def new_state(self) -> VariableMarkovState:
+        return VariableMarkovState(self.order, self.alphabet_size, self.max_nodes)
+
+    @staticmethod
+    def _learn(state: VariableMarkovState, user_move: int, ai_move: int) -> None:
+        """Count the player's move after every context of the history, then extend the history."""
+        children = state.children
+        counts = state.counts
+        history = state.history
+        alphabet_size = state.alphabet_size
+
+        # Walk from the empty context back through the history, adding missing contexts
+        node = 0
+        counts[user_move] += 1
+        for depth in range(1, len(history) + 1):
+            slot = node * alphabet_size + history[-depth]
+            child = children[slot]
+            if child == 0:
+                child = state.add_node()
+                if child == 0:
+                    break  # The trie is full
+                children[slot] = child
+            node = child
+            counts[node * 3 + user_move] += 1
+
+        history.append(user_move if alphabet_size == 3 else user_move * 3 + max(ai_move, 0))
+        if len(history) > state.order:
+            del history[0]
+
+    def _predict(self, state: VariableMarkovState) -> int:
+        """Predict the player's next move, or NO_MOVE if nothing has been seen yet."""
+        children = state.children
+        counts = state.counts
+        history = state.history
+        alphabet_size = state.alphabet_size
+        if not (counts[0] or counts[1] or counts[2]):
+            return NO_MOVE
+
+        # Blend from the empty context out to the longest one matching the history
+        prior = self.prior
+        p0 = p1 = p2 = 1 / 3
+        node = 0
+        depth = 0
+        while True:
+            base = node * 3
+            c0 = counts[base]
+            c1 = counts[base + 1]
+            c2 = counts[base + 2]
+            total = c0 + c1 + c2
+            if total:
+                total += prior
+                p0 = (c0 + prior * p0) / total
+                p1 = (c1 + prior * p1) / total
+                p2 = (c2 + prior * p2) / total
+            depth += 1
+            if depth > len(history):
+                break
+            node = children[node * alphabet_size + history[-depth]]
+            if node == 0:
+                break
+
+        # Most likely move (first one on ties, like argmax)
+        if p1 > p0:
+            return 2 if p2 > p1 else 1
+        return 2 if p2 > p0 else 0
+
+    def make_move(self, model_state: Optional[VariableMarkovState] = None) -> Tuple[str, VariableMarkovState]:
+        """
+        Generate a move from the longest matching contexts of the recent rounds.
+
+        Args:
+            model_state: VariableMarkovState containing:
+                - player_last_move, ai_last_move: The last round (not yet learned)
+                - children, counts: The context trie and the moves that followed each context
+                - history: The last ``order`` rounds
+
+        Returns:
+            Tuple containing:
+            - str: Selected move
+            - VariableMarkovState: Updated model state
+        """
+        state = self.load_state(model_state)
+
+        if state.player_last_move != NO_MOVE:
+            self._learn(state, state.player_last_move, state.ai_last_move)
+        state.player_last_move = NO_MOVE
+
+        predicted_idx = self._predict(state)
+        if predicted_idx == NO_MOVE:
+            return MOVES[random.randrange(3)], state
+        return COUNTER_MOVE[predicted_idx], state
+
+    def _learn_rounds(self, state: VariableMarkovState, user_moves: np.ndarray, ai_moves: np.ndarray,
+                      results: np.ndarray) -> None:
+        """Learn each round without predicting the moves in between."""
+        for user_move, ai_move in zip(user_moves.tolist(), ai_moves.tolist()):
+            self._learn(state, user_move, ai_move)
+        state.player_last_move = NO_MOVE
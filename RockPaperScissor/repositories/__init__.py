@@ -2,16 +2,25 @@
 
 from .storage import Storage, StorageError
 from .sql_storage import SQLStorage, SQLStorageError
+from .sqlite_pool import SQLiteReadPool
 from .s3_storage import S3Storage, S3StorageError
+from .local_s3 import LocalS3Client
 from .combined_storage import CombinedStorage, CombinedStorageError
+from .memory_storage import MemoryStorage
+from .columnar_export import ColumnarExporter, ExportError
 
 __all__ = [
     'Storage',
     'StorageError',
     'SQLStorage',
     'SQLStorageError',
+    'SQLiteReadPool',
     'S3Storage',
     'S3StorageError',
+    'LocalS3Client',
     'CombinedStorage',
     'CombinedStorageError',
+    'MemoryStorage',
+    'ColumnarExporter',
+    'ExportError',
 ] 
\ No newline at end of file
@@ -0,0 +1,120 @@
+"""Circuit breaker used to route around an unhealthy storage backend."""
+
+import time
+from typing import Any, Dict
+from ..utils import setup_logging
+from ..utils.metrics import Counter, Histogram
+
+logger = setup_logging()
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open circuit breaker.
+
+    Closed: calls go through; ``failure_threshold`` consecutive failures open
+    the circuit. Open: calls are rejected until ``recovery_timeout_sec`` has
+    passed, then the circuit becomes half-open. Half-open: up to
+    ``half_open_max_calls`` trial calls go through; a success closes the
+    circuit and a failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 3,
+        recovery_timeout_sec: float = 30.0,
+        half_open_max_calls: int = 1
+    ):
+        """
+        Initialize the breaker in the closed state.
+
+        Args:
+            name: Backend name used in logs and metric names
+            failure_threshold: Consecutive failures that open the circuit
+            recovery_timeout_sec: Time the circuit stays open before a trial call
+            half_open_max_calls: Trial calls allowed while half-open
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout_sec = recovery_timeout_sec
+        self.half_open_max_calls = half_open_max_calls
+
+        self._state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._half_open_calls = 0
+
+        # Metrics
+        self.latency = Histogram(f"{name}_call_seconds", f"Latency of {name} calls")
+        self.successes = Counter(f"{name}_successes_total", f"Successful {name} calls")
+        self.failures = Counter(f"{name}_failures_total", f"Failed {name} calls")
+        self.rejected = Counter(f"{name}_rejected_total", f"{name} calls skipped while the circuit was open")
+        self.state_changes = Counter(f"{name}_circuit_state_changes_total", f"{name} circuit state transitions")
+
+    @property
+    def state(self) -> str:
+        """Current state; an open circuit turns half-open once the recovery timeout passes."""
+        if self._state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout_sec:
+            self._transition(self.HALF_OPEN)
+        return self._state
+
+    def _transition(self, state: str) -> None:
+        if state == self._state:
+            return
+        logger.info("%s circuit %s -> %s", self.name, self._state, state)
+        self._state = state
+        self.state_changes.inc()
+        if state == self.OPEN:
+            self.opened_at = time.monotonic()
+        if state == self.HALF_OPEN:
+            self._half_open_calls = 0
+
+    def allow_request(self) -> bool:
+        """Check whether a call may go to the backend now."""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+            self._half_open_calls += 1
+            return True
+        self.rejected.inc()
+        return False
+
+    def record_success(self, latency: float = 0.0) -> None:
+        """Record a successful call; closes a half-open circuit."""
+        self.latency.observe(latency)
+        self.successes.inc()
+        self.consecutive_failures = 0
+        if self._state != self.CLOSED:
+            self._transition(self.CLOSED)
+
+    def record_failure(self, latency: float = 0.0) -> None:
+        """Record a failed call; opens the circuit at the threshold or on a failed trial."""
+        self.latency.observe(latency)
+        self.failures.inc()
+        self.consecutive_failures += 1
+        if self._state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self._transition(self.OPEN)
+            # Restart the recovery timer on every failure while open
+            self.opened_at = time.monotonic()
+
+    def force_open(self) -> None:
+        """Open the circuit without waiting for failures (e.g. backend failed to start)."""
+        self._transition(self.OPEN)
+        self.opened_at = time.monotonic()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get state, failure counters and call latency."""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "successes": self.successes.value,
+            "failures": self.failures.value,
+            "rejected": self.rejected.value,
+            "state_changes": self.state_changes.value,
+            "latency_seconds": self.latency.snapshot()
+        }
@@ -0,0 +1,352 @@
+"""
+Columnar export of game rounds and LLM interactions for bulk analysis.
+
+Rows are streamed out of SQLite (keyset pages over the id column) and out of
+the hourly S3 batch objects, and written as Parquet files partitioned by day
+(``<table>/dt=YYYY-MM-DD/``). Low-cardinality columns (moves, results, model
+names) are dictionary encoded. A watermark per source records how far each
+export got, so incremental runs only read new rows.
+
+pyarrow is only needed here and is imported on first use.
+
+Usage:
+    python -m RockPaperScissor.repositories.columnar_export --db data/game_data.db
+    python -m RockPaperScissor.repositories.columnar_export --s3 --tables game_rounds
+    python -m RockPaperScissor.repositories.columnar_export --full
+"""
+import argparse
+import gzip
+import json
+import sqlite3
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from .storage import StorageError
+from ..utils import setup_logging
+from ..config.database import EXPORT_CONFIG, SQLITE_CONFIG
+
+logger = setup_logging()
+
+# Columns written per table, in file order
+ROUND_COLUMNS = ["game_id", "user_id", "session_id", "timestamp", "user_move", "ai_move", "result", "model_name"]
+LLM_COLUMNS = ["id", "prompt", "response", "timestamp", "llm_model_name", "session_id", "game_id", "user_id", "metadata"]
+TABLE_COLUMNS = {"game_rounds": ROUND_COLUMNS, "llm_interactions": LLM_COLUMNS}
+
+# Dictionary-encoded columns per table (a handful of distinct values each)
+DICTIONARY_COLUMNS = {
+    "game_rounds": ["user_move", "ai_move", "result", "model_name", "source"],
+    "llm_interactions": ["llm_model_name", "source"],
+}
+
+# Prefix of the hourly batch object manifests written by S3Storage
+S3_MANIFEST_PREFIX = "game_rounds/_manifests/"
+
+class ExportError(StorageError):
+    """Exception for columnar export errors."""
+    pass
+
+def _pyarrow():
+    """Import pyarrow and pyarrow.parquet, with an install hint if missing."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ExportError("Columnar export needs pyarrow (pip install pyarrow)") from e
+    return pyarrow, pyarrow.parquet
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    """Parse SQLite and JSON timestamps ('YYYY-MM-DD HH:MM:SS[.ffffff]' or ISO 8601)."""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return None
+
+class ColumnarExporter:
+    """
+    Writes Parquet exports of the stored rounds and LLM interactions.
+
+    Each source keeps its own watermark in ``_watermarks.json`` under the
+    output directory: the last exported row id for SQLite tables and the
+    last exported hour partition for S3. Files are named after the first
+    row (SQLite) or the hour (S3) they hold, so re-running an export that
+    stopped part way overwrites the same files instead of duplicating rows.
+    """
+
+    def __init__(
+        self,
+        output_dir: str = EXPORT_CONFIG["dir"],
+        db_path: Optional[str] = None,
+        s3_client: Any = None,
+        bucket_name: Optional[str] = None,
+        chunk_rows: int = EXPORT_CONFIG["chunk_rows"],
+        compression: str = EXPORT_CONFIG["compression"]
+    ):
+        """
+        Initialize the exporter.
+
+        Args:
+            output_dir: Root directory of the Parquet dataset
+            db_path: SQLite database to export from (None to skip SQLite)
+            s3_client: boto3-compatible client to read batch objects from (None to skip S3)
+            bucket_name: Bucket holding the batch objects
+            chunk_rows: Rows read and written per chunk
+            compression: Parquet compression codec
+        """
+        self.output_dir = Path(output_dir)
+        self.db_path = db_path
+        self.s3 = s3_client
+        self.bucket_name = bucket_name
+        self.chunk_rows = chunk_rows
+        self.compression = compression
+        self.watermark_path = self.output_dir / "_watermarks.json"
+        self.watermarks: Dict[str, Any] = (
+            json.loads(self.watermark_path.read_text()) if self.watermark_path.is_file() else {}
+        )
+
+    def _save_watermark(self, source: str, value: Any) -> None:
+        """Record export progress for a source (written atomically)."""
+        self.watermarks[source] = value
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.watermark_path.with_name(self.watermark_path.name + ".tmp")
+        tmp_path.write_text(json.dumps(self.watermarks, indent=2, sort_keys=True))
+        tmp_path.replace(self.watermark_path)
+
+    def _reset(self, table: str, source: str) -> None:
+        """Forget a source's watermark and delete its files (for full exports)."""
+        for path in (self.output_dir / table).glob(f"dt=*/{source}-*.parquet"):
+            path.unlink()
+        self.watermarks.pop(f"{source}:{table}", None)
+
+    def _write(self, table: str, source: str, name: str, rows: List[Dict[str, Any]]) -> int:
+        """
+        Write rows as one Parquet file per day.
+
+        Args:
+            table: Exported table (selects columns and dictionary encoding)
+            source: "sqlite" or "s3", stored in a column and the file names
+            name: File name suffix identifying the rows' position in the source
+            rows: Rows with the table's columns; timestamps may be strings
+
+        Returns:
+            int: Number of files written
+        """
+        pa, pq = _pyarrow()
+        columns = TABLE_COLUMNS[table]
+        by_day: Dict[str, Dict[str, list]] = defaultdict(lambda: {column: [] for column in columns})
+        for row in rows:
+            timestamp = _parse_timestamp(row.get("timestamp"))
+            day = by_day[f"{timestamp:%Y-%m-%d}" if timestamp else "unknown"]
+            for column in columns:
+                day[column].append(timestamp if column == "timestamp" else row.get(column))
+
+        for dt, values in by_day.items():
+            arrays, names = [], []
+            for column in columns:
+                if column == "timestamp":
+                    array = pa.array(values[column], type=pa.timestamp("us"))
+                elif column == "id":
+                    array = pa.array(values[column], type=pa.int64())
+                else:
+                    array = pa.array(values[column], type=pa.string())
+                if column in DICTIONARY_COLUMNS[table]:
+                    array = array.dictionary_encode()
+                arrays.append(array)
+                names.append(column)
+            arrays.append(pa.array([source] * len(values["timestamp"]), type=pa.string()).dictionary_encode())
+            names.append("source")
+
+            path = self.output_dir / table / f"dt={dt}" / f"{source}-{name}.parquet"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write then rename so readers never see a partial file (dataset
+            # readers skip names starting with a dot)
+            tmp_path = path.with_name(f".{path.name}.tmp")
+            pq.write_table(
+                pa.Table.from_arrays(arrays, names=names),
+                tmp_path,
+                compression=self.compression,
+                use_dictionary=DICTIONARY_COLUMNS[table]
+            )
+            tmp_path.replace(path)
+        return len(by_day)
+
+    def _sqlite_chunks(self, table: str, after_id: int) -> Iterator[Tuple[int, int, List[Dict[str, Any]]]]:
+        """Yield (first id, last id, rows) pages of a table with id > after_id."""
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, timeout=SQLITE_CONFIG["timeout"])
+        conn.row_factory = sqlite3.Row
+        try:
+            select_columns = ", ".join(["id"] + [c for c in TABLE_COLUMNS[table] if c != "id"])
+            query = f"SELECT {select_columns} FROM {table} WHERE id > ? ORDER BY id LIMIT ?"
+            while True:
+                rows = [dict(row) for row in conn.execute(query, (after_id, self.chunk_rows))]
+                if not rows:
+                    return
+                yield rows[0]["id"], rows[-1]["id"], rows
+                after_id = rows[-1]["id"]
+        finally:
+            conn.close()
+
+    def export_sqlite(self, table: str, full: bool = False) -> Dict[str, Any]:
+        """
+        Export rows of a SQLite table added since the last export.
+
+        Args:
+            table: "game_rounds" or "llm_interactions"
+            full: Ignore the watermark and re-export the whole table
+
+        Returns:
+            Dict with rows and files written and the new watermark
+        """
+        source = f"sqlite:{table}"
+        if full:
+            self._reset(table, "sqlite")
+        after_id = self.watermarks.get(source, 0)
+        rows_written = files_written = 0
+        for first_id, last_id, rows in self._sqlite_chunks(table, after_id):
+            files_written += self._write(table, "sqlite", f"{first_id:012d}", rows)
+            rows_written += len(rows)
+            # Saved per chunk, so an interrupted export resumes from here
+            self._save_watermark(source, last_id)
+        return {"rows": rows_written, "files": files_written, "watermark": self.watermarks.get(source, after_id)}
+
+    def _list_keys(self, prefix: str, start_after: str = "") -> Iterator[str]:
+        """List object keys under a prefix, following continuation tokens."""
+        kwargs = {"Bucket": self.bucket_name, "Prefix": prefix}
+        if start_after:
+            kwargs["StartAfter"] = start_after
+        while True:
+            response = self.s3.list_objects_v2(**kwargs)
+            for entry in response.get("Contents", []):
+                if entry["Key"] > start_after:
+                    yield entry["Key"]
+            if not response.get("IsTruncated"):
+                return
+            kwargs["ContinuationToken"] = response["NextContinuationToken"]
+
+    def export_s3_rounds(self, full: bool = False, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Export game rounds from the hourly S3 batch objects.
+
+        Only hours that ended at least ``s3_settle_sec`` ago are exported, so
+        batches still being flushed for an hour aren't missed. Each hour
+        becomes one file per day partition. Rounds saved as individual
+        objects (with batch writes disabled) are not exported.
+
+        Args:
+            full: Ignore the watermark and re-export every settled hour
+            now: Current time (for tests)
+
+        Returns:
+            Dict with rows and files written and the new watermark
+        """
+        source = "s3:game_rounds"
+        if full:
+            self._reset("game_rounds", "s3")
+        watermark = self.watermarks.get(source, "")  # Last exported partition, 'dt=YYYY-MM-DD/hour=HH'
+        settled_before = (now or datetime.now()) - timedelta(seconds=EXPORT_CONFIG["s3_settle_sec"])
+
+        # Manifest keys are 'game_rounds/_manifests/dt=.../hour=HH/<batch>.json'
+        manifests: Dict[str, List[str]] = defaultdict(list)
+        # Skip straight past the watermark hour's manifests
+        start_after = f"{S3_MANIFEST_PREFIX}{watermark}/\uffff" if watermark else ""
+        for key in self._list_keys(S3_MANIFEST_PREFIX, start_after):
+            partition = "/".join(key[len(S3_MANIFEST_PREFIX):].split("/")[:2])
+            manifests[partition].append(key)
+
+        rows_written = files_written = 0
+        for partition in sorted(manifests):
+            if partition <= watermark:
+                continue
+            hour = datetime.strptime(partition, "dt=%Y-%m-%d/hour=%H")
+            if hour + timedelta(hours=1) > settled_before:
+                break
+            rows = []
+            for manifest_key in manifests[partition]:
+                manifest = json.loads(self.s3.get_object(Bucket=self.bucket_name, Key=manifest_key)["Body"].read())
+                body = self.s3.get_object(Bucket=self.bucket_name, Key=manifest["key"])["Body"].read()
+                rows.extend(json.loads(line) for line in gzip.decompress(body).splitlines() if line)
+            if rows:
+                files_written += self._write("game_rounds", "s3", f"{hour:%H}", rows)
+                rows_written += len(rows)
+            self._save_watermark(source, partition)
+        return {"rows": rows_written, "files": files_written, "watermark": self.watermarks.get(source, watermark)}
+
+    def run(self, tables: Tuple[str, ...] = ("game_rounds", "llm_interactions"), full: bool = False) -> Dict[str, Any]:
+        """
+        Export every configured source.
+
+        Args:
+            tables: Tables to export
+            full: Re-export everything instead of only new rows
+
+        Returns:
+            Dict of per-source results and the total time taken
+        """
+        _pyarrow()  # Fail before reading anything if pyarrow is missing
+        started = time.perf_counter()
+        results = {}
+        if self.db_path:
+            for table in tables:
+                results[f"sqlite:{table}"] = self.export_sqlite(table, full=full)
+        if self.s3 is not None and "game_rounds" in tables:
+            results["s3:game_rounds"] = self.export_s3_rounds(full=full)
+        elapsed = time.perf_counter() - started
+        for source, result in results.items():
+            logger.info("Exported %s rows from %s into %s files", result["rows"], source, result["files"])
+        return {"sources": results, "seconds": elapsed}
+
+def read_table(table: str, output_dir: str = EXPORT_CONFIG["dir"], columns: Optional[List[str]] = None,
+               since: Optional[str] = None) -> Any:
+    """
+    Load an exported table as a pyarrow Table.
+
+    Args:
+        table: "game_rounds" or "llm_interactions"
+        output_dir: Root directory of the Parquet dataset
+        columns: Columns to read (all by default)
+        since: First day to include ('YYYY-MM-DD'); earlier partitions aren't opened
+
+    Returns:
+        pyarrow.Table with the day partition as a "dt" column
+    """
+    _pyarrow()
+    import pyarrow.dataset as ds
+    dataset = ds.dataset(Path(output_dir) / table, format="parquet", partitioning="hive")
+    row_filter = ds.field("dt") >= since if since else None
+    return dataset.to_table(columns=columns, filter=row_filter)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=SQLITE_CONFIG["db_path"], help="SQLite database to export")
+    parser.add_argument("--no-db", action="store_true", help="Skip the SQLite database")
+    parser.add_argument("--s3", action="store_true", help="Also export batch objects from the configured S3 bucket")
+    parser.add_argument("--out", default=EXPORT_CONFIG["dir"], help="Output directory")
+    parser.add_argument("--tables", nargs="+", default=list(TABLE_COLUMNS), choices=list(TABLE_COLUMNS))
+    parser.add_argument("--full", action="store_true", help="Re-export everything, ignoring watermarks")
+    parser.add_argument("--chunk-rows", type=int, default=EXPORT_CONFIG["chunk_rows"])
+    args = parser.parse_args()
+
+    s3_client = bucket_name = None
+    if args.s3:
+        from .s3_storage import S3Storage
+        s3_storage = S3Storage()
+        s3_client, bucket_name = s3_storage.s3, s3_storage.bucket_name
+
+    exporter = ColumnarExporter(
+        output_dir=args.out,
+        db_path=None if args.no_db else args.db,
+        s3_client=s3_client,
+        bucket_name=bucket_name,
+        chunk_rows=args.chunk_rows
+    )
+    print(json.dumps(exporter.run(tuple(args.tables), full=args.full), indent=2))
+
+if __name__ == "__main__":
+    main()
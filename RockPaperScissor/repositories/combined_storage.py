@@ -1,10 +1,16 @@
 """Combined storage implementation that uses both S3 and SQL storage."""
 
-from typing import Dict, Any, Optional
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Any, List, Optional, Tuple
 from .storage import Storage, StorageError
 from .s3_storage import S3Storage, S3StorageError
 from .sql_storage import SQLStorage, SQLStorageError
+from .circuit_breaker import CircuitBreaker
 from ..utils import setup_logging
+from ..utils.metrics import Counter, Histogram
+from ..config.database import STORAGE_CONFIG
 
 logger = setup_logging()
 
@@ -13,85 +19,259 @@ class CombinedStorageError(StorageError):
     pass
 
 class CombinedStorage(Storage):
-    """Storage implementation that uses both S3 and SQL storage."""
+    """
+    Storage implementation that uses both S3 and SQL storage.
+
+    S3 is the primary store for game rounds and LLM interactions, guarded by a
+    circuit breaker. While the circuit is open, writes go straight to SQL
+    (no S3 timeout on the request path) and game rounds are also queued for
+    replay. A background probe checks S3 health and, once it recovers, closes
+    the circuit and migrates the queued rounds to S3 in bulk.
+    """
     
     def __init__(self):
         """Initialize both S3 and SQL storage."""
         try:
-            self.s3_storage = S3Storage()
             self.sql_storage = SQLStorage()
-            self.s3_available = True  # Flag to track S3 availability
-            logger.info("Successfully initialized combined storage")
         except Exception as e:
-            logger.error(f"Failed to initialize combined storage: {str(e)}")
+            logger.error("Failed to initialize combined storage: %s", e)
             raise CombinedStorageError(f"Failed to initialize combined storage: {str(e)}")
+        
+        self.s3_breaker = CircuitBreaker(
+            "s3",
+            failure_threshold=STORAGE_CONFIG["circuit_failure_threshold"],
+            recovery_timeout_sec=STORAGE_CONFIG["circuit_recovery_timeout_sec"]
+        )
+        # Connected in initialize(); S3 being unreachable at startup is not
+        # fatal, the health probe keeps trying to connect
+        self.s3_storage: Optional[S3Storage] = None
+        
+        # Rounds written to SQL while S3 was unavailable, oldest first
+        self.replay_queue: Deque[Dict[str, Any]] = deque(maxlen=STORAGE_CONFIG["replay_max_size"])
+        self.replay_batch_size = STORAGE_CONFIG["replay_batch_size"]
+        self.probe_interval_sec = STORAGE_CONFIG["health_probe_interval_sec"]
+        self._probe_task: Optional[asyncio.Task] = None
+        self._replay_lock = asyncio.Lock()
+        
+        # Metrics (S3 latency is tracked by the breaker)
+        self.sql_latency = Histogram("sql_write_seconds", "Latency of SQL storage writes")
+        self.replayed = Counter("s3_replayed_rounds_total", "Outage rounds migrated to S3")
+        self.replay_dropped = Counter("s3_replay_dropped_total", "Outage rounds dropped from a full replay queue")
+        logger.info("Successfully initialized combined storage")
+    
+    async def _connect_s3(self) -> bool:
+        """Create the S3 backend if it doesn't exist yet; opens the circuit on failure.
+        
+        The client is built in a worker thread: its bucket check is a blocking
+        request that would otherwise stall the event loop for up to the
+        connect timeout while S3 is down.
+        """
+        if self.s3_storage is not None:
+            return True
+        try:
+            self.s3_storage = await asyncio.to_thread(S3Storage)
+            return True
+        except Exception as e:
+            logger.warning("S3 storage is not available: %s", e)
+            self.s3_breaker.force_open()
+            return False
+    
+    @property
+    def s3_available(self) -> bool:
+        """Whether writes currently go to S3."""
+        return self.s3_storage is not None and self.s3_breaker.state == CircuitBreaker.CLOSED
     
     async def initialize(self):
-        """Initialize SQL storage."""
+        """Initialize SQL storage, connect to S3 and start the S3 health probe."""
         await self.sql_storage.initialize()
+        await self._connect_s3()
+        if self._probe_task is None:
+            self._probe_task = asyncio.create_task(self._probe_loop())
+    
+    async def _probe_loop(self) -> None:
+        """Periodically probe S3 health and replay outage rounds after recovery."""
+        while True:
+            try:
+                await asyncio.sleep(self.probe_interval_sec)
+                await self.probe_s3()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error("Error in S3 health probe: %s", e)
+    
+    async def probe_s3(self) -> bool:
+        """
+        Run one lightweight S3 health check and update the circuit.
+        
+        Returns:
+            bool: True if S3 is healthy
+        """
+        if not await self._connect_s3():
+            return False
+        
+        started = time.perf_counter()
+        healthy = await self.s3_storage.health_check()
+        latency = time.perf_counter() - started
+        if healthy:
+            self.s3_breaker.record_success(latency)
+            if self.replay_queue:
+                await self.replay_outage_rounds()
+        else:
+            self.s3_breaker.record_failure(latency)
+        return healthy
+    
+    async def _call_s3(self, call: Callable[[], Awaitable[bool]]) -> bool:
+        """Run an S3 write through the circuit breaker.
+        
+        Returns:
+            bool: True if S3 accepted the write, False if skipped or failed
+        """
+        if self.s3_storage is None or not self.s3_breaker.allow_request():
+            return False
+        started = time.perf_counter()
+        try:
+            success = await call()
+        except Exception as e:
+            logger.error("S3 storage error: %s", e)
+            success = False
+        latency = time.perf_counter() - started
+        if success:
+            self.s3_breaker.record_success(latency)
+        else:
+            self.s3_breaker.record_failure(latency)
+        return success
+    
+    async def _call_sql(self, call: Callable[[], Awaitable[bool]]) -> bool:
+        """Run a SQL write and record its latency."""
+        started = time.perf_counter()
+        try:
+            return await call()
+        finally:
+            self.sql_latency.observe(time.perf_counter() - started)
+    
+    def _queue_replay(self, rounds: List[Dict[str, Any]]) -> None:
+        """Remember rounds written to SQL during an outage for later migration to S3."""
+        overflow = len(self.replay_queue) + len(rounds) - self.replay_queue.maxlen
+        if overflow > 0:
+            # Oldest rounds fall off the queue; they remain in SQL
+            self.replay_dropped.inc(min(overflow, self.replay_queue.maxlen))
+        self.replay_queue.extend(rounds)
+    
+    async def replay_outage_rounds(self) -> int:
+        """
+        Migrate queued outage rounds to S3 in bulk, stopping at the first failure.
+        
+        Returns:
+            int: Number of rounds migrated
+        """
+        replayed = 0
+        async with self._replay_lock:
+            while self.replay_queue and self.s3_available:
+                chunk = [self.replay_queue.popleft()
+                         for _ in range(min(self.replay_batch_size, len(self.replay_queue)))]
+                if not await self._call_s3(lambda: self.s3_storage.save_game_rounds_batch(chunk)):
+                    # Put the chunk back in order and wait for the next probe
+                    self.replay_queue.extendleft(reversed(chunk))
+                    break
+                replayed += len(chunk)
+                self.replayed.inc(len(chunk))
+        if replayed:
+            logger.info("Replayed %s outage rounds to S3, %s remaining", replayed, len(self.replay_queue))
+        return replayed
     
     async def save_game_round(self, game_data: Dict[str, Any]) -> bool:
-        """Save game round to storage, with dynamic primary storage selection."""
+        """Save game round to S3, falling back to SQL while the circuit is open."""
         try:
-            if self.s3_available:
-                # Try S3 first
-                try:
-                    success = await self.s3_storage.save_game_round(game_data)
-                    if success:
-                        return True
-                except Exception as e:
-                    logger.error(f"S3 storage error: {str(e)}")
-                    self.s3_available = False
-                    logger.info("Switching to SQL as primary storage")
+            if await self._call_s3(lambda: self.s3_storage.save_game_round(game_data)):
+                return True
             
-            # Use SQL storage (either as fallback or primary)
-            success = await self.sql_storage.save_game_round(game_data)
-            if not success:
+            # Use SQL storage as fallback and remember the round for S3
+            success = await self._call_sql(lambda: self.sql_storage.save_game_round(game_data))
+            if success:
+                self._queue_replay([game_data])
+            else:
                 logger.error("Failed to save game round to SQL")
             return success
             
         except Exception as e:
-            logger.error(f"Failed to save game round: {str(e)}")
+            logger.error("Failed to save game round: %s", e)
+            return False
+    
+    async def save_game_rounds_batch(self, rounds: List[Dict[str, Any]]) -> bool:
+        """Save a batch of game rounds to S3, falling back to SQL while the circuit is open."""
+        try:
+            if await self._call_s3(lambda: self.s3_storage.save_game_rounds_batch(rounds)):
+                return True
+            
+            # Use SQL storage as fallback and remember the rounds for S3
+            success = await self._call_sql(lambda: self.sql_storage.save_game_rounds_batch(rounds))
+            if success:
+                self._queue_replay(rounds)
+            else:
+                logger.error("Failed to save game round batch to SQL")
+            return success
+            
+        except Exception as e:
+            logger.error("Failed to save game round batch: %s", e)
             return False
     
     async def save_llm_interaction(self, interaction_data: Dict[str, Any]) -> bool:
-        """Save LLM interaction to storage, with dynamic primary storage selection."""
+        """Save LLM interaction to S3, falling back to SQL while the circuit is open."""
         try:
-            if self.s3_available:
-                # Try S3 first
-                try:
-                    success = await self.s3_storage.save_llm_interaction(interaction_data)
-                    if success:
-                        return True
-                except Exception as e:
-                    logger.error(f"S3 storage error: {str(e)}")
-                    self.s3_available = False
-                    logger.info("Switching to SQL as primary storage")
+            if await self._call_s3(lambda: self.s3_storage.save_llm_interaction(interaction_data)):
+                return True
             
-            # Use SQL storage (either as fallback or primary)
-            success = await self.sql_storage.save_llm_interaction(interaction_data)
+            # Use SQL storage as fallback
+            success = await self._call_sql(lambda: self.sql_storage.save_llm_interaction(interaction_data))
             if not success:
                 logger.error("Failed to save LLM interaction to SQL")
             return success
             
         except Exception as e:
-            logger.error(f"Failed to save LLM interaction: {str(e)}")
+            logger.error("Failed to save LLM interaction: %s", e)
             return False
     
     def get_user_state(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get user state from SQL storage."""
         return self.sql_storage.get_user_state(user_id)
     
-    def save_user_state(self, user_id: str, model_name: str, model_state: Dict[str, Any]) -> None:
+    async def load_user_state(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get user state from SQL storage without blocking the event loop."""
+        return await self.sql_storage.load_user_state(user_id)
+    
+    def save_user_state(self, user_id: str, model_name: str, model_state: Any) -> None:
         """Save user state to SQL storage."""
         self.sql_storage.save_user_state(user_id, model_name, model_state)
     
+    async def save_user_states_batch(self, states: List[Tuple[str, str, Any]]) -> bool:
+        """Save many user states to SQL storage in one transaction."""
+        return await self.sql_storage.save_user_states_batch(states)
+    
+    def get_health(self) -> Dict[str, Any]:
+        """Get circuit state, per-backend latency and replay queue status."""
+        return {
+            "s3_available": self.s3_available,
+            "s3": self.s3_breaker.get_stats(),
+            "sql_latency_seconds": self.sql_latency.snapshot(),
+            "replay_queue": len(self.replay_queue),
+            "replayed": self.replayed.value,
+            "replay_dropped": self.replay_dropped.value
+        }
+    
     async def close(self) -> None:
-        """Close both storage connections."""
+        """Stop the health probe and close both storage connections."""
         try:
+            if self._probe_task is not None:
+                self._probe_task.cancel()
+                try:
+                    await self._probe_task
+                except asyncio.CancelledError:
+                    pass
+                self._probe_task = None
             await self.sql_storage.close()
-            # S3 doesn't need explicit closing
+            if self.s3_storage is not None:
+                await self.s3_storage.close()
             logger.info("Successfully closed combined storage")
         except Exception as e:
-            logger.error(f"Error closing combined storage: {str(e)}")
+            logger.error("Error closing combined storage: %s", e)
             raise CombinedStorageError(f"Failed to close combined storage: {str(e)}") 
\ No newline at end of file
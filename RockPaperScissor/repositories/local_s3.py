@@ -0,0 +1,77 @@
+"""Filesystem-backed stand-in for the subset of the boto3 S3 client used by S3Storage."""
+
+import io
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+class LocalS3Client:
+    """
+    Stores objects as files under ``root_dir/<bucket>/<key>``.
+
+    Implements head_bucket, put_object, get_object, list_objects_v2 and
+    delete_object with the same call signatures and response shapes as the
+    boto3 client, so S3Storage can run against a local directory in
+    development and tests. Missing keys and buckets raise KeyError.
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_dir = Path(root_dir)
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.request_count = 0  # Number of API calls made, for cost comparisons
+
+    def _path(self, bucket: str, key: str) -> Path:
+        return self.root_dir / bucket / key
+
+    def _count(self) -> None:
+        with self._lock:
+            self.request_count += 1
+
+    def head_bucket(self, Bucket: str) -> Dict[str, Any]:
+        self._count()
+        bucket_dir = self.root_dir / Bucket
+        bucket_dir.mkdir(parents=True, exist_ok=True)
+        return {}
+
+    def put_object(self, Bucket: str, Key: str, Body: Any, **kwargs) -> Dict[str, Any]:
+        self._count()
+        path = self._path(Bucket, Key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = Body.encode("utf-8") if isinstance(Body, str) else bytes(Body)
+        # Write then rename so readers never see a partial object
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+        return {"ContentLength": len(data)}
+
+    def get_object(self, Bucket: str, Key: str, **kwargs) -> Dict[str, Any]:
+        self._count()
+        path = self._path(Bucket, Key)
+        if not path.is_file():
+            raise KeyError(f"No such key: {Key}")
+        data = path.read_bytes()
+        return {"Body": io.BytesIO(data), "ContentLength": len(data)}
+
+    def list_objects_v2(
+        self,
+        Bucket: str,
+        Prefix: str = "",
+        ContinuationToken: Optional[str] = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        # Everything is returned in one page, so ContinuationToken is ignored
+        self._count()
+        bucket_dir = self.root_dir / Bucket
+        contents = []
+        if bucket_dir.is_dir():
+            for path in sorted(bucket_dir.rglob("*")):
+                key = path.relative_to(bucket_dir).as_posix()
+                if path.is_file() and key.startswith(Prefix) and not key.endswith(".tmp"):
+                    contents.append({"Key": key, "Size": path.stat().st_size})
+        return {"Contents": contents, "KeyCount": len(contents), "IsTruncated": False}
+
+    def delete_object(self, Bucket: str, Key: str, **kwargs) -> Dict[str, Any]:
+        self._count()
+        self._path(Bucket, Key).unlink(missing_ok=True)
+        return {}
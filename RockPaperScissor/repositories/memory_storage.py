@@ -0,0 +1,119 @@
+"""In-memory storage implementation for benchmarks, load tests and local development."""
+
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+from .storage import Storage
+from ..utils import setup_logging
+from ..utils.metrics import Counter
+from ..config.database import STORAGE_CONFIG
+
+logger = setup_logging()
+
+class MemoryStorage(Storage):
+    """
+    Storage implementation that keeps everything in process memory.
+
+    Game rounds and LLM interactions are retained in bounded ring buffers
+    (the oldest records are dropped once ``max_records`` is reached; 0 keeps
+    counters only) and user states in a dict. Writes never block or fail,
+    which makes it a zero-latency backend for measuring the cache and service
+    layers. Nothing survives a restart.
+    """
+
+    def __init__(self, max_records: Optional[int] = STORAGE_CONFIG["memory_max_records"]):
+        """
+        Initialize empty storage.
+
+        Args:
+            max_records: Records retained per kind (None for unbounded, 0 for none)
+        """
+        self.game_rounds: Deque[Dict[str, Any]] = deque(maxlen=max_records)
+        self.llm_interactions: Deque[Dict[str, Any]] = deque(maxlen=max_records)
+        self.user_states: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()  # User states are written from the cache flush thread
+
+        # Metrics
+        self.game_rounds_saved = Counter("memory_game_rounds_total", "Game rounds saved to memory storage")
+        self.llm_interactions_saved = Counter("memory_llm_interactions_total", "LLM interactions saved to memory storage")
+        self.user_states_saved = Counter("memory_user_states_total", "User states saved to memory storage")
+        self.batches_saved = Counter("memory_batches_total", "Batch writes to memory storage")
+        logger.info("Initialized memory storage (max_records=%s)", max_records)
+
+    async def save_game_round(self, game_data: Dict[str, Any]) -> bool:
+        """Save a game round."""
+        self.game_rounds.append(game_data)
+        self.game_rounds_saved.inc()
+        return True
+
+    async def save_game_rounds_batch(self, rounds: List[Dict[str, Any]]) -> bool:
+        """Save a batch of game rounds."""
+        self.game_rounds.extend(rounds)
+        self.game_rounds_saved.inc(len(rounds))
+        self.batches_saved.inc()
+        return True
+
+    async def save_llm_interaction(self, interaction_data: Dict[str, Any]) -> bool:
+        """Save an LLM interaction."""
+        self.llm_interactions.append(interaction_data)
+        self.llm_interactions_saved.inc()
+        return True
+
+    async def save_llm_interactions_batch(self, interactions: List[Dict[str, Any]]) -> bool:
+        """Save a batch of LLM interactions."""
+        self.llm_interactions.extend(interactions)
+        self.llm_interactions_saved.inc(len(interactions))
+        self.batches_saved.inc()
+        return True
+
+    def get_game_round(self, game_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a retained game round by game ID (latest copy wins).
+
+        Returns:
+            The game data, or None if it was never saved or has been dropped
+        """
+        for game_data in reversed(self.game_rounds):
+            if game_data.get("game_id") == game_id:
+                return game_data
+        return None
+
+    def get_user_state(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get a user's saved model state."""
+        with self.lock:
+            return self.user_states.get(user_id)
+
+    async def load_user_state(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get a user's saved model state (no I/O, so no worker thread)."""
+        return self.get_user_state(user_id)
+
+    def save_user_state(self, user_id: str, model_name: str, model_state: Any) -> None:
+        """Save a user's model state (kept in its binary encoding, like SQLStorage)."""
+        if hasattr(model_state, "encode"):
+            model_state = model_state.encode()
+        with self.lock:
+            self.user_states[user_id] = {"user_id": user_id, "model_name": model_name, "model_state": model_state}
+        self.user_states_saved.inc()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get retained record counts and write counters."""
+        return {
+            "game_rounds_retained": len(self.game_rounds),
+            "llm_interactions_retained": len(self.llm_interactions),
+            "user_states": len(self.user_states),
+            "game_rounds_saved": self.game_rounds_saved.value,
+            "llm_interactions_saved": self.llm_interactions_saved.value,
+            "user_states_saved": self.user_states_saved.value,
+            "batches_saved": self.batches_saved.value
+        }
+
+    def clear(self) -> None:
+        """Drop all retained records and user states (counters are kept)."""
+        with self.lock:
+            self.game_rounds.clear()
+            self.llm_interactions.clear()
+            self.user_states.clear()
+
+    async def close(self) -> None:
+        """Nothing to close; retained data stays readable."""
+        pass
@@ -1,13 +1,22 @@
 """S3 storage implementation for game data and LLM interactions."""
 
 import boto3
+import gzip
+import hashlib
 import json
-from typing import Dict, Any
+import time
+from botocore.config import Config
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Any, Iterator, List, Optional, Tuple
 import uuid
 import asyncio
 import os
 from .storage import Storage, StorageError
+from .local_s3 import LocalS3Client
 from ..utils import setup_logging
+from ..utils.metrics import Counter, Gauge, Histogram
 from ..config.database import S3_CONFIG
 
 logger = setup_logging()
@@ -19,25 +28,69 @@ class S3StorageError(StorageError):
 class S3Storage(Storage):
     """S3 storage management class."""
     
-    def __init__(self):
-        """Initialize S3 client using configuration from S3_CONFIG."""
+    def __init__(self, client: Any = None):
+        """Initialize S3 client using configuration from S3_CONFIG.
+        
+        Args:
+            client: Optional pre-built S3 client (e.g. a LocalS3Client or a moto client)
+        """
         try:
-            # Initialize S3 client with credentials from S3_CONFIG
-            self.s3 = boto3.client(
-                's3',
-                region_name=S3_CONFIG["region_name"],
-                aws_access_key_id=S3_CONFIG["aws_access_key_id"],
-                aws_secret_access_key=S3_CONFIG["aws_secret_access_key"],
-                endpoint_url=S3_CONFIG["endpoint_url"]
-            )
+            if client is not None:
+                self.s3 = client
+            elif S3_CONFIG["local_dir"]:
+                # Filesystem-backed stand-in for development and tests
+                self.s3 = LocalS3Client(S3_CONFIG["local_dir"])
+            else:
+                # Initialize S3 client with credentials from S3_CONFIG
+                self.s3 = boto3.client(
+                    's3',
+                    region_name=S3_CONFIG["region_name"],
+                    aws_access_key_id=S3_CONFIG["aws_access_key_id"],
+                    aws_secret_access_key=S3_CONFIG["aws_secret_access_key"],
+                    endpoint_url=S3_CONFIG["endpoint_url"],
+                    # Pool sized for the upload executor; the default of 10
+                    # connections makes concurrent uploads queue in urllib3
+                    config=Config(
+                        max_pool_connections=S3_CONFIG["max_pool_connections"],
+                        connect_timeout=S3_CONFIG["connect_timeout_sec"],
+                        read_timeout=S3_CONFIG["read_timeout_sec"],
+                        retries={"max_attempts": 3, "mode": "standard"}
+                    )
+                )
             self.bucket_name = S3_CONFIG["bucket_name"]
+            self.batch_writes = S3_CONFIG["batch_writes"]
+            
+            # Dedicated executor so S3 calls don't compete with other work on
+            # the loop's default executor, and a cap on in-flight uploads
+            self.executor = ThreadPoolExecutor(
+                max_workers=S3_CONFIG["max_workers"],
+                thread_name_prefix="s3-storage"
+            )
+            self.upload_slots = asyncio.Semaphore(S3_CONFIG["max_inflight_uploads"])
+            self.inflight_uploads = 0
+            
+            # Game IDs of rounds whose partition was uploaded by a batch that
+            # failed elsewhere; the retry of that batch skips them (oldest first)
+            self.uploaded_rounds: Dict[str, None] = {}
+            self.max_remembered_rounds = S3_CONFIG["max_remembered_rounds"]
+            
+            # Upload metrics, latency labelled by object kind (bound once per kind)
+            self.upload_seconds = Histogram("s3_upload_seconds", "Time to upload one object", labelnames=("kind",))
+            self.upload_latency = {
+                kind: self.upload_seconds.labels(kind)
+                for kind in ("game_round", "game_round_batch", "llm_interaction")
+            }
+            self.inflight_gauge = Gauge("s3_inflight_uploads", "Uploads currently running",
+                                        fn=lambda: self.inflight_uploads)
+            self.upload_wait = Histogram("s3_upload_wait_seconds", "Time uploads wait for an in-flight slot")
+            self.upload_failures = Counter("s3_upload_failures_total", "Uploads that raised an error")
             
             # Verify connection
             self.s3.head_bucket(Bucket=self.bucket_name)
-            logger.info(f"Successfully connected to S3 bucket: {self.bucket_name}")
+            logger.info("Successfully connected to S3 bucket: %s", self.bucket_name)
             
         except Exception as e:
-            logger.error(f"Failed to initialize S3 client: {str(e)}")
+            logger.error("Failed to initialize S3 client: %s", e)
             raise S3StorageError(f"Failed to initialize S3 client: {str(e)}")
     
     def _get_game_round_key(self, game_id: str) -> str:
@@ -51,6 +104,218 @@ class S3Storage(Storage):
         """
         return f"game_rounds/{game_id}.json"
     
+    def _get_batch_keys(self, partition: datetime, rounds: List[Dict[str, Any]]) -> Tuple[str, str]:
+        """Get S3 keys for a batch object and its manifest.
+        
+        The batch ID is a hash of the rounds' game IDs, so uploading the same
+        rounds again overwrites the earlier objects instead of duplicating them.
+        
+        Args:
+            partition: Hour the batch's rounds belong to
+            rounds: Game data dictionaries in the batch
+            
+        Returns:
+            Tuple of (object key, manifest key)
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for game_id in sorted(str(data["game_id"]) for data in rounds):
+            digest.update(game_id.encode("utf-8"))
+            digest.update(b"\n")
+        batch_id = digest.hexdigest()
+        partition_path = f"dt={partition:%Y-%m-%d}/hour={partition:%H}"
+        return (
+            f"game_rounds/{partition_path}/{batch_id}.ndjson.gz",
+            f"game_rounds/_manifests/{partition_path}/{batch_id}.json"
+        )
+    
+    @staticmethod
+    def _get_partition(game_data: Dict[str, Any]) -> datetime:
+        """Get the hour a round belongs to from its timestamp (now if missing)."""
+        timestamp = game_data.get("timestamp")
+        if isinstance(timestamp, str):
+            try:
+                timestamp = datetime.fromisoformat(timestamp)
+            except ValueError:
+                timestamp = None
+        if not isinstance(timestamp, datetime):
+            timestamp = datetime.now()
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    
+    def _encode_batch(self, rounds: List[Dict[str, Any]]) -> Tuple[bytes, Dict[str, int]]:
+        """Encode rounds as gzip-compressed NDJSON.
+        
+        Returns:
+            Tuple of (compressed body, game_id -> line number)
+        """
+        lines = []
+        offsets = {}
+        for line_no, data in enumerate(rounds):
+            lines.append(json.dumps(data, separators=(",", ":"), default=str))
+            offsets[data["game_id"]] = line_no
+        body = gzip.compress("\n".join(lines).encode("utf-8"), compresslevel=S3_CONFIG["compress_level"])
+        return body, offsets
+    
+    def _put_batch(self, partition: datetime, rounds: List[Dict[str, Any]]) -> str:
+        """Write one batch object and its manifest (blocking)."""
+        key, manifest_key = self._get_batch_keys(partition, rounds)
+        body, offsets = self._encode_batch(rounds)
+        self.s3.put_object(
+            Bucket=self.bucket_name,
+            Key=key,
+            Body=body,
+            ContentType='application/x-ndjson',
+            ContentEncoding='gzip'
+        )
+        # The manifest is written after the object so it never points at a missing key
+        manifest = {
+            "key": key,
+            "records": len(rounds),
+            "compressed_bytes": len(body),
+            "created_at": datetime.now().isoformat(),
+            "game_ids": offsets,
+            "session_ids": sorted({str(data.get("session_id")) for data in rounds})
+        }
+        self.s3.put_object(
+            Bucket=self.bucket_name,
+            Key=manifest_key,
+            Body=json.dumps(manifest),
+            ContentType='application/json'
+        )
+        return key
+    
+    async def _upload(self, kind: str, func: Callable, *args) -> Any:
+        """Run a blocking upload on the S3 executor, bounded by the in-flight limit.
+        
+        Args:
+            kind: Object kind, selects the latency histogram
+            func: Blocking function performing the S3 calls
+            args: Arguments for func
+            
+        Returns:
+            Whatever func returns
+        """
+        queued = time.perf_counter()
+        async with self.upload_slots:
+            started = time.perf_counter()
+            self.upload_wait.observe(started - queued)
+            self.inflight_uploads += 1
+            try:
+                return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+            except Exception:
+                self.upload_failures.inc()
+                raise
+            finally:
+                self.inflight_uploads -= 1
+                self.upload_latency[kind].observe(time.perf_counter() - started)
+    
+    def get_upload_stats(self) -> Dict[str, Any]:
+        """Get in-flight upload count, wait time, latency and failure metrics."""
+        return {
+            "inflight_uploads": self.inflight_uploads,
+            "max_inflight_uploads": S3_CONFIG["max_inflight_uploads"],
+            "upload_failures": self.upload_failures.value,
+            "upload_wait_seconds": self.upload_wait.snapshot(),
+            "upload_latency_seconds": {
+                kind: histogram.snapshot() for kind, histogram in self.upload_latency.items()
+            }
+        }
+    
+    async def save_game_rounds_batch(self, rounds: List[Dict[str, Any]]) -> bool:
+        """Save many game rounds as one compressed NDJSON object per date/hour partition.
+        
+        Args:
+            rounds: Game data dictionaries to save
+            
+        If only some partitions are saved, their rounds are remembered and
+        skipped when the caller retries the batch, so only the failed
+        partitions are uploaded again.
+        
+        Returns:
+            bool: True if every partition was saved, False otherwise
+        """
+        if not self.batch_writes:
+            return await super().save_game_rounds_batch(rounds)
+        
+        partitions: Dict[datetime, List[Dict[str, Any]]] = defaultdict(list)
+        for data in rounds:
+            if self.uploaded_rounds and self.uploaded_rounds.pop(data["game_id"], 0) is None:
+                continue  # Already uploaded by an earlier attempt
+            partitions[self._get_partition(data)].append(data)
+        if not partitions:
+            return True
+        
+        results = await asyncio.gather(
+            *(self._upload("game_round_batch", self._put_batch, partition, partition_rounds)
+              for partition, partition_rounds in partitions.items()),
+            return_exceptions=True
+        )
+        saved = []
+        for partition_rounds, result in zip(partitions.values(), results):
+            if isinstance(result, BaseException):
+                logger.error("Failed to save %s game rounds to S3: %s", len(partition_rounds), result)
+            else:
+                logger.info("Saved %s game rounds to S3: %s", len(partition_rounds), result)
+                saved.append(partition_rounds)
+        if len(saved) == len(partitions):
+            return True
+        
+        for partition_rounds in saved:
+            for data in partition_rounds:
+                self.uploaded_rounds[data["game_id"]] = None
+        while len(self.uploaded_rounds) > self.max_remembered_rounds:
+            del self.uploaded_rounds[next(iter(self.uploaded_rounds))]
+        return False
+    
+    def _list_keys(self, prefix: str) -> Iterator[str]:
+        """List object keys under a prefix, following continuation tokens (blocking)."""
+        kwargs = {"Bucket": self.bucket_name, "Prefix": prefix}
+        while True:
+            response = self.s3.list_objects_v2(**kwargs)
+            for entry in response.get("Contents", []):
+                yield entry["Key"]
+            if not response.get("IsTruncated"):
+                return
+            kwargs["ContinuationToken"] = response["NextContinuationToken"]
+    
+    def _find_game_round(self, game_id: str, prefix: str) -> Optional[Dict[str, Any]]:
+        """Look a round up through the batch manifests, stopping at the first match (blocking).
+        
+        Manifests are listed page by page as they are read, so a round in an
+        early manifest is found without listing the whole prefix.
+        """
+        for manifest_key in self._list_keys(prefix):
+            manifest = json.loads(
+                self.s3.get_object(Bucket=self.bucket_name, Key=manifest_key)["Body"].read()
+            )
+            line_no = manifest["game_ids"].get(game_id)
+            if line_no is None:
+                continue
+            body = self.s3.get_object(Bucket=self.bucket_name, Key=manifest["key"])["Body"].read()
+            lines = gzip.decompress(body).split(b"\n")
+            return json.loads(lines[line_no])
+        return None
+    
+    async def get_game_round(self, game_id: str, partition: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """Find a batched game round by ID.
+        
+        Args:
+            game_id: Game ID
+            partition: Time of the round; restricts the search to that hour's manifests
+            
+        Returns:
+            The game data, or None if not found
+        """
+        prefix = "game_rounds/_manifests/"
+        if partition is not None:
+            prefix += f"dt={partition:%Y-%m-%d}/hour={partition:%H}/"
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, self._find_game_round, game_id, prefix
+            )
+        except Exception as e:
+            logger.error("Failed to look up game round %s in S3: %s", game_id, e)
+            return None
+    
     def _get_llm_interaction_key(self, game_id: str) -> str:
         """Get S3 key for LLM interaction data.
         
@@ -74,9 +339,9 @@ class S3Storage(Storage):
         """
         try:
             key = self._get_game_round_key(game_data['game_id'])
-            # Run S3 put_object in a thread pool to avoid blocking
-            await asyncio.get_event_loop().run_in_executor(
-                None,
+            # Run S3 put_object on the dedicated executor to avoid blocking
+            await self._upload(
+                "game_round",
                 lambda: self.s3.put_object(
                     Bucket=self.bucket_name,
                     Key=key,
@@ -84,10 +349,10 @@ class S3Storage(Storage):
                     ContentType='application/json'
                 )
             )
-            logger.info(f"Successfully saved game round to S3: {key}")
+            logger.info("Successfully saved game round to S3: %s", key)
             return True
         except Exception as e:
-            logger.error(f"Failed to save game round to S3: {str(e)}")
+            logger.error("Failed to save game round to S3: %s", e)
             return False
     
     async def save_llm_interaction(self, interaction_data: Dict[str, Any]) -> bool:
@@ -103,9 +368,9 @@ class S3Storage(Storage):
             key = self._get_llm_interaction_key(
                 interaction_data['game_id']
             )
-            # Run S3 put_object in a thread pool to avoid blocking
-            await asyncio.get_event_loop().run_in_executor(
-                None,
+            # Run S3 put_object on the dedicated executor to avoid blocking
+            await self._upload(
+                "llm_interaction",
                 lambda: self.s3.put_object(
                     Bucket=self.bucket_name,
                     Key=key,
@@ -113,17 +378,32 @@ class S3Storage(Storage):
                     ContentType='application/json'
                 )
             )
-            logger.info(f"Successfully saved LLM interaction to S3: {key}")
+            logger.info("Successfully saved LLM interaction to S3: %s", key)
+            return True
+        except Exception as e:
+            logger.error("Failed to save LLM interaction to S3: %s", e)
+            return False
+    
+    async def health_check(self) -> bool:
+        """Check that the bucket is reachable with a HEAD request.
+        
+        Returns:
+            bool: True if S3 answered, False otherwise
+        """
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                self.executor, lambda: self.s3.head_bucket(Bucket=self.bucket_name)
+            )
             return True
         except Exception as e:
-            logger.error(f"Failed to save LLM interaction to S3: {str(e)}")
+            logger.warning("S3 health check failed: %s", e)
             return False
     
-    def save_user_state(self, user_id: str, model_name: str, model_state: Dict[str, Any]) -> None:
+    def save_user_state(self, user_id: str, model_name: str, model_state: Any) -> None:
         """Not implemented for S3 storage."""
         raise NotImplementedError("S3 storage does not support saving user states")
     
     async def close(self) -> None:
-        """Close S3 client connection."""
+        """Wait for running uploads and shut down the S3 executor."""
         # S3 client doesn't need explicit closing
-        pass 
\ No newline at end of file
+        await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown) 
\ No newline at end of file
@@ -3,14 +3,109 @@
 import aiosqlite
 import sqlite3
 import json
-from typing import List, Dict, Any
+import time
+from collections import defaultdict
+from typing import List, Dict, Any, Optional, Tuple
 import asyncio
 from .storage import Storage, StorageError
+from .sqlite_pool import SQLiteReadPool
 from ..utils import setup_logging
+from ..utils.metrics import Counter, Histogram
 from ..config.database import SQLITE_CONFIG
 
 logger = setup_logging()
 
+# Prepared insert statements, one per table
+INSERT_STATEMENTS = {
+    # game_id is unique, so re-flushed rounds are ignored instead of failing the batch
+    "game_rounds": """
+        INSERT OR IGNORE INTO game_rounds 
+        (game_id, user_id, session_id, user_move, ai_move, 
+         result, model_name)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """,
+    "llm_interactions": """
+        INSERT INTO llm_interactions 
+        (prompt, response, llm_model_name, session_id, 
+         game_id, user_id, metadata)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """,
+    "user_states": """
+        INSERT OR REPLACE INTO user_states 
+        (user_id, model_name, model_state)
+        VALUES (?, ?, ?)
+    """
+}
+
+# Count columns shared by the rollup tables and the ad hoc aggregates
+ROUND_COUNTS = """
+    COUNT(*) AS rounds,
+    SUM(result = 'player_win') AS player_wins,
+    SUM(result = 'ai_win') AS ai_wins,
+    SUM(result = 'draw') AS draws,
+    SUM(user_move = 'rock') AS rock_count,
+    SUM(user_move = 'paper') AS paper_count,
+    SUM(user_move = 'scissors') AS scissors_count,
+    MIN(timestamp) AS first_played,
+    MAX(timestamp) AS last_played
+"""
+
+# Rollup tables over game_rounds: key column -> expression over a round
+ROLLUP_TABLES = {
+    "user_round_stats": {"user_id": "user_id"},
+    "model_round_stats": {"model_name": "model_name"},
+    # One row per model per UTC hour ('YYYY-MM-DD HH')
+    "hourly_round_stats": {"hour": "substr(timestamp, 1, 13)", "model_name": "model_name"},
+}
+
+def _rollup_update(table: str, keys: Dict[str, str]) -> str:
+    """Statement adding the rounds with id > ? to a rollup table, one upsert per key."""
+    return f"""
+        INSERT INTO {table}
+        SELECT {", ".join(f"{expression} AS {column}" for column, expression in keys.items())}, {ROUND_COUNTS}
+        FROM game_rounds WHERE id > ?
+        GROUP BY {", ".join(keys)}
+        ON CONFLICT ({", ".join(keys)}) DO UPDATE SET
+            rounds = rounds + excluded.rounds,
+            player_wins = player_wins + excluded.player_wins,
+            ai_wins = ai_wins + excluded.ai_wins,
+            draws = draws + excluded.draws,
+            rock_count = rock_count + excluded.rock_count,
+            paper_count = paper_count + excluded.paper_count,
+            scissors_count = scissors_count + excluded.scissors_count,
+            last_played = max(last_played, excluded.last_played)
+    """
+
+# Run by the writer in the same transaction as the rounds, so rollups commit
+# atomically with them; rows skipped by INSERT OR IGNORE get no new id
+ROLLUP_UPDATES = [_rollup_update(table, keys) for table, keys in ROLLUP_TABLES.items()]
+
+# Read queries run on the read pool; kept as constants so each connection
+# reuses its prepared statement
+SELECT_USER_STATE = """
+    SELECT user_id, model_name, model_state FROM user_states
+    WHERE user_id = ?
+"""
+SELECT_USER_ROUND_STATS = "SELECT * FROM user_round_stats WHERE user_id = ?"
+SELECT_MODEL_ROUND_STATS = "SELECT * FROM model_round_stats WHERE (? IS NULL OR model_name = ?) ORDER BY model_name"
+# Sessions are short, so they are aggregated straight from the session_id index
+SELECT_SESSION_ROUND_STATS = f"""
+    SELECT session_id, user_id, {ROUND_COUNTS}
+    FROM game_rounds WHERE session_id = ?
+"""
+# Hourly rollups grouped into buckets by a prefix of the hour key
+# (13 characters for hours, 10 for days)
+SELECT_ROUND_VOLUME = """
+    SELECT substr(hour, 1, ?) AS bucket,
+           SUM(rounds) AS rounds,
+           SUM(player_wins) AS player_wins,
+           SUM(ai_wins) AS ai_wins,
+           SUM(draws) AS draws
+    FROM hourly_round_stats
+    WHERE hour >= ? AND hour < ? AND (? IS NULL OR model_name = ?)
+    GROUP BY bucket ORDER BY bucket
+"""
+
 class SQLStorageError(StorageError):
     """Exception for SQL storage specific errors."""
     pass
@@ -18,13 +113,30 @@ class SQLStorageError(StorageError):
 class SQLStorage(Storage):
     """SQL storage management class."""
     
-    def __init__(self):
-        """Initialize SQLite storage."""
-        self.db_path = SQLITE_CONFIG["db_path"]
+    def __init__(self, db_path: Optional[str] = None):
+        """Initialize SQLite storage.
+        
+        Args:
+            db_path: Database file path (defaults to SQLITE_CONFIG["db_path"])
+        """
+        self.db_path = db_path or SQLITE_CONFIG["db_path"]
         self.conn = None
         self.sync_conn = None  # Synchronous connection
-        self.write_queue = asyncio.Queue()
+        self.read_pool: Optional[SQLiteReadPool] = None  # Read-only connections for queries
+        # Queue of (table, rows, future, attempts) writes waiting to be
+        # committed; the future (None for fire-and-forget writes) resolves once
+        # they are, or fails with the error that rolled them back
+        self.write_queue: asyncio.Queue = asyncio.Queue()
+        self.write_batch_size = SQLITE_CONFIG["write_batch_size"]
+        self.write_max_attempts = SQLITE_CONFIG["write_max_attempts"]
         self._init_task = None
+        self._writer_task = None
+        
+        # Write path metrics
+        self.rows_written = Counter("sqlite_rows_written_total", "Rows written by the batch writer")
+        self.duplicate_rounds = Counter("sqlite_duplicate_rounds_total", "Game rounds ignored for an already stored game_id")
+        self.write_failures = Counter("sqlite_write_failures_total", "Batches that failed to commit")
+        self.commit_latency = Histogram("sqlite_commit_seconds", "Time to write and commit one batch")
     
     async def initialize(self):
         """Initialize database connection and create tables if they don't exist."""
@@ -32,16 +144,30 @@ class SQLStorage(Storage):
             self._init_task = asyncio.create_task(self._init_db())
             await self._init_task
             # Start the write queue processor
-            asyncio.create_task(self._process_write_queue())
+            self._writer_task = asyncio.create_task(self._process_write_queue())
+    
+    @staticmethod
+    def _pragmas() -> List[str]:
+        """Journaling and cache pragmas applied to every connection."""
+        return [
+            f"PRAGMA journal_mode={SQLITE_CONFIG['journal_mode']}",
+            f"PRAGMA synchronous={SQLITE_CONFIG['synchronous']}",
+            f"PRAGMA cache_size={-SQLITE_CONFIG['cache_size_kb']}",
+            "PRAGMA temp_store=MEMORY"
+        ]
     
     async def _init_db(self):
         """Initialize database tables."""
         try:
-            # Initialize async connection
+            # Initialize async connection in autocommit mode; the writer manages
+            # its own transactions
             self.conn = await aiosqlite.connect(
                 self.db_path,
-                timeout=SQLITE_CONFIG["timeout"]
+                timeout=SQLITE_CONFIG["timeout"],
+                isolation_level=None
             )
+            for pragma in self._pragmas():
+                await self.conn.execute(pragma)
             
             # Initialize sync connection
             self.sync_conn = sqlite3.connect(
@@ -50,54 +176,90 @@ class SQLStorage(Storage):
                 check_same_thread=False
             )
             self.sync_conn.row_factory = sqlite3.Row
+            for pragma in self._pragmas():
+                self.sync_conn.execute(pragma)
             
             # Create tables if they don't exist
-            async with self.conn:
-                # Game rounds table - stores all game data except session_stats
-                await self.conn.execute("""
-                    CREATE TABLE IF NOT EXISTS game_rounds (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        game_id TEXT NOT NULL,
-                        user_id TEXT NOT NULL,
-                        session_id TEXT NOT NULL,
-                        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                        user_move TEXT NOT NULL,
-                        ai_move TEXT NOT NULL,
-                        result TEXT NOT NULL,
-                        model_name TEXT NOT NULL,
-                        UNIQUE(game_id)
-                    )
-                """)
-                
-                # User states table - stores model_state, session_stats and user_id
-                await self.conn.execute("""
-                    CREATE TABLE IF NOT EXISTS user_states (
-                        user_id TEXT PRIMARY KEY,
-                        model_name TEXT NOT NULL,
-                        model_state TEXT NOT NULL,
-                        last_updated DATETIME DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
+            # Game rounds table - stores all game data except session_stats
+            await self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS game_rounds (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    game_id TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    session_id TEXT NOT NULL,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    user_move TEXT NOT NULL,
+                    ai_move TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    model_name TEXT NOT NULL,
+                    UNIQUE(game_id)
+                )
+            """)
+            
+            # User states table - stores model_state, session_stats and user_id
+            await self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS user_states (
+                    user_id TEXT PRIMARY KEY,
+                    model_name TEXT NOT NULL,
+                    model_state TEXT NOT NULL,
+                    last_updated DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # LLM interactions table - stores all LLMInteraction fields
+            await self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_interactions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    prompt TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    llm_model_name TEXT NOT NULL,
+                    session_id TEXT NOT NULL,
+                    game_id TEXT NOT NULL,
+                    user_id TEXT,
+                    metadata TEXT
+                )
+            """)
                 
-                # LLM interactions table - stores all LLMInteraction fields
-                await self.conn.execute("""
-                    CREATE TABLE IF NOT EXISTS llm_interactions (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        prompt TEXT NOT NULL,
-                        response TEXT NOT NULL,
-                        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                        llm_model_name TEXT NOT NULL,
-                        session_id TEXT NOT NULL,
-                        game_id TEXT NOT NULL,
-                        user_id TEXT,
-                        metadata TEXT
-                    )
+            # Analytics indexes over game_rounds
+            await self.conn.execute("CREATE INDEX IF NOT EXISTS idx_game_rounds_user_time ON game_rounds (user_id, timestamp)")
+            await self.conn.execute("CREATE INDEX IF NOT EXISTS idx_game_rounds_session ON game_rounds (session_id)")
+            await self.conn.execute("CREATE INDEX IF NOT EXISTS idx_game_rounds_model_time ON game_rounds (model_name, timestamp)")
+            
+            # Rollup tables, updated with each written batch so analytics
+            # never scan the rounds themselves
+            async with self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'user_round_stats'"
+            ) as cursor:
+                rollups_exist = await cursor.fetchone() is not None
+            for table, keys in ROLLUP_TABLES.items():
+                key_columns = ", ".join(f"{key} TEXT NOT NULL" for key in keys)
+                await self.conn.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {table} (
+                        {key_columns},
+                        rounds INTEGER NOT NULL DEFAULT 0,
+                        player_wins INTEGER NOT NULL DEFAULT 0,
+                        ai_wins INTEGER NOT NULL DEFAULT 0,
+                        draws INTEGER NOT NULL DEFAULT 0,
+                        rock_count INTEGER NOT NULL DEFAULT 0,
+                        paper_count INTEGER NOT NULL DEFAULT 0,
+                        scissors_count INTEGER NOT NULL DEFAULT 0,
+                        first_played DATETIME,
+                        last_played DATETIME,
+                        PRIMARY KEY ({", ".join(keys)})
+                    ) WITHOUT ROWID
                 """)
+            if not rollups_exist:
+                # Databases created before the rollups existed need a backfill
+                await self.rebuild_rollups()
+            
+            # Readers open the file read-only, so start the pool once it exists
+            self.read_pool = SQLiteReadPool(self.db_path)
                 
             logger.info("Database tables created/verified successfully")
             
         except Exception as e:
-            logger.error(f"Database initialization failed: {str(e)}")
+            logger.error("Database initialization failed: %s", e)
             raise
     
     async def _process_write_queue(self):
@@ -105,84 +267,166 @@ class SQLStorage(Storage):
         while True:
             batch = []
             try:
-                # Collect up to 100 items from queue
-                for _ in range(100):
-                    try:
-                        item = await asyncio.wait_for(self.write_queue.get(), timeout=1.0)
-                        batch.append(item)
-                    except asyncio.TimeoutError:
-                        break
+                # Wait for the first write, then drain whatever else is queued
+                batch.append(await self.write_queue.get())
+                row_count = len(batch[0][1])
+                while row_count < self.write_batch_size and not self.write_queue.empty():
+                    batch.append(self.write_queue.get_nowait())
+                    row_count += len(batch[-1][1])
                 
-                if batch:
-                    await self._save_batch(batch)
+                await self._save_batch(
+                    [(table, row) for table, rows, _, _ in batch for row in rows]
+                )
+                self._resolve_writes(batch)
+            except asyncio.CancelledError:
+                break
             except Exception as e:
-                logger.error(f"Error processing write queue: {str(e)}")
+                logger.error("Error processing write queue: %s", e)
+                self._fail_writes(batch, e)
                 await asyncio.sleep(1)  # Wait before retrying
+            finally:
+                for _ in batch:
+                    self.write_queue.task_done()
     
-    async def _save_batch(self, batch: List[Dict[str, Any]]):
-        """Save a batch of items to database."""
+    @staticmethod
+    def _resolve_writes(batch: List[Tuple[str, List[tuple], Optional[asyncio.Future], int]]) -> None:
+        """Tell the callers waiting on a batch's writes that they were committed."""
+        for _, _, done, _ in batch:
+            # The caller may have stopped waiting (cancelled) in the meantime
+            if done is not None and not done.done():
+                done.set_result(True)
+    
+    def _fail_writes(self, batch: List[Tuple[str, List[tuple], Optional[asyncio.Future], int]],
+                     error: Exception) -> None:
+        """Hand a rolled-back batch's writes back to their callers.
+        
+        Callers waiting on a write get the error and keep their data to retry
+        it; writes nobody waits on are queued again, up to write_max_attempts.
+        """
+        for table, rows, done, attempts in batch:
+            if done is not None:
+                if not done.done():
+                    done.set_exception(error)
+            elif attempts + 1 < self.write_max_attempts:
+                self.write_queue.put_nowait((table, rows, None, attempts + 1))
+            else:
+                logger.error("Dropping %s %s rows after %s failed attempts", len(rows), table, attempts + 1)
+    
+    def _enqueue(self, table: str, rows: List[tuple]) -> asyncio.Future:
+        """Queue rows for a table; the returned future resolves to True once they are committed."""
+        if self._writer_task is None:
+            raise SQLStorageError("SQL storage is not initialized")
+        committed = asyncio.get_running_loop().create_future()
+        self.write_queue.put_nowait((table, rows, committed, 0))
+        return committed
+    
+    async def _save_batch(self, batch: List[Tuple[str, tuple]]) -> int:
+        """Save a batch of rows to database in a single transaction.
+        
+        Args:
+            batch: (table, row) tuples as produced by the save methods
+            
+        Returns:
+            int: Number of rows written (game rounds whose game_id is already
+            stored are ignored and not counted)
+            
+        Raises:
+            SQLStorageError: If the transaction failed and was rolled back
+        """
+        # Partition rows by table so each table is one executemany
+        rows_by_table: Dict[str, List[tuple]] = defaultdict(list)
+        for table, row in batch:
+            rows_by_table[table].append(row)
+        
+        started = time.perf_counter()
+        written = 0
         try:
-            async with self.conn:
-                for item in batch:
-                    if "user_move" in item:  # Game round
-                        await self.conn.execute("""
-                            INSERT INTO game_rounds 
-                            (game_id, user_id, session_id, user_move, ai_move, 
-                             result, model_name)
-                            VALUES (?, ?, ?, ?, ?, ?, ?)
-                        """, (
-                            item["game_id"],
-                            item["user_id"],
-                            item["session_id"],
-                            item["user_move"],
-                            item["ai_move"],
-                            item["result"],
-                            item["model_name"]
-                        ))
-                    elif "prompt" in item:  # LLM interaction
-                        await self.conn.execute("""
-                            INSERT INTO llm_interactions 
-                            (prompt, response, llm_model_name, session_id, 
-                             game_id, user_id, metadata)
-                            VALUES (?, ?, ?, ?, ?, ?, ?)
-                        """, (
-                            item["prompt"],
-                            item["response"],
-                            item["llm_model_name"],
-                            item["session_id"],
-                            item["game_id"],
-                            item.get("user_id"),
-                            json.dumps(item.get("metadata", {}))
-                        ))
-                    elif "model_state" in item:  # User state
-                        await self.conn.execute("""
-                            INSERT OR REPLACE INTO user_states 
-                            (user_id, model_name, model_state)
-                            VALUES (?, ?, ?)
-                        """, (
-                            item["user_id"],
-                            item["model_name"],
-                            json.dumps(item["model_state"])
-                        ))
+            await self.conn.execute("BEGIN")
+            if "game_rounds" in rows_by_table:
+                async with self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM game_rounds") as cursor:
+                    (last_round_id,) = await cursor.fetchone()
+            for table, rows in rows_by_table.items():
+                async with self.conn.executemany(INSERT_STATEMENTS[table], rows) as cursor:
+                    written += cursor.rowcount
+            if "game_rounds" in rows_by_table:
+                # Fold the new rounds into the rollups, one upsert per key
+                for statement in ROLLUP_UPDATES:
+                    await self.conn.execute(statement, (last_round_id,))
+            await self.conn.execute("COMMIT")
         except Exception as e:
-            logger.error(f"Failed to save batch: {str(e)}")
+            self.write_failures.inc()
+            logger.error("Failed to save batch: %s", e)
+            try:
+                await self.conn.execute("ROLLBACK")
+            except Exception:
+                pass
+            raise SQLStorageError(f"Failed to save batch: {str(e)}") from e
+        
+        latency = time.perf_counter() - started
+        self.commit_latency.observe(latency)
+        self.rows_written.inc(written)
+        if written < len(batch):
+            # Only game rounds are inserted with OR IGNORE
+            self.duplicate_rounds.inc(len(batch) - written)
+            logger.warning("Ignored %s game rounds with an already stored game_id", len(batch) - written)
+        logger.debug("Wrote %s rows in %.2f ms", written, latency * 1000)
+        return written
+    
+    @staticmethod
+    def _game_round_row(data: Dict[str, Any]) -> tuple:
+        """Convert game data to a game_rounds row."""
+        return (
+            data["game_id"],
+            data["user_id"],
+            data["session_id"],
+            data["user_move"],
+            data["ai_move"],
+            data["result"],
+            data["model_name"]
+        )
     
     async def save_game_round(self, data: Dict[str, Any]) -> bool:
-        """Save a game round to SQLite asynchronously."""
-        try:
-            await self.write_queue.put(data)
+        """Save a game round to SQLite; returns once the writer has committed it."""
+        return await self.save_game_rounds_batch([data])
+    
+    async def save_game_rounds_batch(self, rounds: List[Dict[str, Any]]) -> bool:
+        """Save many game rounds to SQLite; returns once the writer has committed them.
+        
+        The writer commits everything queued together in as few transactions as
+        possible, so concurrent batches share a commit.
+        """
+        if not rounds:
             return True
+        try:
+            committed = self._enqueue("game_rounds", [self._game_round_row(data) for data in rounds])
         except Exception as e:
-            logger.error(f"Failed to queue game round: {str(e)}")
+            logger.error("Failed to queue game rounds: %s", e)
+            return False
+        try:
+            return await committed
+        except SQLStorageError as e:
+            logger.error("Game rounds were not saved: %s", e)
             return False
     
     async def save_llm_interaction(self, data: Dict[str, Any]) -> bool:
-        """Save a LLM interaction to SQLite asynchronously."""
+        """Save a LLM interaction to SQLite; returns once the writer has committed it."""
         try:
-            await self.write_queue.put(data)
-            return True
+            committed = self._enqueue("llm_interactions", [(
+                data["prompt"],
+                data["response"],
+                data["llm_model_name"],
+                data["session_id"],
+                data["game_id"],
+                data.get("user_id"),
+                json.dumps(data.get("metadata", {}))
+            )])
         except Exception as e:
-            logger.error(f"Failed to queue LLM interaction: {str(e)}")
+            logger.error("Failed to queue LLM interaction: %s", e)
+            return False
+        try:
+            return await committed
+        except SQLStorageError as e:
+            logger.error("LLM interaction was not saved: %s", e)
             return False
     
     def get_user_state(self, user_id: str) -> Dict[str, Any]:
@@ -196,37 +440,149 @@ class SQLStorage(Storage):
                 
                 row = cursor.fetchone()
                 if row:
-                    user_data = dict(row)
-                    user_data["model_state"] = json.loads(user_data["model_state"])
-                    return user_data
+                    return self._user_state(dict(row))
                 return None
         except Exception as e:
-            logger.error(f"Failed to get user state: {str(e)}")
+            logger.error("Failed to get user state: %s", e)
             return None
     
+    async def load_user_state(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get user state through the read pool, without blocking the event loop.
+
+        Lookups for different users run in parallel on separate read-only
+        connections instead of queueing behind the writer's connection.
+        """
+        try:
+            row = await self.read_pool.fetchone(SELECT_USER_STATE, (user_id,))
+            if row:
+                return self._user_state(dict(row))
+            return None
+        except Exception as e:
+            logger.error("Failed to load user state: %s", e)
+            return None
+    
+    async def rebuild_rollups(self) -> None:
+        """Recompute the rollup tables from game_rounds (one full scan)."""
+        await self.conn.execute("BEGIN")
+        try:
+            for table in ROLLUP_TABLES:
+                await self.conn.execute(f"DELETE FROM {table}")
+            for statement in ROLLUP_UPDATES:
+                await self.conn.execute(statement, (0,))
+            await self.conn.execute("COMMIT")
+        except Exception:
+            await self.conn.execute("ROLLBACK")
+            raise
+        logger.info("Rebuilt game round rollups")
+    
+    async def get_user_round_stats(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get a user's round counts from the rollup table (None if they have no rounds)."""
+        row = await self.read_pool.fetchone(SELECT_USER_ROUND_STATS, (user_id,))
+        return dict(row) if row else None
+    
+    async def get_session_round_stats(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Get a session's round counts (None if it has no stored rounds)."""
+        row = await self.read_pool.fetchone(SELECT_SESSION_ROUND_STATS, (session_id,))
+        return dict(row) if row and row["rounds"] else None
+    
+    async def get_model_round_stats(self, model_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get round counts per AI model, or for one model."""
+        rows = await self.read_pool.fetchall(SELECT_MODEL_ROUND_STATS, (model_name, model_name))
+        return [dict(row) for row in rows]
+    
+    async def get_round_volume(
+        self, bucket_chars: int, start: str, end: str, model_name: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Get round counts per time bucket from the hourly rollup.
+        
+        Args:
+            bucket_chars: Length of the hour key prefix to group by (13 = hour, 10 = day)
+            start: First hour included ('YYYY-MM-DD HH', UTC)
+            end: First hour excluded
+            model_name: Only count rounds played by this model
+        """
+        rows = await self.read_pool.fetchall(
+            SELECT_ROUND_VOLUME, (bucket_chars, start, end, model_name, model_name)
+        )
+        return [dict(row) for row in rows]
+    
+    @staticmethod
+    def _user_state(user_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Decode a user_states row."""
+        # Compact states are stored as binary blobs; older rows hold JSON text
+        if isinstance(user_data["model_state"], str):
+            user_data["model_state"] = json.loads(user_data["model_state"])
+        return user_data
+    
+    def save_user_state(self, user_id: str, model_name: str, model_state: Any) -> None:
+        """Queue a user's model state for saving.
+
+        Args:
+            user_id: User ID
+            model_name: Name of the AI model the state belongs to
+            model_state: Compact model state (or its binary encoding)
+        """
+        self.write_queue.put_nowait(("user_states", [self._user_state_row(user_id, model_name, model_state)], None, 0))
+    
+    async def save_user_states_batch(self, states: List[Tuple[str, str, Any]]) -> bool:
+        """Save many users' model states in one executemany; returns once the writer has committed them.
+        
+        Args:
+            states: (user_id, model_name, model_state) tuples
+        """
+        if not states:
+            return True
+        try:
+            committed = self._enqueue("user_states", [self._user_state_row(*state) for state in states])
+        except Exception as e:
+            logger.error("Failed to queue user states: %s", e)
+            return False
+        try:
+            return await committed
+        except SQLStorageError as e:
+            logger.error("User states were not saved: %s", e)
+            return False
+    
+    @staticmethod
+    def _user_state_row(user_id: str, model_name: str, model_state: Any) -> tuple:
+        """Convert a model state (object, binary encoding or legacy dict) to a user_states row."""
+        if hasattr(model_state, "encode"):
+            model_state = model_state.encode()
+        elif not isinstance(model_state, bytes):
+            model_state = json.dumps(model_state)
+        return (user_id, model_name, model_state)
+    
+    def get_read_stats(self) -> Dict[str, Any]:
+        """Get read pool metrics (connections, wait time, statement cache hits)."""
+        return self.read_pool.get_stats() if self.read_pool else {}
+    
+    def get_write_stats(self) -> Dict[str, Any]:
+        """Get batch writer metrics (rows written, failures, commit latency)."""
+        return {
+            "queue_depth": self.write_queue.qsize(),
+            "rows_written": self.rows_written.value,
+            "duplicate_rounds": self.duplicate_rounds.value,
+            "write_failures": self.write_failures.value,
+            "commit_latency_seconds": self.commit_latency.snapshot()
+        }
+    
     async def close(self) -> None:
         """Close the storage connection and ensure all queued data is processed."""
         try:
-            # Wait for write queue to be empty
-            if not self.write_queue.empty():
-                logger.info("Waiting for write queue to be empty...")
-                while not self.write_queue.empty():
-                    await asyncio.sleep(0.1)
+            # Wait for the writer to commit everything queued so far
+            if self._writer_task is not None:
+                if not self.write_queue.empty():
+                    logger.info("Waiting for write queue to be empty...")
+                await self.write_queue.join()
+                self._writer_task.cancel()
+                try:
+                    await self._writer_task
+                except asyncio.CancelledError:
+                    pass
             
-            # Process any remaining items in the queue
-            if not self.write_queue.empty():
-                logger.info("Processing remaining items in write queue...")
-                batch = []
-                while not self.write_queue.empty():
-                    item = await self.write_queue.get()
-                    batch.append(item)
-                    if len(batch) >= self.batch_size:
-                        await self._save_batch(batch)
-                        batch = []
-                if batch:
-                    await self._save_batch(batch)
-            
-            # Close the database connection
+            # Close the database connections
+            if self.read_pool:
+                await self.read_pool.close()
             if self.conn:
                 await self.conn.close()
             if self.sync_conn:
@@ -234,5 +590,13 @@ class SQLStorage(Storage):
             
             logger.info("Storage connection closed successfully")
         except Exception as e:
-            logger.error(f"Error during storage shutdown: {str(e)}")
-            raise SQLStorageError(f"Failed to close storage: {str(e)}") 
\ No newline at end of file
+            logger.error("Error during storage shutdown: %s", e)
+            raise SQLStorageError(f"Failed to close storage: {str(e)}")
+
+def find_round_store(storage: Storage) -> Optional[SQLStorage]:
+    """Get the SQLStorage holding every game round, if SQL is the primary round store.
+    
+    CombinedStorage's SQL side only holds the rounds written while S3 was
+    unavailable, so it does not count.
+    """
+    return storage if isinstance(storage, SQLStorage) else None
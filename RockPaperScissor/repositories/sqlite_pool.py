@@ -0,0 +1,166 @@
+"""Pool of read-only SQLite connections for concurrent queries."""
+
+import asyncio
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from ..utils.metrics import Counter, Gauge, Histogram
+from ..config.database import SQLITE_CONFIG
+
+class _ReadConnection:
+    """A read-only connection and the SQL it has already prepared."""
+
+    def __init__(self, db_path: str, statement_cache_size: int):
+        self.conn = sqlite3.connect(
+            f"file:{db_path}?mode=ro",
+            uri=True,
+            timeout=SQLITE_CONFIG["timeout"],
+            check_same_thread=False,  # Used by one pool thread at a time
+            cached_statements=statement_cache_size
+        )
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute(f"PRAGMA cache_size={-SQLITE_CONFIG['cache_size_kb']}")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        # Mirrors sqlite3's LRU statement cache to count hits
+        self.prepared: "OrderedDict[str, None]" = OrderedDict()
+        self.statement_cache_size = statement_cache_size
+
+    def track_statement(self, sql: str) -> bool:
+        """Record a statement use; True if it was already prepared on this connection."""
+        if sql in self.prepared:
+            self.prepared.move_to_end(sql)
+            return True
+        self.prepared[sql] = None
+        if len(self.prepared) > self.statement_cache_size:
+            self.prepared.popitem(last=False)
+        return False
+
+
+class SQLiteReadPool:
+    """
+    Fixed-size pool of read-only connections to one SQLite database.
+
+    With WAL journaling readers never block the writer or each other, so
+    queries on different connections run in parallel on the pool's threads
+    instead of queueing behind the single write connection. Connections are
+    opened on first use. Each keeps sqlite3's prepared statement cache, so
+    repeated queries skip parsing and planning.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        size: int = SQLITE_CONFIG["read_pool_size"],
+        statement_cache_size: int = SQLITE_CONFIG["statement_cache_size"]
+    ):
+        """
+        Initialize an empty pool.
+
+        Args:
+            db_path: Database file (must already exist)
+            size: Maximum number of open connections
+            statement_cache_size: Prepared statements kept per connection
+        """
+        self.db_path = db_path
+        self.size = size
+        self.statement_cache_size = statement_cache_size
+        self.executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="sqlite-read")
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._connections: List[_ReadConnection] = []
+        self._closed = False
+
+        # Metrics
+        self.open_gauge = Gauge("sqlite_read_pool_connections", "Open read connections",
+                                fn=lambda: len(self._connections))
+        self.idle_gauge = Gauge("sqlite_read_pool_idle", "Idle read connections", fn=lambda: self._idle.qsize())
+        self.acquire_wait = Histogram("sqlite_read_pool_wait_seconds", "Time queries wait for a read connection")
+        self.query_latency = Histogram("sqlite_read_seconds", "Time to run one read query")
+        self.statement_hits = Counter("sqlite_statement_cache_hits_total", "Queries that reused a prepared statement")
+        self.statement_misses = Counter("sqlite_statement_cache_misses_total", "Queries that prepared a new statement")
+
+    async def _acquire(self) -> _ReadConnection:
+        if self._closed:
+            raise sqlite3.ProgrammingError("Read pool is closed")
+        started = time.perf_counter()
+        if self._idle.empty() and len(self._connections) < self.size:
+            # Reserve the slot before opening so concurrent callers don't overshoot
+            self._connections.append(None)
+            try:
+                connection = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, _ReadConnection, self.db_path, self.statement_cache_size
+                )
+            except Exception:
+                self._connections.remove(None)
+                raise
+            self._connections[self._connections.index(None)] = connection
+        else:
+            connection = await self._idle.get()
+        self.acquire_wait.observe(time.perf_counter() - started)
+        return connection
+
+    def _run(self, connection: _ReadConnection, sql: str, params: Sequence[Any], fetch_all: bool) -> Any:
+        """Run one query on a pool thread."""
+        if connection.track_statement(sql):
+            self.statement_hits.inc()
+        else:
+            self.statement_misses.inc()
+        started = time.perf_counter()
+        cursor = connection.conn.execute(sql, params)
+        try:
+            return cursor.fetchall() if fetch_all else cursor.fetchone()
+        finally:
+            cursor.close()
+            self.query_latency.observe(time.perf_counter() - started)
+
+    async def _query(self, sql: str, params: Sequence[Any], fetch_all: bool) -> Any:
+        connection = await self._acquire()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, self._run, connection, sql, params, fetch_all
+            )
+        finally:
+            self._idle.put_nowait(connection)
+
+    async def fetchone(self, sql: str, params: Sequence[Any] = ()) -> Optional[sqlite3.Row]:
+        """Run a query and return its first row (or None)."""
+        return await self._query(sql, params, fetch_all=False)
+
+    async def fetchall(self, sql: str, params: Sequence[Any] = ()) -> List[sqlite3.Row]:
+        """Run a query and return all rows."""
+        return await self._query(sql, params, fetch_all=True)
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run ``func(connection, *args)`` on a pool thread with a read connection.
+
+        For reads that stream through a cursor instead of fetching one result;
+        ``func`` must not keep the connection after it returns.
+        """
+        connection = await self._acquire()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, connection.conn, *args)
+        finally:
+            self._idle.put_nowait(connection)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool size, wait time, query latency and statement cache counters."""
+        return {
+            "size": self.size,
+            "open": len(self._connections),
+            "idle": self._idle.qsize(),
+            "wait_seconds": self.acquire_wait.snapshot(),
+            "query_seconds": self.query_latency.snapshot(),
+            "statement_cache_hits": self.statement_hits.value,
+            "statement_cache_misses": self.statement_misses.value
+        }
+
+    async def close(self) -> None:
+        """Close idle connections and stop the pool threads (in-flight queries finish first)."""
+        self._closed = True
+        await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown, True)
+        for connection in self._connections:
+            if connection is not None:
+                connection.conn.close()
+        self._connections.clear()
@@ -1,7 +1,8 @@
 """Base storage interface for different storage implementations."""
 
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 
 class StorageError(Exception):
     """Base exception for storage errors."""
@@ -10,6 +11,10 @@ class StorageError(Exception):
 class Storage(ABC):
     """Abstract base class for storage implementations."""
     
+    async def initialize(self) -> None:
+        """Open connections and start background tasks (no-op by default)."""
+        pass
+    
     @abstractmethod
     async def save_game_round(self, game_data: Dict[str, Any]) -> bool:
         """Save a game round.
@@ -22,6 +27,21 @@ class Storage(ABC):
         """
         pass
     
+    async def save_game_rounds_batch(self, rounds: List[Dict[str, Any]]) -> bool:
+        """Save many game rounds at once.
+        
+        The default saves each round with save_game_round; backends that can
+        write a whole batch in one request override this.
+        
+        Args:
+            rounds: Game data dictionaries to save
+            
+        Returns:
+            bool: True if every round was saved, False otherwise
+        """
+        results = await asyncio.gather(*(self.save_game_round(data) for data in rounds))
+        return all(results)
+    
     @abstractmethod
     async def save_llm_interaction(self, interaction_data: Dict[str, Any]) -> bool:
         """Save an LLM interaction.
@@ -34,6 +54,71 @@ class Storage(ABC):
         """
         pass
     
+    async def save_llm_interactions_batch(self, interactions: List[Dict[str, Any]]) -> bool:
+        """Save many LLM interactions at once.
+        
+        The default saves each interaction with save_llm_interaction.
+        
+        Args:
+            interactions: LLM interaction dictionaries to save
+            
+        Returns:
+            bool: True if every interaction was saved, False otherwise
+        """
+        results = await asyncio.gather(*(self.save_llm_interaction(data) for data in interactions))
+        return all(results)
+    
+    def get_user_state(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get a user's saved model state.
+        
+        Args:
+            user_id: User ID
+            
+        Returns:
+            Dict with user_id, model_name and model_state, or None if not found
+        """
+        return None
+    
+    async def load_user_state(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get a user's saved model state without blocking the event loop.
+        
+        The default runs get_user_state in a worker thread; backends with an
+        async read path override this.
+        
+        Args:
+            user_id: User ID
+            
+        Returns:
+            Dict with user_id, model_name and model_state, or None if not found
+        """
+        return await asyncio.to_thread(self.get_user_state, user_id)
+    
+    def save_user_state(self, user_id: str, model_name: str, model_state: Any) -> None:
+        """Save a user's model state.
+        
+        Args:
+            user_id: User ID
+            model_name: Name of the AI model the state belongs to
+            model_state: Compact model state (or its binary encoding)
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support saving user states")
+    
+    async def save_user_states_batch(self, states: List[Tuple[str, str, Any]]) -> bool:
+        """Save many users' model states at once.
+        
+        The default saves each state with save_user_state; backends that can
+        write them all in one transaction override this.
+        
+        Args:
+            states: (user_id, model_name, model_state) tuples
+            
+        Returns:
+            bool: True if every state was saved, False otherwise
+        """
+        for user_id, model_name, model_state in states:
+            self.save_user_state(user_id, model_name, model_state)
+        return True
+    
     @abstractmethod
     async def close(self) -> None:
         """Close the storage connection."""
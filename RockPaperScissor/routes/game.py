@@ -1,19 +1,21 @@
 # backend/routes/game.py
 from fastapi import APIRouter, HTTPException, Request
-from RockPaperScissor.services import GameService, LLMService
 from RockPaperScissor.schemas.game import GameRequest, GameResponse, GameSummary, LLMRequest
-from RockPaperScissor.utils.logging import setup_logging
-from RockPaperScissor.repositories import Storage
+from RockPaperScissor.utils.logging import setup_logging, SAMPLED
+from RockPaperScissor.config.game import PLAY_BATCH_CONFIG
+from RockPaperScissor.services import OverloadedError
 
 # Set up logger
 logger = setup_logging()
 
 game_router = APIRouter()
 
-# Initialize services
-storage = Storage()
-game_service = GameService(storage=storage)
-llm_service = LLMService(storage)
+# Services are created once in the application lifespan and shared via app.state
+
+def _overloaded(e: OverloadedError) -> HTTPException:
+    """503 telling the client to retry shortly."""
+    logger.warning("Rejecting request: %s", e)
+    return HTTPException(status_code=503, detail="Server is busy, please retry", headers={"Retry-After": "1"})
     
 @game_router.post("/play")
 async def play_round(request: Request, game_request: GameRequest):
@@ -21,60 +23,74 @@ async def play_round(request: Request, game_request: GameRequest):
     Play a round with the player's move.
     """
     try:
-        # Log the request
-        logger.info(f"Play round request: {game_request.model_dump()}")
+        # Log the request (sampled debug only: this runs for every round)
+        logger.debug("Play round request: %s", game_request, extra=SAMPLED)
 
         # Get IP Address for future use
         ip_address = request.client.host
-        logger.debug(f"Request from IP: {ip_address}")
+        logger.debug("Request from IP: %s", ip_address, extra=SAMPLED)
 
-        # Call service method to play the round
-        result = game_service.play_round(game_request)
+        # Coalesce concurrent requests into batches, or play the round directly
+        async with request.app.state.request_limiter.slot():
+            if PLAY_BATCH_CONFIG["enabled"]:
+                result = await request.app.state.play_batcher.submit(game_request)
+            else:
+                result = await request.app.state.game_service.play_round(game_request)
         return result
     
+    except OverloadedError as e:
+        raise _overloaded(e)
     except ValueError as e:
-        logger.error(f"Invalid request: {str(e)}")
+        logger.error("Invalid request: %s", e)
         raise HTTPException(
             status_code=400,
             detail=str(e)
         )
     except Exception as e:
-        logger.error(f"Error processing round: {str(e)}")
+        logger.error("Error processing round: %s", e)
         raise HTTPException(
             status_code=500,
             detail="An error occurred while processing the round"
         )
 
 @game_router.post("/analyze")
-async def analyze_game_state(llm_request: LLMRequest):
+async def analyze_game_state(request: Request, llm_request: LLMRequest):
     """
     Get LLM analysis of the current game state.
     """
     try:
         # Log the request
-        logger.info(f"Analyze request: {llm_request.model_dump()}")
+        logger.debug("Analyze request: %s", llm_request, extra=SAMPLED)
         
         # Get LLM analysis directly from LLM service
-        analysis = llm_service.analyze_game_state(llm_request)
+        llm_service = request.app.state.llm_service
+        async with request.app.state.request_limiter.slot():
+            await llm_service.llm_cache.wait_for_capacity()
+            analysis = llm_service.analyze_game_state(llm_request)
         return {"analysis": analysis}
         
+    except OverloadedError as e:
+        raise _overloaded(e)
     except Exception as e:
-        logger.error(f"Error analyzing game state: {str(e)}")
+        logger.error("Error analyzing game state: %s", e)
         raise HTTPException(
             status_code=500,
             detail="An error occurred while analyzing the game state"
         )
 
 @game_router.post("/end")
-async def end_game(game_request: GameRequest):
+async def end_game(request: Request, game_request: GameRequest):
     """
     End the current game session and get a summary.
     """
     try:
-        summary = game_service.end_game(game_request)
+        async with request.app.state.request_limiter.slot():
+            summary = await request.app.state.game_service.end_game(game_request)
         return summary
+    except OverloadedError as e:
+        raise _overloaded(e)
     except Exception as e:
-        logger.error(f"Error ending game: {str(e)}")
+        logger.error("Error ending game: %s", e)
         raise HTTPException(
             status_code=500,
             detail="An error occurred while ending the game"
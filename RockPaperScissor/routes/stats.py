@@ -0,0 +1,100 @@
+# backend/routes/stats.py
+from datetime import datetime
+from typing import List, Literal, Optional
+from fastapi import APIRouter, HTTPException, Request
+from RockPaperScissor.schemas.stats import UserRoundStats, SessionRoundStats, ModelRoundStats, RoundVolume
+from RockPaperScissor.utils.logging import setup_logging
+from RockPaperScissor.services.analytics_service import AnalyticsUnavailableError
+
+# Set up logger
+logger = setup_logging()
+
+stats_router = APIRouter()
+
+# The analytics service is created once in the application lifespan and shared via app.state
+
+def _unavailable(e: AnalyticsUnavailableError) -> HTTPException:
+    """501 for storage backends without analytics."""
+    return HTTPException(status_code=501, detail=str(e))
+
+@stats_router.get("/users/{user_id}", response_model=UserRoundStats)
+async def get_user_stats(request: Request, user_id: str):
+    """
+    Get a user's win rates and move distribution across all sessions.
+    """
+    try:
+        stats = await request.app.state.analytics_service.get_user_stats(user_id)
+    except AnalyticsUnavailableError as e:
+        raise _unavailable(e)
+    except Exception as e:
+        logger.error("Error getting user stats: %s", e)
+        raise HTTPException(status_code=500, detail="An error occurred while getting user stats")
+    if stats is None:
+        raise HTTPException(status_code=404, detail="No rounds found for this user")
+    return stats
+
+@stats_router.get("/sessions/{session_id}", response_model=SessionRoundStats)
+async def get_session_stats(request: Request, session_id: str):
+    """
+    Get the win rates and move distribution of one stored session.
+    """
+    try:
+        stats = await request.app.state.analytics_service.get_session_stats(session_id)
+    except AnalyticsUnavailableError as e:
+        raise _unavailable(e)
+    except Exception as e:
+        logger.error("Error getting session stats: %s", e)
+        raise HTTPException(status_code=500, detail="An error occurred while getting session stats")
+    if stats is None:
+        raise HTTPException(status_code=404, detail="No rounds found for this session")
+    return stats
+
+@stats_router.get("/models", response_model=List[ModelRoundStats])
+async def get_model_stats(request: Request):
+    """
+    Get the win rates and move distributions seen by every AI model.
+    """
+    try:
+        return await request.app.state.analytics_service.get_model_stats()
+    except AnalyticsUnavailableError as e:
+        raise _unavailable(e)
+    except Exception as e:
+        logger.error("Error getting model stats: %s", e)
+        raise HTTPException(status_code=500, detail="An error occurred while getting model stats")
+
+@stats_router.get("/models/{model_name}", response_model=ModelRoundStats)
+async def get_single_model_stats(request: Request, model_name: str):
+    """
+    Get the win rates and move distribution seen by one AI model.
+    """
+    try:
+        stats = await request.app.state.analytics_service.get_model_stats(model_name)
+    except AnalyticsUnavailableError as e:
+        raise _unavailable(e)
+    except Exception as e:
+        logger.error("Error getting model stats: %s", e)
+        raise HTTPException(status_code=500, detail="An error occurred while getting model stats")
+    if not stats:
+        raise HTTPException(status_code=404, detail="No rounds found for this model")
+    return stats[0]
+
+@stats_router.get("/volume", response_model=RoundVolume)
+async def get_round_volume(
+    request: Request,
+    bucket: Literal["hour", "day"] = "hour",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    model_name: Optional[str] = None
+):
+    """
+    Get the number of rounds played per hour or day (UTC).
+    """
+    try:
+        return await request.app.state.analytics_service.get_round_volume(bucket, start, end, model_name)
+    except AnalyticsUnavailableError as e:
+        raise _unavailable(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Error getting round volume: %s", e)
+        raise HTTPException(status_code=500, detail="An error occurred while getting round volume")
@@ -1,6 +1,7 @@
 # RockPaperScissor/schemas/game.py
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_serializer
 from typing import Literal, Optional, Dict, Any
+import base64
 import uuid
 from datetime import datetime
 
@@ -8,7 +9,8 @@ class GameRequest(BaseModel):
     """Schema for game requests"""
     user_id: Optional[str] = Field("test_user", description="Unique identifier of the user")
     session_id: Optional[str] = Field("test_session", description="Current game session ID")
-    game_id: Optional[str] = Field(str(uuid.uuid4()), description="Unique identifier for specific game round")
+    game_id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()),
+                                   description="Unique identifier for specific game round")
     game_completed: bool = Field(False, description="Indicator if the game has completed")
     user_move: Optional[Literal["rock", "paper", "scissors"]] = Field(None, description="User's move")
 
@@ -27,13 +29,33 @@ class GameData(BaseModel):
     game_id: str = Field(..., description="Unique identifier of the game")
     user_id: str = Field(..., description="Unique identifier of the user")
     session_id: str = Field(..., description="Current game session ID")
-    timestamp: datetime = Field(default_factory=datetime.timestamp, description="Timestamp of the round")
+    timestamp: datetime = Field(default_factory=datetime.now, description="Timestamp of the round")
     user_move: str = Field(..., description="User's move")
     ai_move: str = Field(..., description="AI's move")
     result: Literal["player_win", "ai_win", "draw"] = Field(..., description="Game result")
-    session_stats: Dict[str, Any] = Field(..., description="Session statistics")
+    session_stats: Any = Field(..., description="Session statistics (SessionStats object or dictionary)")
     model_name: str = Field(..., description="AI model name")
-    model_state: Dict[str, Any] = Field({}, description="AI model state")
+    model_state: Any = Field(None, description="AI model state (compact ModelState object)")
+
+    @field_serializer("session_stats")
+    def serialize_session_stats(self, session_stats: Any) -> Any:
+        """Serialize session stats as their dictionary form."""
+        # Records replayed from the write-ahead log already hold dictionaries
+        if hasattr(session_stats, "to_dict"):
+            return session_stats.to_dict()
+        return session_stats
+
+    @field_serializer("model_state", when_used="json")
+    def serialize_model_state(self, model_state: Any) -> Any:
+        """Serialize compact model states as base64 of their binary encoding."""
+        # States replayed from the write-ahead log are already base64 strings
+        if hasattr(model_state, "encode") and not isinstance(model_state, str):
+            return base64.b64encode(model_state.encode()).decode("ascii")
+        return model_state
+
+class GameSummary(BaseModel):
+    """Schema for game session summary response"""
+    game_summary: str = Field(..., description="LLM summary of the game session")
 
 class LLMInteraction(BaseModel):
     """Schema for a single LLM interaction record."""
@@ -0,0 +1,43 @@
+# RockPaperScissor/schemas/stats.py
+from pydantic import BaseModel, Field
+from typing import Literal, Optional, Dict, List
+
+class RoundStats(BaseModel):
+    """Schema for aggregated round outcomes and move choices"""
+    rounds: int = Field(..., description="Number of rounds played")
+    player_wins: int = Field(..., description="Rounds won by the player")
+    ai_wins: int = Field(..., description="Rounds won by the AI")
+    draws: int = Field(..., description="Drawn rounds")
+    win_rates: Dict[str, float] = Field(..., description="Share of rounds won by the player, won by the AI and drawn")
+    move_distribution: Dict[str, float] = Field(..., description="Share of the player's moves that were rock, paper and scissors")
+    first_played: Optional[str] = Field(None, description="Timestamp (UTC) of the first round")
+    last_played: Optional[str] = Field(None, description="Timestamp (UTC) of the latest round")
+
+class UserRoundStats(RoundStats):
+    """Schema for a user's statistics across all sessions"""
+    user_id: str = Field(..., description="Unique identifier of the user")
+
+class SessionRoundStats(RoundStats):
+    """Schema for the statistics of one game session"""
+    session_id: str = Field(..., description="Game session ID")
+    user_id: str = Field(..., description="User who played the session")
+
+class ModelRoundStats(RoundStats):
+    """Schema for the statistics of one AI model"""
+    model_name: str = Field(..., description="AI model name")
+
+class VolumeBucket(BaseModel):
+    """Schema for the rounds played in one time bucket"""
+    bucket: str = Field(..., description="Start of the bucket (UTC)")
+    rounds: int = Field(..., description="Number of rounds played")
+    player_wins: int = Field(..., description="Rounds won by the player")
+    ai_wins: int = Field(..., description="Rounds won by the AI")
+    draws: int = Field(..., description="Drawn rounds")
+
+class RoundVolume(BaseModel):
+    """Schema for round volume over a time range"""
+    bucket_size: Literal["hour", "day"] = Field(..., description="Width of each bucket")
+    start: str = Field(..., description="Start of the range (UTC, inclusive)")
+    end: str = Field(..., description="End of the range (UTC, exclusive)")
+    model_name: Optional[str] = Field(None, description="AI model the counts are restricted to")
+    buckets: List[VolumeBucket] = Field(..., description="Buckets with at least one round, oldest first")
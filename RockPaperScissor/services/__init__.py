@@ -4,8 +4,18 @@ Contains business logic layer services.
 """
 from .game_service import GameService
 from .llm_service import LLMService
+from .play_batcher import PlayBatcher
+from .request_limiter import RequestLimiter, OverloadedError
+from .analytics_service import AnalyticsService, AnalyticsUnavailableError
+from .replay_service import ReplayService
 
 __all__ = [
     'GameService',
-    'LLMService'
+    'LLMService',
+    'PlayBatcher',
+    'RequestLimiter',
+    'OverloadedError',
+    'AnalyticsService',
+    'AnalyticsUnavailableError',
+    'ReplayService'
 ]
\ No newline at end of file
@@ -1 +1,169 @@
-print(1)
\ No newline at end of file
+"""
+Analytics over stored game rounds.
+Win rates, move distributions and round volumes, read from the SQL rollup tables.
+"""
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from ..repositories import Storage, SQLStorage
+from ..repositories.sql_storage import find_round_store
+from ..utils import setup_logging
+from ..utils.metrics import Histogram
+from ..config.game import ANALYTICS_CONFIG
+
+logger = setup_logging()
+
+# Hour key prefix length per bucket size (keys look like 'YYYY-MM-DD HH')
+BUCKET_CHARS = {"hour": 13, "day": 10}
+BUCKET_WIDTH = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+class AnalyticsUnavailableError(Exception):
+    """Raised when the storage backend keeps no queryable game rounds."""
+    pass
+
+class AnalyticsService:
+    """
+    Read-only statistics over the game_rounds table.
+
+    User, model and volume queries read the rollup tables SQLStorage keeps
+    up to date as rounds are written; session queries aggregate the
+    session's rounds through the session_id index. Analytics need SQL to
+    be the primary round store: with CombinedStorage the SQL side only has
+    the rounds written while S3 was unavailable, so queries raise
+    AnalyticsUnavailableError (501) instead of returning partial numbers.
+    """
+
+    def __init__(self, storage: Storage):
+        """
+        Initialize the analytics service.
+
+        Args:
+            storage: Storage backend (analytics need SQLStorage as the primary round store)
+        """
+        self.sql_storage: Optional[SQLStorage] = find_round_store(storage)
+
+        # Metrics
+        self.query_seconds = Histogram("analytics_query_seconds", "Time to answer one analytics query, by query",
+                                       labelnames=("query",))
+        self._latency = {query: self.query_seconds.labels(query) for query in ("user", "session", "model", "volume")}
+
+    @property
+    def available(self) -> bool:
+        """Whether the storage backend keeps every game round in SQL."""
+        return self.sql_storage is not None
+
+    def _storage(self) -> SQLStorage:
+        if self.sql_storage is None:
+            raise AnalyticsUnavailableError("Analytics need SQL as the primary round store (STORAGE_TYPE=sql)")
+        return self.sql_storage
+
+    @staticmethod
+    def _summarize(counts: Dict[str, Any]) -> Dict[str, Any]:
+        """Turn rollup counts into rates, keeping the identifying columns."""
+        stats = dict(counts)
+        rounds = stats["rounds"] or 0
+        moves = {move: stats.pop(f"{move}_count") or 0 for move in ("rock", "paper", "scissors")}
+        total_moves = sum(moves.values())
+        stats["win_rates"] = {
+            "player": stats["player_wins"] / rounds if rounds else 0.0,
+            "ai": stats["ai_wins"] / rounds if rounds else 0.0,
+            "draw": stats["draws"] / rounds if rounds else 0.0
+        }
+        stats["move_distribution"] = {
+            move: count / total_moves if total_moves else 0.0 for move, count in moves.items()
+        }
+        return stats
+
+    async def get_user_stats(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get a user's win rates and move distribution (None if they have no rounds)."""
+        started = time.perf_counter()
+        counts = await self._storage().get_user_round_stats(user_id)
+        self._latency["user"].observe(time.perf_counter() - started)
+        return self._summarize(counts) if counts else None
+
+    async def get_session_stats(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Get a session's win rates and move distribution (None if it has no stored rounds)."""
+        started = time.perf_counter()
+        counts = await self._storage().get_session_round_stats(session_id)
+        self._latency["session"].observe(time.perf_counter() - started)
+        return self._summarize(counts) if counts else None
+
+    async def get_model_stats(self, model_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get win rates and move distributions per AI model, or for one model."""
+        started = time.perf_counter()
+        rows = await self._storage().get_model_round_stats(model_name)
+        self._latency["model"].observe(time.perf_counter() - started)
+        return [self._summarize(row) for row in rows]
+
+    @staticmethod
+    def _utc(value: datetime) -> datetime:
+        """Convert to naive UTC (naive values are taken to be UTC already)."""
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    @staticmethod
+    def _bucket_start(value: datetime, bucket: str) -> datetime:
+        """Start of the hour or day containing value."""
+        value = value.replace(minute=0, second=0, microsecond=0)
+        return value.replace(hour=0) if bucket == "day" else value
+
+    async def get_round_volume(
+        self,
+        bucket: str = "hour",
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        model_name: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Get the number of rounds and their outcomes per hour or day.
+
+        Args:
+            bucket: "hour" or "day"
+            start: Start of the range (defaults to a day, or 30 days, before end)
+            end: End of the range, exclusive (defaults to now)
+            model_name: Only count rounds played by this model
+
+        Returns:
+            Dict with the normalized range and its non-empty buckets
+
+        Raises:
+            ValueError: If the bucket size or range is invalid
+        """
+        if bucket not in BUCKET_CHARS:
+            raise ValueError(f"Unknown bucket size: {bucket}")
+        width = BUCKET_WIDTH[bucket]
+
+        end = self._utc(end) if end else datetime.now(timezone.utc).replace(tzinfo=None)
+        if start is None:
+            default_span = (timedelta(hours=ANALYTICS_CONFIG["default_hours"]) if bucket == "hour"
+                            else timedelta(days=ANALYTICS_CONFIG["default_days"]))
+            start = end - default_span
+        else:
+            start = self._utc(start)
+        if start >= end:
+            raise ValueError("start must be before end")
+        if (end - start) / width > ANALYTICS_CONFIG["max_buckets"]:
+            raise ValueError(f"Range covers more than {ANALYTICS_CONFIG['max_buckets']} {bucket}s")
+
+        # Widen the range to whole buckets: the one containing start through the one containing end
+        start = self._bucket_start(start, bucket)
+        if self._bucket_start(end, bucket) != end:
+            end = self._bucket_start(end, bucket) + width
+
+        started = time.perf_counter()
+        rows = await self._storage().get_round_volume(
+            BUCKET_CHARS[bucket], start.strftime("%Y-%m-%d %H"), end.strftime("%Y-%m-%d %H"), model_name
+        )
+        self._latency["volume"].observe(time.perf_counter() - started)
+
+        suffix = ":00:00" if bucket == "hour" else ""
+        for row in rows:
+            row["bucket"] += suffix
+        return {
+            "bucket_size": bucket,
+            "start": start.isoformat(sep=" "),
+            "end": end.isoformat(sep=" "),
+            "model_name": model_name,
+            "buckets": rows
+        }
@@ -1,22 +1,49 @@
-from typing import Dict, Any, Optional
-from ..game_cache import GameSessionCache
+import asyncio
+import time
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Union
+from ..game_cache import GameSessionCache, UserStateCache
 from ..schemas.game import GameRequest, GameResponse, GameData, GameSummary
-from ..models import get_ai
-from ..utils import setup_logging
-from ..services import LLMService
+from ..models import AI_MODELS, get_ai, ModelState
+from ..models.rps import MOVE_INDEX, RESULTS, OUTCOME, SessionStats
+from ..utils import setup_logging, SAMPLED
+from ..utils.metrics import Histogram
+from ..config.game import REPLAY_CONFIG
+from .llm_service import LLMService
+from .replay_service import ReplayService
 from ..repositories import Storage
 
 logger = setup_logging()
 
 class GameService:
     """Service for game-related logic."""
-    def __init__(self, storage: Storage):
-        """Initialize the game service."""
-        self.game_cache = GameSessionCache(storage=storage)
-        self.llm_service = LLMService(storage)
+    def __init__(self, storage: Storage, llm_service: Optional[LLMService] = None):
+        """Initialize the game service.
+        
+        Args:
+            storage: Storage backend
+            llm_service: Shared LLM service (one is created if not given)
+        """
+        self.game_cache = GameSessionCache(storage=storage, wal_name="game_sessions")
+        # Users without a saved state get it rebuilt from their stored rounds
+        self.replay_service = ReplayService(storage)
+        rebuild = (self.replay_service.rebuild_user_state
+                   if self.replay_service.available and REPLAY_CONFIG["on_missing_state"] else None)
+        self.user_state_cache = UserStateCache(storage=storage, rebuild=rebuild)
+        # A single LLMService owns the LLM interaction WAL, so share the app's
+        self.llm_service = llm_service or LLMService(storage)
         self.storage = storage
-
-    def play_round(self, request: GameRequest) -> GameResponse:
+        
+        # Metrics, bound once per model so the hot path does no label lookups
+        self.play_seconds = Histogram("game_play_round_seconds", "Time to play one round, by model",
+                                      labelnames=("model",))
+        self.make_move_seconds = Histogram("model_make_move_seconds", "Time in one model move call, by model and call",
+                                           labelnames=("model", "call"))
+        self._play_latency = {name: self.play_seconds.labels(name) for name in AI_MODELS}
+        self._move_latency = {name: self.make_move_seconds.labels(name, "single") for name in AI_MODELS}
+        self._batch_move_latency = {name: self.make_move_seconds.labels(name, "batch") for name in AI_MODELS}
+    
+    async def play_round(self, request: GameRequest) -> GameResponse:
         """
         Play a single round of rock-paper-scissors.
         
@@ -26,31 +53,134 @@ class GameService:
         Returns:
             GameResponse containing round results
         """
+        started = time.perf_counter()
 
         # Get model info
-        model_name, model_state = self._get_model_info(request.session_id, request.user_id)
+        model_name, model_state = await self._get_model_info(request.session_id, request.user_id)
 
         # Create AI instance
         ai = get_ai(model_name)
 
         # Get AI's move
+        move_started = time.perf_counter()
         ai_move, model_state = ai.make_move(model_state)
+        move_latency = self._move_latency.get(model_name) or self.make_move_seconds.labels(model_name, "single")
+        move_latency.observe(time.perf_counter() - move_started)
         
-        # Determine winner
-        result = self._determine_winner(request.user_move, ai_move)
+        response = self._complete_round(request, model_name, ai_move, model_state)
+        play_latency = self._play_latency.get(model_name) or self.play_seconds.labels(model_name)
+        play_latency.observe(time.perf_counter() - started)
+        return response
+
+    async def play_rounds_batch(self, requests: List[GameRequest]) -> List[Union[GameResponse, Exception]]:
+        """
+        Play many rounds at once, sharing one model call per AI model.
+
+        Requests are processed in waves so that a session appearing several
+        times in the batch sees its rounds applied in order. Within a wave the
+        requests are grouped by model name and run through ``make_moves_batch``;
+        the model states of a wave are loaded concurrently, so cold users'
+        storage reads overlap instead of running one after another.
+        
+        Args:
+            requests: GameRequest objects, possibly from different sessions
+            
+        Returns:
+            One GameResponse per request, or the exception raised while
+            processing that request, in the same order as the input
+        """
+        started = time.perf_counter()
+        results: List[Union[GameResponse, Exception, None]] = [None] * len(requests)
+        remaining = list(range(len(requests)))
+
+        while remaining:
+            # Take the first pending request of every session for this wave
+            wave, deferred, seen_sessions = [], [], set()
+            for index in remaining:
+                session_id = requests[index].session_id
+                if session_id in seen_sessions:
+                    deferred.append(index)
+                else:
+                    seen_sessions.add(session_id)
+                    wave.append(index)
+            remaining = deferred
+
+            # Group the wave by model; sessions already in the cache need no
+            # I/O, the others' states are loaded concurrently
+            groups: Dict[str, List[tuple]] = defaultdict(list)
+            cold = []
+            for index in wave:
+                latest_record = self.game_cache.get_latest_record(requests[index].session_id)
+                if latest_record:
+                    groups[latest_record.model_name].append((index, self._session_state(latest_record)))
+                else:
+                    cold.append(index)
+            if cold:
+                model_infos = await asyncio.gather(
+                    *(self._get_model_info(requests[index].session_id, requests[index].user_id) for index in cold),
+                    return_exceptions=True
+                )
+                for index, model_info in zip(cold, model_infos):
+                    if isinstance(model_info, Exception):
+                        results[index] = model_info
+                    else:
+                        model_name, model_state = model_info
+                        groups[model_name].append((index, model_state))
+
+            for model_name, members in groups.items():
+                try:
+                    move_started = time.perf_counter()
+                    moves = get_ai(model_name).make_moves_batch([state for _, state in members])
+                    move_latency = (self._batch_move_latency.get(model_name)
+                                    or self.make_move_seconds.labels(model_name, "batch"))
+                    move_latency.observe(time.perf_counter() - move_started)
+                except Exception as e:
+                    for index, _ in members:
+                        results[index] = e
+                    continue
+
+                for (index, _), (ai_move, model_state) in zip(members, moves):
+                    try:
+                        results[index] = self._complete_round(requests[index], model_name, ai_move, model_state)
+                    except Exception as e:
+                        results[index] = e
+
+                # Each request's latency runs from the start of the batch to the end of its group
+                elapsed = time.perf_counter() - started
+                play_latency = self._play_latency.get(model_name) or self.play_seconds.labels(model_name)
+                for _ in members:
+                    play_latency.observe(elapsed)
+
+        return results
+
+    def _complete_round(self, request: GameRequest, model_name: str, ai_move: str, model_state: Any) -> GameResponse:
+        """
+        Score a round, update the session cache and build the response.
+
+        Args:
+            request: GameRequest object containing game information
+            model_name: Name of the AI model that played
+            ai_move: The AI's move
+            model_state: The model state returned with the AI's move
+            
+        Returns:
+            GameResponse containing round results
+        """
+        # Score the round with integer codes
+        user_code = MOVE_INDEX[request.user_move]
+        ai_code = MOVE_INDEX[ai_move]
+        result_code = OUTCOME[user_code][ai_code]
+        result = RESULTS[result_code]
 
         # Update model state with game information
-        model_state.update({
-            "player_last_move": request.user_move,
-            "ai_last_move": ai_move,
-            "last_result": result
-        })
-        logger.debug(f"Updated model state: {model_state}")
+        model_state.record_round_codes(user_code, ai_code, result_code)
+        logger.debug("Updated model state: %s", model_state, extra=SAMPLED)
 
         # Get the latest record
         latest_record = self.game_cache.get_latest_record(request.session_id)
         # Get the updated session stats
-        session_stats = self._update_session_stats(latest_record.session_stats if latest_record else None, request.user_move, result)
+        session_stats = self._update_session_stats(latest_record.session_stats if latest_record else None,
+                                                   user_code, result_code)
         
         # Create GameData for storage
         game_data = GameData(
@@ -66,6 +196,8 @@ class GameService:
         )
         # Save game in repository
         self.game_cache.add_record(request.session_id, game_data)
+        # Keep the user's latest state for their next session (written back in batches)
+        self.user_state_cache.put(request.user_id, model_name, model_state)
         
         # Build response
         response = GameResponse(
@@ -74,18 +206,18 @@ class GameService:
             session_id=request.session_id,
             ai_move=ai_move,
             result=result,
-            session_stats=session_stats
+            session_stats=session_stats.to_dict()
         )
         
         return response
     
-    def end_game(self, request: GameRequest) -> GameSummary:
+    async def end_game(self, request: GameRequest) -> GameSummary:
         """End the game and get summary."""
 
         # Get latest record for summary
         latest_record = self.game_cache.get_latest_record(request.session_id)
         if latest_record:
-            llm_game_summary = self.llm_service.summarize_game_session(latest_record.model_state)
+            llm_game_summary = self.llm_service.summarize_game_session(latest_record.model_state.to_dict())
 
             # Move session data to buffer (will be automatically flushed later)
             self.game_cache.move_session_to_buffer(request.session_id)
@@ -98,30 +230,16 @@ class GameService:
  
         return response
     
-    def _determine_winner(self, player_move: str, ai_move: str) -> str:
-        """Determine the winner of a round."""
-        if player_move == ai_move:
-            return "draw"
-        
-        winning_moves = {
-            "rock": "scissors",
-            "paper": "rock",
-            "scissors": "paper"
-        }
-        
-        if winning_moves[player_move] == ai_move:
-            return "player_win"
-        return "ai_win"
-    
-    def _get_model_info(self, session_id: str, user_id: str) -> tuple[str, Dict[str, Any]]:
-            """Get model name and state from cache or storage.
+    async def _get_model_info(self, session_id: str, user_id: str) -> tuple[str, Any]:
+            """Get model name and state from the session cache, user state cache or storage.
             
             Args:
                 session_id: Current session ID
                 user_id: User ID
                 
             Returns:
-                Tuple containing model name and model state
+                Tuple containing model name and model state (a ModelState,
+                an encoded state from storage, or None for a fresh state)
             """
             # get data from cache
             latest_record = self.game_cache.get_latest_record(session_id)
@@ -129,53 +247,49 @@ class GameService:
             # get model state from cache or storage
             if latest_record:
                 model_name = latest_record.model_name
-                model_state = latest_record.model_state
+                model_state = self._session_state(latest_record)
             else:
-                # Try to get from storage
-                user_state = self.storage.get_user_state(user_id)
+                # Try the user state cache (reads storage, or replays stored rounds, on a miss)
+                user_state = await self.user_state_cache.get(user_id)
                 if user_state:
-                    model_name = user_state["model_name"]
-                    model_state = user_state["model_state"]
+                    model_name, model_state = user_state
                 else:
                     model_name = "adaptive_markov"
-                    model_state = {}
+                    model_state = None
             
             return model_name, model_state
     
-    def _update_session_stats(self, current_stats: Optional[Dict[str, Any]], player_move: str, result: str) -> Dict[str, Any]:
-        """Update session statistics."""
-        if not current_stats:
-            current_stats = {
-                "total_rounds": 0,
-                "player_wins": 0,
-                "ai_wins": 0,
-                "draws": 0,
-                "rock_count": 0,
-                "paper_count": 0,
-                "scissors_count": 0
-            }
-        
-        current_stats["total_rounds"] += 1
-        if result == "player_win":
-            current_stats["player_wins"] += 1
-        elif result == "ai_win":
-            current_stats["ai_wins"] += 1
-        else:
-            current_stats["draws"] += 1
-            
-        # Update move statistics
-        if player_move == "rock":
-            current_stats["rock_count"] += 1
-        elif player_move == "paper":
-            current_stats["paper_count"] += 1
-        elif player_move == "scissors":
-            current_stats["scissors_count"] += 1
-            
-        return current_stats
+    @staticmethod
+    def _session_state(record: GameData) -> Any:
+        """
+        Copy of a session's latest model state for its next round.
+
+        A round's record keeps the state the round ended with: it is logged,
+        flushed with the record and held by the user state cache. The next
+        round updates its own copy, so no record's state changes after its
+        round, and the session's records never share a state object.
+        """
+        model_state = record.model_state
+        return model_state.copy() if isinstance(model_state, ModelState) else model_state
+    
+    def _update_session_stats(self, current_stats: Any, user_move: int, result: int) -> SessionStats:
+        """
+        Count a round into a copy of the session's stats.
+
+        Args:
+            current_stats: Stats of the session's previous round (SessionStats,
+                    a dictionary replayed from the write-ahead log, or None)
+            user_move: Player move code
+            result: Result code
+        """
+        stats = SessionStats.load(current_stats)
+        stats.record(user_move, result)
+        return stats
     
     async def shutdown(self):
         """Gracefully shutdown the game service."""
         await self.game_cache.shutdown()
+        await self.user_state_cache.shutdown()
 
 
 
@@ -14,7 +14,7 @@ class LLMService:
     
     def __init__(self, storage: Storage):
         """Initialize the LLM service with storage."""
-        self.llm_cache = LLMCache(storage=storage)
+        self.llm_cache = LLMCache(storage=storage, wal_name="llm_interactions")
         self.game_cache = GameSessionCache(storage=storage)
         logger.info("LLM service initialized")
 
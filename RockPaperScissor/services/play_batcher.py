@@ -0,0 +1,140 @@
+"""
+Request coalescing for game rounds.
+Gathers concurrent play requests and runs them through GameService as one batch.
+"""
+import asyncio
+import time
+from typing import List, Optional, Set, Tuple, Dict, Any
+from ..schemas.game import GameRequest, GameResponse
+from ..utils import setup_logging
+from ..utils.metrics import Counter, Histogram
+from ..config.game import PLAY_BATCH_CONFIG
+
+logger = setup_logging()
+
+# Batch size buckets (number of requests per batch)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+class PlayBatcher:
+    """
+    Micro-batching coalescer in front of ``GameService.play_rounds_batch``.
+
+    A request arriving while no batch is being played is dispatched at once,
+    so sequential traffic pays no batching delay. Requests arriving while a
+    batch is running are collected for at most ``window_ms`` (or until
+    ``max_batch_size`` are pending, or the running batches finish) and then
+    dispatched together. Every caller's future is resolved with its own
+    response or exception.
+    """
+
+    def __init__(
+        self,
+        game_service,
+        window_ms: float = PLAY_BATCH_CONFIG["window_ms"],
+        max_batch_size: int = PLAY_BATCH_CONFIG["max_batch_size"]
+    ):
+        """
+        Initialize the batcher.
+
+        Args:
+            game_service: GameService used to play the batched rounds
+            window_ms: Maximum time in milliseconds a request waits for others to join
+            max_batch_size: Dispatch as soon as this many requests are pending
+        """
+        self.game_service = game_service
+        self.window_sec = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+
+        self._pending: List[Tuple[GameRequest, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._batches: Set[asyncio.Task] = set()  # Batches being played
+
+        # Metrics
+        self.batch_size = Histogram("play_batch_size", "Requests per dispatched batch", BATCH_SIZE_BUCKETS)
+        self.queue_wait = Histogram("play_batch_queue_wait_seconds", "Time requests wait for their batch")
+        self.batch_duration = Histogram("play_batch_duration_seconds", "Time spent playing a batch")
+        self.requests_total = Counter("play_batch_requests_total", "Requests submitted to the batcher")
+
+    async def submit(self, request: GameRequest) -> GameResponse:
+        """
+        Queue a play request and wait for its batch to be processed.
+
+        Args:
+            request: GameRequest object containing game information
+
+        Returns:
+            GameResponse containing round results
+
+        Raises:
+            Exception: Whatever the service raised while playing this request
+        """
+        # Backpressure: wait (without blocking the loop) while the session
+        # cache has more unflushed records than its high-water mark
+        await self.game_service.game_cache.wait_for_capacity()
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((request, future, time.perf_counter()))
+        self.requests_total.inc()
+
+        if len(self._pending) >= self.max_batch_size or not (self._batches or self._timer):
+            # Full batch, or nothing to wait for: play right away
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_sec, self._dispatch)
+
+        return await future
+
+    def _dispatch(self) -> None:
+        """Hand all pending requests to a task that plays them as one batch."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._play_batch(batch))
+        # Keep a reference until the batch is done
+        self._batches.add(task)
+        task.add_done_callback(self._batch_done)
+
+    def _batch_done(self, task: asyncio.Task) -> None:
+        """Forget a finished batch; dispatch the requests collected meanwhile if it was the last one."""
+        self._batches.discard(task)
+        if self._pending and not self._batches:
+            self._dispatch()
+
+    async def _play_batch(self, batch: List[Tuple[GameRequest, asyncio.Future, float]]) -> None:
+        """Play one batch and resolve its futures."""
+        started = time.perf_counter()
+        for _, _, enqueued in batch:
+            self.queue_wait.observe(started - enqueued)
+        self.batch_size.observe(len(batch))
+
+        try:
+            results = await self.game_service.play_rounds_batch([request for request, _, _ in batch])
+        except Exception as e:
+            logger.error("Error playing batch of %s rounds: %s", len(batch), e)
+            results = [e] * len(batch)
+        self.batch_duration.observe(time.perf_counter() - started)
+
+        for (_, future, _), result in zip(batch, results):
+            if future.done():  # Caller was cancelled
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get batching configuration and metrics."""
+        return {
+            "window_ms": self.window_sec * 1000.0,
+            "max_batch_size": self.max_batch_size,
+            "pending": len(self._pending),
+            "requests_total": self.requests_total.value,
+            "batch_size": self.batch_size.snapshot(),
+            "queue_wait_seconds": self.queue_wait.snapshot(),
+            "batch_duration_seconds": self.batch_duration.snapshot()
+        }
@@ -0,0 +1,247 @@
+"""
+Replay of stored game rounds into model states.
+Rebuilds a user's state from game_rounds when user_states has none, and rebuilds
+all users' states offline.
+
+Usage:
+    python -m RockPaperScissor.services.replay_service --db data/game_data.db
+    python -m RockPaperScissor.services.replay_service --stale-only --workers 8
+"""
+import argparse
+import json
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from ..models import AI_MODELS, get_ai, ModelState
+from ..models.model_state import MOVES, RESULTS
+from ..repositories import Storage
+from ..repositories.sql_storage import INSERT_STATEMENTS, find_round_store
+from ..utils import setup_logging
+from ..utils.metrics import Counter, Histogram
+from ..config.database import SQLITE_CONFIG
+from ..config.game import REPLAY_CONFIG
+
+logger = setup_logging()
+
+def _code(column: str, names: tuple) -> str:
+    """SQL expression mapping a move/result column to its integer code."""
+    cases = " ".join(f"WHEN '{name}' THEN {code}" for code, name in enumerate(names))
+    return f"CASE {column} {cases} END"
+
+# A user's rounds oldest first (served by the (user_id, timestamp) index), each
+# packed into one integer: user_move * 9 + ai_move * 3 + result
+SELECT_USER_ROUNDS = f"""
+    SELECT {_code("user_move", MOVES)} * 9 + {_code("ai_move", MOVES)} * 3 + {_code("result", RESULTS)}
+    FROM game_rounds WHERE user_id = ?
+    ORDER BY timestamp, id
+"""
+SELECT_LATEST_MODEL = """
+    SELECT model_name FROM game_rounds WHERE user_id = ?
+    ORDER BY timestamp DESC, id DESC LIMIT 1
+"""
+SELECT_ALL_USERS = "SELECT DISTINCT user_id FROM game_rounds"
+# Users with rounds newer than their saved state, or no saved state at all
+SELECT_STALE_USERS = """
+    SELECT rounds.user_id
+    FROM (SELECT user_id, MAX(timestamp) AS last_played FROM game_rounds GROUP BY user_id) AS rounds
+    LEFT JOIN user_states ON user_states.user_id = rounds.user_id
+    WHERE user_states.user_id IS NULL OR user_states.last_updated < rounds.last_played
+"""
+
+def iter_user_rounds(conn: sqlite3.Connection, user_id: str,
+                     chunk_rows: int = REPLAY_CONFIG["chunk_rows"]) -> Iterator[np.ndarray]:
+    """
+    Stream a user's rounds in chunks.
+
+    Yields:
+        (3, n) int8 arrays of user move, AI move and result codes, oldest first
+    """
+    cursor = conn.cursor()
+    cursor.row_factory = None  # Plain tuples are cheapest to unpack
+    try:
+        cursor.execute(SELECT_USER_ROUNDS, (user_id,))
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                return
+            packed = np.fromiter((row[0] for row in rows), dtype=np.int8, count=len(rows))
+            yield np.stack((packed // 9, packed // 3 % 3, packed % 3))
+    finally:
+        cursor.close()
+
+def replay_user(
+    conn: sqlite3.Connection,
+    user_id: str,
+    model_name: Optional[str] = None,
+    chunk_rows: int = REPLAY_CONFIG["chunk_rows"]
+) -> Optional[Tuple[str, ModelState, int]]:
+    """
+    Rebuild a user's model state from their stored rounds (blocking).
+
+    Args:
+        conn: Connection to the database holding game_rounds
+        user_id: User ID
+        model_name: Model to replay through (defaults to the one that played the user's latest round)
+        chunk_rows: Rounds fetched per cursor read
+
+    Returns:
+        Tuple of (model_name, model_state, rounds replayed), or None if the user has no rounds
+    """
+    if model_name is None:
+        row = conn.execute(SELECT_LATEST_MODEL, (user_id,)).fetchone()
+        if row is None:
+            return None
+        model_name = row[0] if row[0] in AI_MODELS else REPLAY_CONFIG["default_model"]
+
+    ai = get_ai(model_name)
+    state = ai.new_state()
+    rounds = 0
+    for chunk in iter_user_rounds(conn, user_id, chunk_rows):
+        state = ai.replay(state, *chunk)
+        rounds += chunk.shape[1]
+    if rounds == 0:
+        return None
+    return model_name, state, rounds
+
+class ReplayService:
+    """
+    Rebuilds user model states by replaying their rounds from SQL storage.
+
+    Reads run on the SQL storage's read pool, so replays for different users
+    proceed in parallel and never block the event loop. Online rebuilds are
+    only offered when SQL is the primary round store: CombinedStorage's SQL
+    side holds just the rounds written while S3 was unavailable, and
+    replaying those would rebuild a state from part of the history.
+    """
+
+    def __init__(self, storage: Storage, chunk_rows: int = REPLAY_CONFIG["chunk_rows"]):
+        """
+        Initialize the replay service.
+
+        Args:
+            storage: Storage backend (rebuilds need SQLStorage as the primary round store)
+            chunk_rows: Rounds fetched per cursor read
+        """
+        self.sql_storage = find_round_store(storage)
+        self.chunk_rows = chunk_rows
+
+        # Metrics
+        self.replays = Counter("user_state_replays_total", "User states rebuilt from stored rounds")
+        self.replayed_rounds = Counter("user_state_replayed_rounds_total", "Stored rounds replayed into user states")
+        self.replay_seconds = Histogram("user_state_replay_seconds", "Time to rebuild one user state")
+
+    @property
+    def available(self) -> bool:
+        """Whether the storage backend keeps every game round in SQL to replay."""
+        return self.sql_storage is not None
+
+    async def rebuild_user_state(self, user_id: str, model_name: Optional[str] = None) -> Optional[Tuple[str, ModelState]]:
+        """
+        Rebuild a user's state from their stored rounds.
+
+        Args:
+            user_id: User ID
+            model_name: Model to replay through (defaults to the one that played the user's latest round)
+
+        Returns:
+            Tuple of (model_name, model_state), or None if the user has no stored rounds
+        """
+        if self.sql_storage is None or self.sql_storage.read_pool is None:
+            return None
+        started = time.perf_counter()
+        try:
+            replayed = await self.sql_storage.read_pool.run(replay_user, user_id, model_name, self.chunk_rows)
+        except Exception as e:
+            logger.error("Failed to replay rounds for user %s: %s", user_id, e)
+            return None
+        if replayed is None:
+            return None
+
+        model_name, model_state, rounds = replayed
+        elapsed = time.perf_counter() - started
+        self.replay_seconds.observe(elapsed)
+        self.replays.inc()
+        self.replayed_rounds.inc(rounds)
+        logger.info("Rebuilt %s state for user %s from %s rounds in %.1f ms",
+                    model_name, user_id, rounds, elapsed * 1000)
+        return model_name, model_state
+
+def _rebuild_users(db_path: str, user_ids: List[str], chunk_rows: int) -> List[Tuple[str, str, bytes]]:
+    """Replay a group of users in a worker process; returns user_states rows."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=SQLITE_CONFIG["timeout"])
+    try:
+        rows = []
+        for user_id in user_ids:
+            replayed = replay_user(conn, user_id, chunk_rows=chunk_rows)
+            if replayed is not None:
+                model_name, model_state, _ = replayed
+                rows.append((user_id, model_name, model_state.encode()))
+        return rows
+    finally:
+        conn.close()
+
+def rebuild_all(
+    db_path: str,
+    workers: int = REPLAY_CONFIG["workers"],
+    stale_only: bool = False,
+    users_per_task: int = 256,
+    chunk_rows: int = REPLAY_CONFIG["chunk_rows"]
+) -> Dict[str, Any]:
+    """
+    Rebuild the saved states of many users from game_rounds, in parallel processes.
+
+    Only meaningful when game_rounds holds the users' full history (SQL
+    primary storage); rebuilt states replace the saved ones.
+
+    Args:
+        db_path: SQLite database
+        workers: Worker processes
+        stale_only: Only users without a saved state or with rounds newer than it
+        users_per_task: Users replayed per worker task
+        chunk_rows: Rounds fetched per cursor read
+
+    Returns:
+        Dict with the number of users and states written and the time taken
+    """
+    started = time.perf_counter()
+    conn = sqlite3.connect(db_path, timeout=SQLITE_CONFIG["timeout"])
+    try:
+        user_ids = [row[0] for row in conn.execute(SELECT_STALE_USERS if stale_only else SELECT_ALL_USERS)]
+        tasks = [user_ids[i:i + users_per_task] for i in range(0, len(user_ids), users_per_task)]
+
+        written = 0
+        pending: List[Tuple[str, str, bytes]] = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for rows in pool.map(_rebuild_users, [db_path] * len(tasks), tasks, [chunk_rows] * len(tasks)):
+                pending.extend(rows)
+                if len(pending) >= REPLAY_CONFIG["write_batch_size"]:
+                    with conn:
+                        conn.executemany(INSERT_STATEMENTS["user_states"], pending)
+                    written += len(pending)
+                    pending = []
+        if pending:
+            with conn:
+                conn.executemany(INSERT_STATEMENTS["user_states"], pending)
+            written += len(pending)
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - started
+    logger.info("Rebuilt %s of %s user states in %.1f s", written, len(user_ids), elapsed)
+    return {"users": len(user_ids), "written": written, "seconds": elapsed}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=SQLITE_CONFIG["db_path"], help="SQLite database to rebuild")
+    parser.add_argument("--workers", type=int, default=REPLAY_CONFIG["workers"])
+    parser.add_argument("--stale-only", action="store_true",
+                        help="Only users without a saved state or with rounds newer than it")
+    args = parser.parse_args()
+    print(json.dumps(rebuild_all(args.db, workers=args.workers, stale_only=args.stale_only), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Admission control for the game endpoints.
+Caps the number of requests processed at once so overload turns into fast 503s instead of growing latency.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict
+from ..utils import setup_logging
+from ..utils.metrics import Counter, Gauge, Histogram
+from ..config.game import REQUEST_LIMIT_CONFIG
+
+logger = setup_logging()
+
+class OverloadedError(Exception):
+    """Raised when a request could not get a processing slot in time."""
+    pass
+
+class RequestLimiter:
+    """
+    Concurrency limit shared by the game routes.
+
+    Up to ``max_concurrent`` requests hold a slot at once; others wait for
+    at most ``queue_timeout_sec`` and are then rejected with OverloadedError.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = REQUEST_LIMIT_CONFIG["max_concurrent"],
+        queue_timeout_sec: float = REQUEST_LIMIT_CONFIG["queue_timeout_sec"]
+    ):
+        """
+        Initialize the limiter.
+
+        Args:
+            max_concurrent: Requests allowed to run at once
+            queue_timeout_sec: Maximum time a request waits for a slot
+        """
+        self.max_concurrent = max_concurrent
+        self.queue_timeout_sec = queue_timeout_sec
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self.in_flight = 0
+
+        # Metrics
+        self.in_flight_gauge = Gauge("requests_in_flight", "Game requests holding a slot", fn=lambda: self.in_flight)
+        self.wait = Histogram("request_slot_wait_seconds", "Time requests wait for a processing slot")
+        self.rejected = Counter("requests_rejected_total", "Requests rejected because no slot freed up in time")
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """
+        Hold a processing slot for the duration of the block.
+
+        Raises:
+            OverloadedError: If no slot became free within queue_timeout_sec
+        """
+        queued = time.perf_counter()
+        if self._slots.locked():
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout_sec)
+            except asyncio.TimeoutError:
+                self.rejected.inc()
+                raise OverloadedError(f"No request slot free within {self.queue_timeout_sec}s")
+        else:
+            # Free slot: acquire without the extra task wait_for would schedule
+            await self._slots.acquire()
+        self.wait.observe(time.perf_counter() - queued)
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get slot usage, wait time and rejection count."""
+        return {
+            "max_concurrent": self.max_concurrent,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected.value,
+            "wait_seconds": self.wait.snapshot()
+        }
@@ -3,8 +3,10 @@ Utilities package initialization for RockPaperScissor game.
 Contains utility functions for the application.
 """
 
-from .logging import setup_logging
+from .logging import setup_logging, shutdown_logging, SAMPLED
 
 __all__ = [
-    'setup_logging'
+    'setup_logging',
+    'shutdown_logging',
+    'SAMPLED'
 ]
\ No newline at end of file
@@ -1,63 +1,173 @@
 """
 Logging configuration module for RockPaperScissor game.
 Sets up logging for the application.
+
+Log calls only put records on a queue; a background listener thread formats
+them and writes them to stdout and the log files, so the event loop never
+waits on log I/O. Use %-style arguments (``logger.info("x=%s", x)``) so
+messages for disabled levels are never formatted.
 """
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import random
 import sys
+import threading
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Optional
+
+# Pass as ``extra=SAMPLED`` on hot-path debug lines; only LOG_SAMPLE_RATE of them are emitted
+SAMPLED = {"sampled": True}
+
+# LogRecord attributes that are not user-supplied extras
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "sampled"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_setup_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+            "thread": record.threadName
+        }
+        # Structured fields passed with extra=
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        elif record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps only a fraction of records logged with extra=SAMPLED."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return not getattr(record, "sampled", False) or random.random() < self.rate
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that leaves formatting to the listener thread.
+
+    The message is merged with its arguments before the record is queued
+    (the arguments may be mutated after the call returns), but timestamps,
+    JSON encoding and I/O happen on the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)  # Other handlers may still see the original
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _build_handlers(formatter: logging.Formatter) -> list:
+    """Handlers run by the listener thread."""
+    stream_handler = logging.StreamHandler(sys.stdout)  # Log to stdout for CloudWatch
+    stream_handler.setFormatter(formatter)
+    handlers = [stream_handler]
+
+    # Create log files if in development environment
+    if os.environ.get("AWS_ENV") != "production":
+        logs_dir = Path("./logs")
+        logs_dir.mkdir(parents=True, exist_ok=True)
+
+        file_handler = logging.FileHandler(logs_dir / "app.log")
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+
+        error_handler = logging.FileHandler(logs_dir / "error.log")
+        error_handler.setLevel(logging.ERROR)
+        error_handler.setFormatter(formatter)
+        handlers.append(error_handler)
+    return handlers
+
+
+def shutdown_logging() -> None:
+    """Stop the listener thread after writing every queued record."""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
 
 def setup_logging():
     """
-    Configure logging settings for the application
-    
+    Configure logging settings for the application (once per process)
+
+    Environment:
+        LOG_LEVEL: Minimum level (default INFO)
+        LOG_FORMAT: "json" (default) or "text"
+        LOG_SAMPLE_RATE: Fraction of extra=SAMPLED records to keep (default 0.01)
+
     Returns:
         logging.Logger: Logger for the RockPaperScissor application
     """
-    # Determine log level from environment variable or use default
-    log_level = os.environ.get("LOG_LEVEL", "INFO").upper()
-    numeric_level = getattr(logging, log_level, None)
-    
-    if not isinstance(numeric_level, int):
-        numeric_level = logging.INFO
-    
-    # Configure root logger
-    logging.basicConfig(
-        level=numeric_level,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.StreamHandler(sys.stdout)  # Log to stdout for CloudWatch
-        ]
-    )
-    
-    # Create logger for our application
+    global _listener
     logger = logging.getLogger("RockPaperScissor")
-    
-    # Reduce noise from boto3 and other libraries
-    logging.getLogger("boto3").setLevel(logging.WARNING)
-    logging.getLogger("botocore").setLevel(logging.WARNING)
-    logging.getLogger("urllib3").setLevel(logging.WARNING)
-    
-    # Create log file if in development environment
-    if os.environ.get("AWS_ENV") != "production":
-        # Ensure logs directory exists
-        logs_dir = Path("./logs")
-        if not logs_dir.exists():
-            logs_dir.mkdir(parents=True)
-        
-        # Add file handler for development
-        file_handler = logging.FileHandler("./logs/app.log")
-        file_handler.setFormatter(logging.Formatter(
-            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-        ))
-        logger.addHandler(file_handler)
-        
-        # Add error file handler
-        error_handler = logging.FileHandler("./logs/error.log")
-        error_handler.setLevel(logging.ERROR)
-        error_handler.setFormatter(logging.Formatter(
-            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-        ))
-        logger.addHandler(error_handler)
-    
-    return logger
\ No newline at end of file
+    if _listener is not None:
+        return logger
+
+    with _setup_lock:
+        if _listener is not None:
+            return logger
+
+        # Determine log level from environment variable or use default
+        log_level = os.environ.get("LOG_LEVEL", "INFO").upper()
+        numeric_level = getattr(logging, log_level, None)
+        if not isinstance(numeric_level, int):
+            numeric_level = logging.INFO
+
+        if os.environ.get("LOG_FORMAT", "json").lower() == "text":
+            formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+        else:
+            formatter = JsonFormatter()
+
+        # Root logger only enqueues; the listener does the formatting and I/O
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        queue_handler = _QueueHandler(log_queue)
+        queue_handler.addFilter(SamplingFilter(float(os.environ.get("LOG_SAMPLE_RATE", "0.01"))))
+        root = logging.getLogger()
+        root.setLevel(numeric_level)
+        for handler in root.handlers[:]:
+            if isinstance(handler, _QueueHandler):  # Left by an earlier setup/shutdown
+                root.removeHandler(handler)
+        root.addHandler(queue_handler)
+
+        # Reduce noise from boto3 and other libraries
+        logging.getLogger("boto3").setLevel(logging.WARNING)
+        logging.getLogger("botocore").setLevel(logging.WARNING)
+        logging.getLogger("urllib3").setLevel(logging.WARNING)
+
+        _listener = logging.handlers.QueueListener(
+            log_queue, *_build_handlers(formatter), respect_handler_level=True
+        )
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+    return logger
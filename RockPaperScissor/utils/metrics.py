@@ -0,0 +1,314 @@
+"""
+Lightweight in-process metrics for RockPaperScissor game.
+Provides counters, gauges and fixed-bucket histograms for hot-path
+instrumentation, and renders them in the Prometheus text format.
+"""
+import bisect
+import math
+import threading
+import weakref
+from typing import Callable, Dict, Any, Iterator, List, Optional, Sequence, Tuple
+
+# Default latency buckets in seconds (100us .. 10s)
+DEFAULT_LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+class MetricsRegistry:
+    """
+    Tracks live metrics by name for exposition.
+
+    Metrics register themselves on creation and are held by weak reference,
+    so metrics of discarded components disappear from the output. Several
+    live metrics with the same name (e.g. one per cache instance) are summed
+    per label set when rendered.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, List[weakref.ref]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: "_Metric") -> None:
+        """Add a metric to the registry."""
+        with self._lock:
+            self._metrics.setdefault(metric.name, []).append(weakref.ref(metric))
+
+    def collect(self) -> Dict[str, List["_Metric"]]:
+        """Get live metrics grouped by name, dropping collected ones."""
+        collected = {}
+        with self._lock:
+            for name, refs in list(self._metrics.items()):
+                live = [metric for metric in (ref() for ref in refs) if metric is not None]
+                if live:
+                    self._metrics[name] = [weakref.ref(metric) for metric in live]
+                    collected[name] = live
+                else:
+                    del self._metrics[name]
+        return collected
+
+    def render(self) -> str:
+        """Render every live metric in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for name, metrics in sorted(self.collect().items()):
+            first = metrics[0]
+            lines.append(f"# HELP {name} {_escape_help(first.description)}")
+            lines.append(f"# TYPE {name} {first.type}")
+            lines.extend(first.render(metrics))
+        lines.append("")
+        return "\n".join(lines)
+
+
+# Registry served by the /metrics endpoint
+REGISTRY = MetricsRegistry()
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """
+    Shared naming, label and registration logic.
+
+    A metric created with ``labelnames`` is a family: ``labels(...)`` returns
+    the child bound to one label set, creating it on first use. Hot paths
+    should bind children once and keep them, so each update is a single
+    attribute increment with no locking or label lookup.
+    """
+
+    type = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        description: str = "",
+        labelnames: Sequence[str] = (),
+        registry: Optional[MetricsRegistry] = REGISTRY
+    ):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], "_Metric"] = {}
+        self._children_lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def _new_child(self) -> "_Metric":
+        raise NotImplementedError
+
+    def labels(self, *values: Any, **kwargs: Any) -> "_Metric":
+        """Get the child metric for one label set (positional or by label name)."""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._children_lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _series(self) -> Iterator[Tuple[Tuple[str, ...], "_Metric"]]:
+        """Yield (label values, metric) for every series this metric exports."""
+        if self.labelnames:
+            yield from list(self._children.items())
+        else:
+            yield (), self
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+
+    type = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        description: str = "",
+        labelnames: Sequence[str] = (),
+        registry: Optional[MetricsRegistry] = REGISTRY
+    ):
+        super().__init__(name, description, labelnames, registry)
+        self.value = 0
+
+    def _new_child(self) -> "Counter":
+        return Counter(self.name, self.description, registry=None)
+
+    def inc(self, amount: float = 1) -> None:
+        """Increment the counter."""
+        self.value += amount
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the current value."""
+        return {"value": self.value}
+
+    def render(self, metrics: Sequence["Counter"]) -> List[str]:
+        """Render the summed value of same-named counters per label set."""
+        totals: Dict[Tuple[str, ...], float] = {}
+        for metric in metrics:
+            for key, series in metric._series():
+                totals[key] = totals.get(key, 0) + series.value
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in totals.items()]
+
+
+class Gauge(_Metric):
+    """
+    Value that can go up and down.
+
+    A gauge created with ``fn`` reads its value from the callback at
+    collection time, so sizes that are already tracked elsewhere (cache
+    entries, buffer depth) cost nothing on the hot path.
+    """
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        description: str = "",
+        fn: Optional[Callable[[], float]] = None,
+        labelnames: Sequence[str] = (),
+        registry: Optional[MetricsRegistry] = REGISTRY
+    ):
+        super().__init__(name, description, labelnames, registry)
+        self.fn = fn
+        self.value = 0
+
+    def _new_child(self) -> "Gauge":
+        return Gauge(self.name, self.description, registry=None)
+
+    def set(self, value: float) -> None:
+        """Set the gauge."""
+        self.value = value
+
+    def inc(self, amount: float = 1) -> None:
+        """Increase the gauge."""
+        self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        """Decrease the gauge."""
+        self.value -= amount
+
+    def get(self) -> float:
+        """Get the current value, calling the callback if there is one."""
+        if self.fn is None:
+            return self.value
+        try:
+            return self.fn()
+        except Exception:
+            return math.nan
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the current value."""
+        return {"value": self.get()}
+
+    def render(self, metrics: Sequence["Gauge"]) -> List[str]:
+        """Render the summed value of same-named gauges per label set."""
+        totals: Dict[Tuple[str, ...], float] = {}
+        for metric in metrics:
+            for key, series in metric._series():
+                totals[key] = totals.get(key, 0) + series.get()
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in totals.items()]
+
+
+class Histogram(_Metric):
+    """Histogram with fixed upper-bound buckets."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str = "",
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+        labelnames: Sequence[str] = (),
+        registry: Optional[MetricsRegistry] = REGISTRY
+    ):
+        super().__init__(name, description, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+        # One extra slot for observations above the largest bucket (+Inf)
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def _new_child(self) -> "Histogram":
+        return Histogram(self.name, self.description, self.buckets, registry=None)
+
+    def observe(self, value: float) -> None:
+        """Record an observation."""
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile as the upper bound of the bucket containing it."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, self.bucket_counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return count, sum, mean and estimated percentiles."""
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99)
+        }
+
+    def render(self, metrics: Sequence["Histogram"]) -> List[str]:
+        """Render cumulative buckets, sum and count of same-named histograms per label set."""
+        totals: Dict[Tuple[str, ...], List[Any]] = {}
+        for metric in metrics:
+            for key, series in metric._series():
+                counts, count, total = totals.setdefault(key, [[0] * len(self.bucket_counts), 0, 0.0])
+                totals[key] = [
+                    [a + b for a, b in zip(counts, series.bucket_counts)],
+                    count + series.count,
+                    total + series.sum
+                ]
+
+        lines = []
+        for key, (counts, count, total) in totals.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = _format_labels(self.labelnames, key, f'le="{_format_value(float(bound))}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines